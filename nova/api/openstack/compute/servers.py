@@ -290,9 +290,10 @@ class ServersController(wsgi.Controller):
             context, sort_keys, sort_dirs,
             schema_servers.SERVER_LIST_IGNORE_SORT_KEY, ('host', 'node'))
 
-        expected_attrs = []
         if is_detail:
-            expected_attrs.append('services')
+            # NOTE: security_groups are needed by the security groups
+            # extension when using nova-network.
+            expected_attrs = ['security_groups', 'services']
             if api_version_request.is_supported(req, '2.26'):
                 expected_attrs.append("tags")
 
@@ -300,6 +301,10 @@ class ServersController(wsgi.Controller):
             # showing details
             expected_attrs = self._view_builder.get_show_expected_attrs(
                                                                 expected_attrs)
+        else:
+            # NOTE: the non-detailed view only shows the id, name and links
+            # of the instances, so only load what the view builder needs.
+            expected_attrs = self._view_builder.get_index_expected_attrs()
 
         try:
             instance_list = self.compute_api.get_all(elevated or context,
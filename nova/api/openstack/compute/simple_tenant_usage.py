@@ -107,44 +107,67 @@ class SimpleTenantUsageController(wsgi.Controller):
 
     def _get_instances_all_cells(self, context, period_start, period_stop,
                                  tenant_id, limit, marker):
-        all_instances = []
+        """Generate the instances active in the period from all the cells.
+
+        The instances are queried from each cell in batches of
+        [api]/instance_list_cells_batch_size instances, so that the usage of
+        each batch can be accounted for before the next one is loaded,
+        rather than loading all the instances of all the cells at once.
+        """
+        batch_size = CONF.api.instance_list_cells_batch_size
         cells = objects.CellMappingList.get_all(context)
         for cell in cells:
             with nova_context.target_cell(context, cell) as cctxt:
-                try:
-                    instances = (
-                        objects.InstanceList.get_active_by_window_joined(
-                            cctxt, period_start, period_stop, tenant_id,
-                            expected_attrs=['flavor'], limit=limit,
-                            marker=marker))
-                except exception.MarkerNotFound:
-                    # NOTE(danms): We need to keep looking through the later
-                    # cells to find the marker
-                    continue
-                all_instances.extend(instances)
-                # NOTE(danms): We must have found a marker if we had one,
-                # so make sure we don't require a marker in the next cell
-                marker = None
-                if limit:
-                    limit -= len(instances)
-                    if limit <= 0:
+                while True:
+                    batch_limit = (batch_size if limit is None
+                                   else min(batch_size, limit))
+                    try:
+                        instances = (
+                            objects.InstanceList.get_active_by_window_joined(
+                                cctxt, period_start, period_stop, tenant_id,
+                                expected_attrs=['flavor'], limit=batch_limit,
+                                marker=marker))
+                    except exception.MarkerNotFound:
+                        # NOTE(danms): We need to keep looking through the
+                        # later cells to find the marker
+                        break
+                    # NOTE(danms): We must have found a marker if we had one,
+                    # so make sure we don't require a marker in the next cell
+                    marker = None
+                    for instance in instances:
+                        yield instance
+                    if limit is not None:
+                        limit -= len(instances)
+                        if limit <= 0:
+                            break
+                    if len(instances) < batch_limit:
                         break
-        if marker is not None and len(all_instances) == 0:
+                    marker = instances[-1].uuid
+            if limit is not None and limit <= 0:
+                break
+        if marker is not None:
             # NOTE(danms): If we did not find the marker in any cell,
             # mimic the db_api behavior here
             raise exception.MarkerNotFound(marker=marker)
 
-        return all_instances
-
     def _tenant_usages_for_period(self, context, period_start, period_stop,
                                   tenant_id=None, detailed=True, limit=None,
-                                  marker=None):
+                                  marker=None, links=False):
+        """Compute the usage of the instances active in the period.
+
+        Returns a list of the usage summaries per tenant, and the list of
+        the usages of each server when they are needed, either because the
+        usage is detailed or to build the pagination links. Otherwise only
+        the totals of each tenant are kept while the instances are
+        generated.
+        """
         instances = self._get_instances_all_cells(context, period_start,
                                                   period_stop, tenant_id,
                                                   limit, marker)
         rval = {}
         flavors = {}
         all_server_usages = []
+        now = timeutils.utcnow()
 
         for instance in instances:
             info = {}
@@ -185,8 +208,6 @@ class SimpleTenantUsageController(wsgi.Controller):
             else:
                 info['state'] = instance.vm_state
 
-            now = timeutils.utcnow()
-
             if info['state'] == 'terminated':
                 delta = info['ended_at'] - info['started_at']
             else:
@@ -214,7 +235,8 @@ class SimpleTenantUsageController(wsgi.Controller):
                                                  info['hours'])
 
             summary['total_hours'] += info['hours']
-            all_server_usages.append(info)
+            if detailed or links:
+                all_server_usages.append(info)
             if detailed:
                 summary['server_usages'].append(info)
 
@@ -312,7 +334,7 @@ class SimpleTenantUsageController(wsgi.Controller):
         try:
             usages, server_usages = self._tenant_usages_for_period(
                 context, period_start, period_stop, detailed=detailed,
-                limit=limit, marker=marker)
+                limit=limit, marker=marker, links=links)
         except exception.MarkerNotFound as e:
             raise exc.HTTPBadRequest(explanation=e.format_message())
 
@@ -350,7 +372,7 @@ class SimpleTenantUsageController(wsgi.Controller):
         try:
             usage, server_usages = self._tenant_usages_for_period(
                 context, period_start, period_stop, tenant_id=tenant_id,
-                detailed=True, limit=limit, marker=marker)
+                detailed=True, limit=limit, marker=marker, links=links)
         except exception.MarkerNotFound as e:
             raise exc.HTTPBadRequest(explanation=e.format_message())
 
@@ -55,6 +55,7 @@ class ViewBuilder(common.ViewBuilder):
     # details about an instance. Add to this list as new things need to be
     # shown.
     _show_expected_attrs = ['flavor', 'info_cache', 'metadata']
+    _index_expected_attrs = []
 
     def __init__(self):
         """Initialize view builder."""
@@ -111,6 +112,21 @@ class ViewBuilder(common.ViewBuilder):
         # results.
         return sorted(list(set(self._show_expected_attrs + expected_attrs)))
 
+    def get_index_expected_attrs(self, expected_attrs=None):
+        """Returns a list of lazy-loadable expected attributes used by index
+
+        The non-detailed view of an instance only shows base instance
+        fields, so unlike get_show_expected_attrs() this only returns the
+        attributes that are requested in addition to them.
+
+        :param list expected_attrs: The list of expected attributes that will
+            be requested in addition to what this view builder requires.
+        :returns: merged and sorted list of expected attributes
+        """
+        if expected_attrs is None:
+            expected_attrs = []
+        return sorted(list(set(self._index_expected_attrs + expected_attrs)))
+
     def show(self, request, instance, extend_address=True,
              show_extra_specs=None):
         """Detailed view of a single instance."""
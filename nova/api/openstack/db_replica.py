@@ -0,0 +1,117 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Routing of the database reads of API requests to the replicas.
+
+The GET requests on the resources of [api]/db_replica_read_resources read
+from the database replicas, unless the user made a write in the last
+[api]/db_replica_write_pin seconds, so that users read their own writes.
+The times of the writes are kept in the cache, so the replicas are only read
+from when it is shared by the API workers, i.e. when [cache] is enabled, or
+when users are not pinned after their writes.
+"""
+
+import contextlib
+import time
+
+from oslo_log import log as logging
+
+from nova import cache_utils
+import nova.conf
+
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+_READ_METHODS = ('GET', 'HEAD')
+
+MC = None
+_CACHE_DISABLED_WARNED = False
+
+
+def _get_cache():
+    global MC
+
+    if MC is None:
+        MC = cache_utils.get_client(
+            expiration_time=CONF.api.db_replica_write_pin)
+
+    return MC
+
+
+def _can_pin():
+    """Whether users can be pinned to the primary databases after a write
+    whatever API worker serves their requests.
+    """
+    global _CACHE_DISABLED_WARNED
+
+    if CONF.cache.enabled:
+        return True
+    if not _CACHE_DISABLED_WARNED:
+        LOG.warning('Reads are not routed to the database replicas since '
+                    'db_replica_write_pin is set but [cache] is not enabled, '
+                    'so the writes of the users could not be tracked across '
+                    'API workers.')
+        _CACHE_DISABLED_WARNED = True
+    return False
+
+
+def _write_key(context):
+    return 'db-replica-write-%s' % context.user_id
+
+
+def _get_resource(request, context):
+    """Return the top level resource of the compute API being requested."""
+    parts = [part for part in request.path_info.split('/') if part]
+    if parts and parts[0] == context.project_id:
+        parts = parts[1:]
+    return parts[0] if parts else None
+
+
+def _is_pinned(context):
+    """Whether the user made a write too recently to read from replicas."""
+    if not CONF.api.db_replica_write_pin:
+        return False
+    last_write = _get_cache().get(_write_key(context))
+    return (last_write is not None and
+            time.time() - last_write < CONF.api.db_replica_write_pin)
+
+
+def _record_write(context):
+    if CONF.api.db_replica_write_pin:
+        _get_cache().set(_write_key(context), time.time())
+
+
+@contextlib.contextmanager
+def route(request, context):
+    """Route the database reads of the request handled within the block.
+
+    The reads of the GET requests on the configured resources go to the
+    replicas, and the time of the writes is recorded once they are done.
+    """
+    resources = CONF.api.db_replica_read_resources
+    if (not resources or context is None or
+            (CONF.api.db_replica_write_pin and not _can_pin())):
+        yield
+        return
+
+    if request.method not in _READ_METHODS:
+        try:
+            yield
+        finally:
+            _record_write(context)
+        return
+
+    if (_get_resource(request, context) in resources and
+            not _is_pinned(context)):
+        LOG.debug('Reading from the database replicas')
+        context.db_replica_reads = True
+    yield
@@ -20,6 +20,7 @@ import webob.dec
 import webob.exc
 
 from nova.api.openstack import wsgi
+from nova.db import stats as db_stats
 from nova import wsgi as base_wsgi
 
 # TODO(sdague) maybe we can use a better name here for the logger
@@ -36,6 +37,7 @@ class RequestLog(base_wsgi.Middleware):
     _log_format = ('%(REMOTE_ADDR)s "%(REQUEST_METHOD)s %(REQUEST_URI)s" '
                    'status: %(status)s len: %(len)s '
                    'microversion: %(microversion)s time: %(time).6f')
+    _db_log_format = ' db: %(db)s'
 
     @staticmethod
     def _get_uri(environ):
@@ -57,7 +59,20 @@ class RequestLog(base_wsgi.Middleware):
             return False
         return True
 
+    def _report_db_stats(self, req):
+        """Report the database statistics collected for the request.
+
+        This is done even when the request itself is not logged here so the
+        statement budget is checked under eventlet as well.
+        """
+        context = req.environ.get('nova.context')
+        if context is None:
+            return None
+        return db_stats.report(context, '%s %s' % (
+            req.environ['REQUEST_METHOD'], self._get_uri(req.environ)))
+
     def _log_req(self, req, res, start):
+        stats = self._report_db_stats(req)
         if not self._should_emit(req):
             return
 
@@ -77,7 +92,11 @@ class RequestLog(base_wsgi.Middleware):
         # set microversion if it exists
         if not req.api_version_request.is_null():
             data["microversion"] = req.api_version_request.get_string()
-        LOG.info(self._log_format, data)
+        if stats is not None:
+            data['db'] = stats
+            LOG.info(self._log_format + self._db_log_format, data)
+        else:
+            LOG.info(self._log_format, data)
 
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
@@ -25,6 +25,7 @@ import six
 import webob
 
 from nova.api.openstack import api_version_request as api_version
+from nova.api.openstack import db_replica
 from nova.api.openstack import versioned_method
 from nova import exception
 from nova import i18n
@@ -628,7 +629,8 @@ class Resource(wsgi.Application):
 
         response = None
         try:
-            with ResourceExceptionHandler():
+            with ResourceExceptionHandler(), \
+                    db_replica.route(request, context):
                 action_result = self.dispatch(meth, request, action_args)
         except Fault as ex:
             response = ex
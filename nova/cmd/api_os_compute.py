@@ -42,6 +42,8 @@ def main():
     # NOTE(mriedem): This is needed for caching the nova-compute service
     # version.
     objects.Service.enable_min_version_cache()
+    objects.InstanceMapping.enable_cell_cache()
+    objects.HostMapping.enable_cell_cache()
 
     gmr.TextGuruMeditation.setup_autorun(version, conf=CONF)
 
@@ -27,6 +27,7 @@ from oslo_reports import opts as gmr_opts
 
 from nova.cmd import common as cmd_common
 from nova.compute import rpcapi as compute_rpcapi
+from nova.compute import utils as compute_utils
 from nova.conductor import rpcapi as conductor_rpcapi
 import nova.conf
 from nova import config
@@ -54,6 +55,7 @@ def main():
     cmd_common.block_db_access('nova-compute')
     objects_base.NovaObject.indirection_api = conductor_rpcapi.ConductorAPI()
     objects.Service.enable_min_version_cache()
+    compute_utils.enable_action_event_buffer()
     server = service.Service.create(binary='nova-compute',
                                     topic=compute_rpcapi.RPC_TOPIC)
     service.serve(server)
@@ -38,6 +38,8 @@ def main():
     objects.register_all()
     gmr_opts.set_defaults(CONF)
     objects.Service.enable_min_version_cache()
+    objects.InstanceMapping.enable_cell_cache()
+    objects.HostMapping.enable_cell_cache()
 
     gmr.TextGuruMeditation.setup_autorun(version, conf=CONF)
 
@@ -25,8 +25,10 @@ from __future__ import print_function
 
 import argparse
 import functools
+import os
 import re
 import sys
+import time
 import traceback
 
 import decorator
@@ -35,6 +37,7 @@ from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
 from oslo_utils import importutils
 from oslo_utils import uuidutils
@@ -487,13 +490,34 @@ Error: %s""") % six.text_type(e))
           default=False,
           help=('Run continuously until all deleted rows are archived. Use '
                 'max_rows as a batch size for each iteration.'))
+    @args('--all-cells', action='store_true', dest='all_cells',
+          default=False,
+          help='Archive deleted rows from the databases of all the cells.')
+    @args('--purge', action='store_true', dest='purge', default=False,
+          help=('Delete the deleted rows without copying them to the '
+                'shadow tables.'))
+    @args('--workers', type=int, metavar='<number>', dest='workers',
+          default=1,
+          help=('Number of tables to archive concurrently. Only tables '
+                'which do not reference each other are archived '
+                'concurrently. Defaults to 1.'))
+    @args('--checkpoint', metavar='<path>', dest='checkpoint',
+          help=('File in which to record the progress of the archive, so '
+                'that an interrupted archive resumes where it stopped. The '
+                'file is removed once there is nothing left to archive.'))
+    @args('--max-rate', type=int, metavar='<number>', dest='max_rate',
+          help=('Maximum number of rows to archive per second. By default '
+                'the archive is not throttled.'))
     def archive_deleted_rows(self, max_rows=1000, verbose=False,
-                             until_complete=False):
+                             until_complete=False, all_cells=False,
+                             purge=False, workers=1, checkpoint=None,
+                             max_rate=None):
         """Move deleted rows from production tables to shadow tables.
 
         Returns 0 if nothing was archived, 1 if some number of rows were
-        archived, 2 if max_rows is invalid. If automating, this should be
-        run continuously while the result is 1, stopping at 0.
+        archived, 2 if max_rows, workers or max_rate is invalid. If
+        automating, this should be run continuously while the result is 1,
+        stopping at 0.
         """
         max_rows = int(max_rows)
         if max_rows < 0:
@@ -503,32 +527,66 @@ Error: %s""") % six.text_type(e))
             print(_('max rows must be <= %(max_value)d') %
                   {'max_value': db.MAX_INT})
             return 2
+        workers = int(workers)
+        if workers < 1:
+            print(_("Must supply a positive value for workers"))
+            return 2
+        if max_rate is not None and int(max_rate) < 1:
+            print(_("Must supply a positive value for max_rate"))
+            return 2
+
+        ctxt = context.get_admin_context()
+        if all_cells:
+            cell_mappings = objects.CellMappingList.get_all(ctxt)
+        else:
+            # NOTE: Archive the database configured in [database]/connection
+            cell_mappings = [None]
+        markers = self._load_archive_checkpoint(checkpoint)
 
         table_to_rows_archived = {}
         deleted_instance_uuids = []
+        rows_archived = 0
+        start = time.time()
         if until_complete and verbose:
             sys.stdout.write(_('Archiving') + '..')  # noqa
         while True:
+            run = {}
+            deleted_instance_uuids = []
+            stopped = False
             try:
-                run, deleted_instance_uuids = db.archive_deleted_rows(max_rows)
+                for cell_mapping in cell_mappings:
+                    cell_run, cell_uuids = self._archive_cell(
+                        ctxt, cell_mapping, max_rows, purge, workers,
+                        markers.setdefault(
+                            cell_mapping.uuid if cell_mapping else '', {}))
+                    for k, v in cell_run.items():
+                        run.setdefault(k, 0)
+                        run[k] += v
+                    deleted_instance_uuids.extend(cell_uuids)
             except KeyboardInterrupt:
-                run = {}
-                if until_complete and verbose:
-                    print('.' + _('stopped'))  # noqa
-                    break
+                stopped = True
             for k, v in run.items():
                 table_to_rows_archived.setdefault(k, 0)
                 table_to_rows_archived[k] += v
+            rows_archived += sum(run.values())
             if deleted_instance_uuids:
                 table_to_rows_archived.setdefault('instance_mappings', 0)
                 table_to_rows_archived.setdefault('request_specs', 0)
-                ctxt = context.get_admin_context()
                 deleted_mappings = objects.InstanceMappingList.destroy_bulk(
                                             ctxt, deleted_instance_uuids)
                 table_to_rows_archived['instance_mappings'] += deleted_mappings
                 deleted_specs = objects.RequestSpec.destroy_bulk(
                                             ctxt, deleted_instance_uuids)
                 table_to_rows_archived['request_specs'] += deleted_specs
+            if not run and not stopped:
+                # NOTE: Nothing is left after the markers, start from the
+                # beginning of the tables next time.
+                markers.clear()
+            self._save_archive_checkpoint(checkpoint, markers)
+            if stopped:
+                if until_complete and verbose:
+                    print('.' + _('stopped'))  # noqa
+                break
             if not until_complete:
                 break
             elif not run:
@@ -537,6 +595,12 @@ Error: %s""") % six.text_type(e))
                 break
             if verbose:
                 sys.stdout.write('.')
+            if max_rate:
+                # Wait until the average rate is back to max_rate.
+                delay = (float(rows_archived) / int(max_rate) -
+                         (time.time() - start))
+                if delay > 0:
+                    time.sleep(delay)
         if verbose:
             if table_to_rows_archived:
                 self._print_dict(table_to_rows_archived, _('Table'),
@@ -546,6 +610,49 @@ Error: %s""") % six.text_type(e))
         # NOTE(danms): Return nonzero if we archived something
         return int(bool(table_to_rows_archived))
 
+    @staticmethod
+    def _archive_cell(ctxt, cell_mapping, max_rows, purge, workers,
+                      markers):
+        """Archive up to max_rows deleted rows from the database of a cell.
+
+        If cell_mapping is None, the main database is archived.
+        """
+        if cell_mapping is None:
+            return db.archive_deleted_rows(max_rows, context=None,
+                                           purge=purge, markers=markers,
+                                           workers=workers)
+        with context.target_cell(ctxt, cell_mapping) as cctxt:
+            return db.archive_deleted_rows(max_rows, context=cctxt,
+                                           purge=purge, markers=markers,
+                                           workers=workers)
+
+    @staticmethod
+    def _load_archive_checkpoint(checkpoint):
+        """Load the archive markers of each cell from a checkpoint file.
+
+        :returns: dict of cell uuid, or '' for the main database, to a dict
+                  of table name to the primary key of the last row
+                  archived from that table
+        """
+        if not checkpoint or not os.path.exists(checkpoint):
+            return {}
+        with open(checkpoint) as f:
+            return jsonutils.load(f)
+
+    @staticmethod
+    def _save_archive_checkpoint(checkpoint, markers):
+        if not checkpoint:
+            return
+        if not any(markers.values()):
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            return
+        # Write the new checkpoint aside first so that it is never left
+        # truncated if we are interrupted while writing it.
+        with open(checkpoint + '.tmp', 'w') as f:
+            jsonutils.dump(markers, f)
+        os.rename(checkpoint + '.tmp', checkpoint)
+
     @args('--delete', action='store_true', dest='delete',
           help='If specified, automatically delete any records found where '
                'instance_uuid is NULL.')
@@ -1793,6 +1793,7 @@ class API(base.Base):
             LOG.info('instance termination disabled', instance=instance)
             return
 
+        objects.InstanceMapping.clear_cell_cache(instance.uuid)
         cell = None
         # If there is an instance.host (or the instance is shelved-offloaded or
         # in error state), the instance has been scheduled and sent to a
@@ -2248,7 +2249,7 @@ class API(base.Base):
 
     def _get_instance_map_or_none(self, context, instance_uuid):
         try:
-            inst_map = objects.InstanceMapping.get_by_instance_uuid(
+            inst_map = objects.InstanceMapping.get_by_instance_uuid_cached(
                     context, instance_uuid)
         except exception.InstanceMappingNotFound:
             # InstanceMapping should always be found generally. This exception
@@ -2274,8 +2275,14 @@ class API(base.Base):
         inst_map = self._get_instance_map_or_none(context, instance_uuid)
         if inst_map and (inst_map.cell_mapping is not None):
             nova_context.set_target_cell(context, inst_map.cell_mapping)
-            instance = objects.Instance.get_by_uuid(
-                context, instance_uuid, expected_attrs=expected_attrs)
+            try:
+                instance = objects.Instance.get_by_uuid(
+                    context, instance_uuid, expected_attrs=expected_attrs)
+            except exception.InstanceNotFound:
+                # The instance may have been deleted since its mapping was
+                # cached
+                with excutils.save_and_reraise_exception():
+                    objects.InstanceMapping.clear_cell_cache(instance_uuid)
         elif inst_map and (inst_map.cell_mapping is None):
             # This means the instance has not been scheduled and put in
             # a cell yet. For now it also may mean that the deployer
@@ -2340,6 +2347,9 @@ class API(base.Base):
         secondary sort ket, etc.). For each sort key, the associated sort
         direction is based on the list of sort directions in the 'sort_dirs'
         parameter.
+
+        The instances are loaded with the attributes in 'expected_attrs',
+        or with their metadata, info_cache and security_groups if it is None.
         """
         if search_opts is None:
             search_opts = {}
@@ -2449,9 +2459,13 @@ class API(base.Base):
         # neutron (which is the default) but if you're using neutron then the
         # security_group_instance_association table should be empty anyway
         # and the DB should optimize out that join, making it insignificant.
-        fields = ['metadata', 'info_cache', 'security_groups']
-        if expected_attrs:
-            fields.extend(expected_attrs)
+        if expected_attrs is None:
+            fields = ['metadata', 'info_cache', 'security_groups']
+        else:
+            fields = list(expected_attrs)
+        # NOTE: The IP filter below is applied to the info_cache.
+        if filter_ip and 'info_cache' not in fields:
+            fields.append('info_cache')
 
         if CONF.cells.enable:
             insts = self._do_old_style_instance_list_for_poor_cellsv1_users(
@@ -3294,6 +3308,7 @@ class API(base.Base):
         host_name is always None in the resize case.
         host_name can be set in the cold migration case only.
         """
+        objects.InstanceMapping.clear_cell_cache(instance.uuid)
         if host_name is not None:
             # Cannot migrate to the host where the instance exists
             # because it is useless.
@@ -4197,6 +4212,7 @@ class API(base.Base):
         """Migrate a server lively to a new host."""
         LOG.debug("Going to try to live migrate instance to %s",
                   host_name or "another host", instance=instance)
+        objects.InstanceMapping.clear_cell_cache(instance.uuid)
 
         instance.task_state = task_states.MIGRATING
         instance.save(expected_task_state=[None])
@@ -4330,6 +4346,7 @@ class API(base.Base):
 
         """
         LOG.debug('vm evacuation scheduled', instance=instance)
+        objects.InstanceMapping.clear_cell_cache(instance.uuid)
         inst_host = instance.host
         service = objects.Service.get_by_compute_host(context, inst_host)
         if self.servicegroup_api.service_is_up(service):
@@ -4603,7 +4620,7 @@ def target_host_cell(fn):
 
     @functools.wraps(fn)
     def targeted(self, context, host, *args, **kwargs):
-        mapping = objects.HostMapping.get_by_host(context, host)
+        mapping = objects.HostMapping.get_by_host_cached(context, host)
         nova_context.set_target_cell(context, mapping.cell_mapping)
         return fn(self, context, host, *args, **kwargs)
     return targeted
@@ -5118,7 +5135,8 @@ class AggregateAPI(base.Base):
         # validates the host; HostMappingNotFound or ComputeHostNotFound
         # is raised if invalid
         try:
-            mapping = objects.HostMapping.get_by_host(context, host_name)
+            mapping = objects.HostMapping.get_by_host_cached(context,
+                                                             host_name)
             nova_context.set_target_cell(context, mapping.cell_mapping)
             objects.Service.get_by_compute_host(context, host_name)
         except exception.HostMappingNotFound:
@@ -5167,7 +5185,7 @@ class AggregateAPI(base.Base):
                                                     aggregate_payload)
         # validates the host; HostMappingNotFound or ComputeHostNotFound
         # is raised if invalid
-        mapping = objects.HostMapping.get_by_host(context, host_name)
+        mapping = objects.HostMapping.get_by_host_cached(context, host_name)
         nova_context.set_target_cell(context, mapping.cell_mapping)
         objects.Service.get_by_compute_host(context, host_name)
         aggregate = objects.Aggregate.get_by_id(context, aggregate_id)
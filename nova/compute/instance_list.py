@@ -13,6 +13,7 @@
 import copy
 
 from nova.compute import multi_cell_list
+import nova.conf
 from nova import context
 from nova import db
 from nova import exception
@@ -20,6 +21,9 @@ from nova import objects
 from nova.objects import instance as instance_obj
 
 
+CONF = nova.conf.CONF
+
+
 class InstanceSortContext(multi_cell_list.RecordSortContext):
     def __init__(self, sort_keys, sort_dirs):
         if not sort_keys:
@@ -41,9 +45,12 @@ class InstanceSortContext(multi_cell_list.RecordSortContext):
 
 
 class InstanceLister(multi_cell_list.CrossCellLister):
+    supports_marker_values = True
+
     def __init__(self, sort_keys, sort_dirs):
         super(InstanceLister, self).__init__(
-            InstanceSortContext(sort_keys, sort_dirs))
+            InstanceSortContext(sort_keys, sort_dirs),
+            batch_size=CONF.api.instance_list_cells_batch_size)
 
     @property
     def marker_identifier(self):
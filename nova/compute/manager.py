@@ -107,6 +107,19 @@ wrap_exception = functools.partial(exception_wrapper.wrap_exception,
                                    get_notifier=get_notifier,
                                    binary='nova-compute')
 
+# The hypervisor power states for which _sync_instance_power_state takes no
+# action for a given vm_state, provided the DB power_state already matches.
+# vm_states which are not listed here are never acted upon.
+_SYNCED_POWER_STATES = {
+    vm_states.ACTIVE: (power_state.RUNNING,),
+    vm_states.STOPPED: (power_state.NOSTATE, power_state.SHUTDOWN,
+                        power_state.CRASHED),
+    vm_states.PAUSED: (power_state.NOSTATE, power_state.RUNNING,
+                       power_state.PAUSED, power_state.SUSPENDED),
+    vm_states.SOFT_DELETED: (power_state.NOSTATE, power_state.SHUTDOWN),
+    vm_states.DELETED: (power_state.NOSTATE, power_state.SHUTDOWN),
+}
+
 
 @contextlib.contextmanager
 def errors_out_migration_ctxt(migration):
@@ -516,6 +529,10 @@ class ComputeManager(manager.Manager):
         self._sync_power_pool = eventlet.GreenPool(
             size=CONF.sync_power_state_pool_size)
         self._syncs_in_progress = {}
+        self._instance_uuids_to_heal = []
+        self._instance_uuids_network_changed = set()
+        self._update_resources_pool = eventlet.GreenPool(
+            size=CONF.update_resources_pool_size)
         self.send_instance_updates = (
             CONF.filter_scheduler.track_instance_changes)
         if CONF.max_concurrent_builds != 0:
@@ -658,13 +675,26 @@ class ComputeManager(manager.Manager):
         # we cannot rely on the resource tracker here.
         compute_nodes = {}
 
+        # Fetch the network info of all the evacuated instances at once;
+        # the ones which fail are retried below one at a time.
+        try:
+            network_infos = self.network_api.get_instances_nw_info(
+                context, evacuated)
+        except Exception:
+            LOG.warning('Failed to get the network info of the evacuated '
+                        'instances at once, getting it one instance at a '
+                        'time.', exc_info=True)
+            network_infos = {}
+
         for instance in evacuated:
             migration = evacuations[instance.uuid]
             LOG.info('Deleting instance as it has been evacuated from '
                      'this host', instance=instance)
             try:
-                network_info = self.network_api.get_instance_nw_info(
-                    context, instance)
+                network_info = network_infos.get(instance.uuid)
+                if network_info is None:
+                    network_info = self.network_api.get_instance_nw_info(
+                        context, instance)
                 bdi = self._get_instance_block_device_info(context,
                                                            instance)
                 destroy_disks = not (self._is_instance_storage_shared(
@@ -1134,10 +1164,16 @@ class ComputeManager(manager.Manager):
         if CONF.placement.os_region_name is None:
             raise exception.PlacementNotConfigured()
 
-        self.driver.init_host(host=self.host)
+        with timeutils.StopWatch() as timer:
+            self.driver.init_host(host=self.host)
+        LOG.debug('Took %0.2f seconds to initialize the driver.',
+                  timer.elapsed())
         context = nova.context.get_admin_context()
-        instances = objects.InstanceList.get_by_host(
-            context, self.host, expected_attrs=['info_cache', 'metadata'])
+        with timeutils.StopWatch() as timer:
+            instances = objects.InstanceList.get_by_host(
+                context, self.host, expected_attrs=['info_cache', 'metadata'])
+        LOG.debug('Took %(time)0.2f seconds to load %(num)d instances.',
+                  {'time': timer.elapsed(), 'num': len(instances)})
 
         if CONF.defer_iptables_apply:
             self.driver.filter_defer_apply_on()
@@ -1146,9 +1182,15 @@ class ComputeManager(manager.Manager):
 
         try:
             # checking that instance was not already evacuated to other host
-            self._destroy_evacuated_instances(context)
-            for instance in instances:
-                self._init_instance(context, instance)
+            with timeutils.StopWatch() as timer:
+                self._destroy_evacuated_instances(context)
+            LOG.debug('Took %0.2f seconds to destroy evacuated instances.',
+                      timer.elapsed())
+            with timeutils.StopWatch() as timer:
+                self._init_instances(context, instances)
+            LOG.info('Took %(time)0.2f seconds to initialize %(num)d '
+                     'instances.', {'time': timer.elapsed(),
+                                    'num': len(instances)})
         finally:
             if CONF.defer_iptables_apply:
                 self.driver.filter_defer_apply_off()
@@ -1161,10 +1203,35 @@ class ComputeManager(manager.Manager):
                 # _sync_scheduler_instance_info periodic task will.
                 self._update_scheduler_instance_info(context, instances)
 
+    def _init_instances(self, context, instances):
+        """Initialize the instances of this host during service init.
+
+        Up to CONF.init_host_pool_size instances are initialized at the same
+        time, started in the order they are given. This returns once all of
+        them are done. A failure to initialize one instance is logged and
+        does not prevent the others from being initialized.
+        """
+        def _init(instance):
+            with timeutils.StopWatch() as timer:
+                try:
+                    self._init_instance(context, instance)
+                except Exception:
+                    # we don't want that an exception blocks the init_host
+                    LOG.exception('Failed to initialize instance',
+                                  instance=instance)
+            LOG.debug('Took %0.2f seconds to initialize instance.',
+                      timer.elapsed(), instance=instance)
+
+        pool = eventlet.GreenPool(size=CONF.init_host_pool_size)
+        for instance in instances:
+            pool.spawn_n(_init, instance)
+        pool.waitall()
+
     def cleanup_host(self):
         self.driver.register_event_listener(None)
         self.instance_events.cancel_all_events()
         self.driver.cleanup_host(host=self.host)
+        compute_utils.flush_action_events()
 
     def pre_start_hook(self):
         """After the service is initialized, but before we fully bring
@@ -6552,100 +6619,118 @@ class ComputeManager(manager.Manager):
         spacing=CONF.heal_instance_info_cache_interval)
     def _heal_instance_info_cache(self, context):
         """Called periodically.  On every call, try to update the
-        info_cache's network information for another instance by
+        info_cache's network information for a batch of instances by
         calling to the network manager.
 
-        This is implemented by keeping a cache of uuids of instances
-        that live on this host.  On each call, we pop one off of a
-        list, pull the DB record, and try the call to the network API.
-        If anything errors don't fail, as it's possible the instance
-        has been deleted, etc.
+        This is implemented by keeping a list of uuids of instances
+        that live on this host, ordered so that instances which recently
+        received a network-changed event come first, followed by those
+        with the oldest info_cache.  On each call, we pop up to
+        CONF.heal_instance_info_cache_batch_size off of the list, pull
+        the DB records, and refresh them with a single call to the
+        network API.  If anything errors don't fail, as it's possible the
+        instance has been deleted, etc.
         """
         heal_interval = CONF.heal_instance_info_cache_interval
         if not heal_interval:
             return
 
-        instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
-        instance = None
-
         LOG.debug('Starting heal instance info cache')
 
-        if not instance_uuids:
+        if not self._instance_uuids_to_heal:
             # The list of instances to heal is empty so rebuild it
             LOG.debug('Rebuilding the list of instances to heal')
-            db_instances = objects.InstanceList.get_by_host(
-                context, self.host, expected_attrs=[], use_slave=True)
-            for inst in db_instances:
-                # We don't want to refresh the cache for instances
-                # which are building or deleting so don't put them
-                # in the list. If they are building they will get
-                # added to the list next time we build it.
-                if (inst.vm_state == vm_states.BUILDING):
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is Building.', instance=inst)
-                    continue
-                if (inst.task_state == task_states.DELETING):
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is being deleted.', instance=inst)
-                    continue
+            self._instance_uuids_to_heal = self._get_instance_uuids_to_heal(
+                context)
+        elif self._instance_uuids_network_changed:
+            # Move instances with a recent network-changed event to the
+            # front, keeping the relative order of the rest.
+            changed = self._instance_uuids_network_changed
+            self._instance_uuids_to_heal.sort(key=lambda u: u not in changed)
+
+        instances = []
+        while self._instance_uuids_to_heal and not instances:
+            batch_size = CONF.heal_instance_info_cache_batch_size
+            batch = self._instance_uuids_to_heal[:batch_size]
+            del self._instance_uuids_to_heal[:batch_size]
+            self._instance_uuids_network_changed.difference_update(batch)
+            instances = self._get_instances_to_heal(context, batch)
+
+        if instances:
+            # We have instances now to refresh. Calling to the network API
+            # to get their info will force an update to their info_cache.
+            healed = self.network_api.get_instances_nw_info(context,
+                                                            instances)
+            LOG.debug('Updated the network info_cache for %(healed)d of '
+                      '%(total)d instances',
+                      {'healed': len(healed), 'total': len(instances)})
+        else:
+            LOG.debug("Didn't find any instances for network info cache "
+                      "update.")
 
-                if not instance:
-                    # Save the first one we find so we don't
-                    # have to get it again
-                    instance = inst
-                else:
-                    instance_uuids.append(inst['uuid'])
+    def _get_instance_uuids_to_heal(self, context):
+        """Return the uuids of the instances on this host which need their
+        info_cache healed, most urgent first.
+        """
+        db_instances = objects.InstanceList.get_by_host(
+            context, self.host, expected_attrs=['info_cache'],
+            use_slave=True)
+        # Forget the network-changed events of the instances which were
+        # deleted or moved off this host since they were received.
+        self._instance_uuids_network_changed.intersection_update(
+            inst.uuid for inst in db_instances)
+        candidates = []
+        for inst in db_instances:
+            # We don't want to refresh the cache for instances
+            # which are building or deleting so don't put them
+            # in the list. If they are building they will get
+            # added to the list next time we build it.
+            if (inst.vm_state == vm_states.BUILDING):
+                LOG.debug('Skipping network cache update for instance '
+                          'because it is Building.', instance=inst)
+                continue
+            if (inst.task_state == task_states.DELETING):
+                LOG.debug('Skipping network cache update for instance '
+                          'because it is being deleted.', instance=inst)
+                continue
+            candidates.append(inst)
 
-            self._instance_uuids_to_heal = instance_uuids
-        else:
-            # Find the next valid instance on the list
-            while instance_uuids:
-                try:
-                    inst = objects.Instance.get_by_uuid(
-                            context, instance_uuids.pop(0),
-                            expected_attrs=['system_metadata', 'info_cache',
-                                            'flavor'],
-                            use_slave=True)
-                except exception.InstanceNotFound:
-                    # Instance is gone.  Try to grab another.
-                    continue
+        changed = self._instance_uuids_network_changed
 
-                # Check the instance hasn't been migrated
-                if inst.host != self.host:
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it has been migrated to another '
-                              'host.', instance=inst)
-                # Check the instance isn't being deleting
-                elif inst.task_state == task_states.DELETING:
-                    LOG.debug('Skipping network cache update for instance '
-                              'because it is being deleted.', instance=inst)
-                else:
-                    instance = inst
-                    break
+        def _priority(inst):
+            # Instances with a recent network-changed event go first, then
+            # those without an info_cache, then the least recently updated.
+            updated_at = None
+            if inst.info_cache is not None:
+                updated_at = inst.info_cache.updated_at
+            return (inst.uuid not in changed, updated_at is not None,
+                    updated_at)
 
-        if instance:
-            # We have an instance now to refresh
-            try:
-                # Call to network API to get instance info.. this will
-                # force an update to the instance's info_cache
-                self.network_api.get_instance_nw_info(context, instance)
-                LOG.debug('Updated the network info_cache for instance',
-                          instance=instance)
-            except exception.InstanceNotFound:
-                # Instance is gone.
-                LOG.debug('Instance no longer exists. Unable to refresh',
-                          instance=instance)
-                return
-            except exception.InstanceInfoCacheNotFound:
-                # InstanceInfoCache is gone.
-                LOG.debug('InstanceInfoCache no longer exists. '
-                          'Unable to refresh', instance=instance)
-            except Exception:
-                LOG.error('An error occurred while refreshing the network '
-                          'cache.', instance=instance, exc_info=True)
-        else:
-            LOG.debug("Didn't find any instances for network info cache "
-                      "update.")
+        return [inst.uuid for inst in sorted(candidates, key=_priority)]
+
+    def _get_instances_to_heal(self, context, instance_uuids):
+        """Load the given instances, dropping any that should no longer be
+        healed by this host.
+        """
+        filters = {'uuid': instance_uuids, 'deleted': False}
+        db_instances = objects.InstanceList.get_by_filters(
+            context, filters,
+            expected_attrs=['system_metadata', 'info_cache', 'flavor'],
+            use_slave=True)
+        instances = []
+        for inst in db_instances:
+            # Check the instance hasn't been migrated
+            if inst.host != self.host:
+                LOG.debug('Skipping network cache update for instance '
+                          'because it has been migrated to another '
+                          'host.', instance=inst)
+            # Check the instance isn't being deleting
+            elif inst.task_state == task_states.DELETING:
+                LOG.debug('Skipping network cache update for instance '
+                          'because it is being deleted.', instance=inst)
+            else:
+                instances.append(inst)
+        return instances
 
     @periodic_task.periodic_task
     def _poll_rebooting_instances(self, context):
@@ -6674,6 +6759,8 @@ class ComputeManager(manager.Manager):
             rescued_instances = objects.InstanceList.get_by_filters(
                 context, filters, expected_attrs=["system_metadata"],
                 use_slave=True)
+            if not rescued_instances:
+                return manager.PERIODIC_TASK_IDLE
 
             to_unrescue = []
             for instance in rescued_instances:
@@ -6692,6 +6779,8 @@ class ComputeManager(manager.Manager):
         migrations = objects.MigrationList.get_unconfirmed_by_dest_compute(
                 context, CONF.resize_confirm_window, self.host,
                 use_slave=True)
+        if not migrations:
+            return manager.PERIODIC_TASK_IDLE
 
         migrations_info = dict(migration_count=len(migrations),
                 confirm_window=CONF.resize_confirm_window)
@@ -6891,26 +6980,29 @@ class ComputeManager(manager.Manager):
                 return
 
             refreshed = timeutils.utcnow()
+            curr_usages = self._get_bw_usages(
+                context, [bw_ctr['uuid'] for bw_ctr in bw_counters],
+                start_time)
+            prev_usages = self._get_bw_usages(
+                context, [bw_ctr['uuid'] for bw_ctr in bw_counters
+                          if (bw_ctr['uuid'], bw_ctr['mac_address'])
+                          not in curr_usages],
+                prev_time)
+            usages = []
             for bw_ctr in bw_counters:
-                # Allow switching of greenthreads between queries.
-                greenthread.sleep(0)
                 bw_in = 0
                 bw_out = 0
                 last_ctr_in = None
                 last_ctr_out = None
-                usage = objects.BandwidthUsage.get_by_instance_uuid_and_mac(
-                    context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                    start_period=start_time, use_slave=True)
+                key = (bw_ctr['uuid'], bw_ctr['mac_address'])
+                usage = curr_usages.get(key)
                 if usage:
                     bw_in = usage.bw_in
                     bw_out = usage.bw_out
                     last_ctr_in = usage.last_ctr_in
                     last_ctr_out = usage.last_ctr_out
                 else:
-                    usage = (objects.BandwidthUsage.
-                             get_by_instance_uuid_and_mac(
-                        context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                        start_period=prev_time, use_slave=True))
+                    usage = prev_usages.get(key)
                     if usage:
                         last_ctr_in = usage.last_ctr_in
                         last_ctr_out = usage.last_ctr_out
@@ -6929,16 +7021,27 @@ class ComputeManager(manager.Manager):
                     else:
                         bw_out += (bw_ctr['bw_out'] - last_ctr_out)
 
-                objects.BandwidthUsage(context=context).create(
-                                              bw_ctr['uuid'],
-                                              bw_ctr['mac_address'],
-                                              bw_in,
-                                              bw_out,
-                                              bw_ctr['bw_in'],
-                                              bw_ctr['bw_out'],
-                                              start_period=start_time,
-                                              last_refreshed=refreshed,
-                                              update_cells=update_cells)
+                usages.append({'uuid': bw_ctr['uuid'],
+                               'mac': bw_ctr['mac_address'],
+                               'bw_in': bw_in,
+                               'bw_out': bw_out,
+                               'last_ctr_in': bw_ctr['bw_in'],
+                               'last_ctr_out': bw_ctr['bw_out']})
+
+            if usages:
+                objects.BandwidthUsageList.update_all(
+                    context, usages, start_period=start_time,
+                    last_refreshed=refreshed, update_cells=update_cells)
+
+    @staticmethod
+    def _get_bw_usages(context, instance_uuids, start_period):
+        """Return the usages of instances in a period by uuid and mac."""
+        if not instance_uuids:
+            return {}
+        usages = objects.BandwidthUsageList.get_by_uuids(
+            context, list(set(instance_uuids)), start_period=start_period,
+            use_slave=True)
+        return {(usage.instance_uuid, usage.mac): usage for usage in usages}
 
     def _get_host_volume_bdms(self, context, use_slave=False):
         """Return all block device mappings on a compute host."""
@@ -6956,9 +7059,8 @@ class ComputeManager(manager.Manager):
 
     def _update_volume_usage_cache(self, context, vol_usages):
         """Updates the volume usage cache table with a list of stats."""
+        volume_usages = []
         for usage in vol_usages:
-            # Allow switching of greenthreads between queries.
-            greenthread.sleep(0)
             vol_usage = objects.VolumeUsage(context)
             vol_usage.volume_id = usage['volume']
             vol_usage.instance_uuid = usage['instance'].uuid
@@ -6969,7 +7071,12 @@ class ComputeManager(manager.Manager):
             vol_usage.curr_read_bytes = usage['rd_bytes']
             vol_usage.curr_writes = usage['wr_req']
             vol_usage.curr_write_bytes = usage['wr_bytes']
-            vol_usage.save()
+            volume_usages.append(vol_usage)
+        if not volume_usages:
+            return
+
+        objects.VolumeUsage.save_all(context, volume_usages)
+        for vol_usage in volume_usages:
             self.notifier.info(context, 'volume.usage',
                                compute_utils.usage_volume_info(vol_usage))
 
@@ -7018,6 +7125,18 @@ class ComputeManager(manager.Manager):
                         {'num_db_instances': num_db_instances,
                          'num_vm_instances': num_vm_instances})
 
+        # Ask the driver for every power state in one go so that only the
+        # instances which actually need attention are locked and re-queried.
+        try:
+            vm_power_states = self.driver.get_power_states(db_instances)
+        except NotImplementedError:
+            vm_power_states = {}
+        except Exception:
+            LOG.exception("Failed to get the power states of all instances "
+                          "from the driver, falling back to querying them "
+                          "one at a time.")
+            vm_power_states = {}
+
         def _sync(db_instance):
             # NOTE(melwitt): This must be synchronized as we query state from
             #                two separate sources, the driver and the database.
@@ -7039,6 +7158,10 @@ class ComputeManager(manager.Manager):
             # process syncs asynchronously - don't want instance locking to
             # block entire periodic task thread
             uuid = db_instance.uuid
+            if (uuid in vm_power_states and
+                    self._power_state_in_sync(db_instance,
+                                              vm_power_states[uuid])):
+                continue
             if uuid in self._syncs_in_progress:
                 LOG.debug('Sync already in progress for %s', uuid)
             else:
@@ -7046,6 +7169,19 @@ class ComputeManager(manager.Manager):
                 self._syncs_in_progress[uuid] = True
                 self._sync_power_pool.spawn_n(_sync, db_instance)
 
+    @staticmethod
+    def _power_state_in_sync(db_instance, vm_power_state):
+        """Check whether _sync_instance_power_state would be a no-op.
+
+        This is only a hint based on possibly stale data; any instance for
+        which this returns False goes through the full, locked sync.
+        """
+        if (db_instance.task_state is not None or
+                db_instance.power_state != vm_power_state):
+            return False
+        allowed = _SYNCED_POWER_STATES.get(db_instance.vm_state)
+        return allowed is None or vm_power_state in allowed
+
     def _query_driver_power_state_and_sync(self, context, db_instance):
         if db_instance.task_state is not None:
             LOG.info("During sync_power_state the instance has a "
@@ -7244,6 +7380,8 @@ class ComputeManager(manager.Manager):
             context, filters,
             expected_attrs=objects.instance.INSTANCE_DEFAULT_FIELDS,
             use_slave=True)
+        if not instances:
+            return manager.PERIODIC_TASK_IDLE
         for instance in instances:
             if self._deleted_old_enough(instance, interval):
                 bdms = objects.BlockDeviceMappingList.get_by_instance_uuid(
@@ -7307,8 +7445,12 @@ class ComputeManager(manager.Manager):
                                                             use_slave=True,
                                                             startup=startup)
         nodenames = set(self.driver.get_available_nodes())
+        # NOTE: The resource tracker serializes its audit per node, so nodes
+        # can be audited concurrently, bounded by the size of the pool.
         for nodename in nodenames:
-            self.update_available_resource_for_node(context, nodename)
+            self._update_resources_pool.spawn_n(
+                self.update_available_resource_for_node, context, nodename)
+        self._update_resources_pool.waitall()
 
         # Delete orphan compute node not reported by driver but still in db
         for cn in compute_nodes_in_db:
@@ -7613,6 +7755,9 @@ class ComputeManager(manager.Manager):
                       {'event': event.key},
                       instance=instance)
             if event.name == 'network-changed':
+                # NOTE: Neutron may still be settling, so have the next
+                # info cache heal pick this instance up first as well.
+                self._instance_uuids_network_changed.add(instance.uuid)
                 try:
                     self.network_api.get_instance_nw_info(context, instance)
                 except exception.NotFound as e:
@@ -7682,6 +7827,7 @@ class ComputeManager(manager.Manager):
                         'to values >=1. Update your configuration file to '
                         'mitigate future upgrade issues.')
 
+        to_save = []
         for instance in instances:
             attempts = int(instance.system_metadata.get('clean_attempts', '0'))
             LOG.debug('Instance has had %(attempts)s of %(max)s '
@@ -7695,8 +7841,16 @@ class ComputeManager(manager.Manager):
                 instance.system_metadata['clean_attempts'] = str(attempts + 1)
                 if success:
                     instance.cleaned = True
-                with utils.temporary_mutation(context, read_deleted='yes'):
-                    instance.save()
+                to_save.append(instance)
+
+        # NOTE: save the instances in one go, which is a single round-trip
+        # to the conductor.
+        with utils.temporary_mutation(context, read_deleted='yes'):
+            errors = obj_base.obj_save_all(to_save)
+        for instance, error in zip(to_save, errors):
+            if error is not None:
+                LOG.warning('Failed to save the cleanup state of the '
+                            'instance: %s', error, instance=instance)
 
     @periodic_task.periodic_task(spacing=CONF.instance_delete_interval)
     def _cleanup_incomplete_migrations(self, context):
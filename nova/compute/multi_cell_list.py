@@ -18,6 +18,7 @@ import itertools
 import six
 
 from nova import context
+from nova import exception
 
 
 class RecordSortContext(object):
@@ -71,9 +72,55 @@ class CrossCellLister(object):
     The external interface is the get_records_sorted() method. You should
     implement this if you need to efficiently list your data type from
     cell databases.
+
+    Records are fetched from each cell in batches of batch_size records,
+    as the results are consumed. If batch_size is None, each cell is
+    queried once for up to the requested limit of records.
+
+    If supports_marker_values is True, get_by_filters() is passed a
+    marker_values list with the values of the sort keys after which to list
+    records, instead of a marker identifier. This avoids looking up a marker
+    record in each cell for every query.
     """
-    def __init__(self, sort_ctx):
+    supports_marker_values = False
+
+    def __init__(self, sort_ctx, batch_size=None):
         self.sort_ctx = sort_ctx
+        self.batch_size = batch_size
+
+    def _get_by_filters_after(self, ctx, filters, limit, record, **kwargs):
+        """List records by filters, sorted and paginated after a record."""
+        if self.supports_marker_values:
+            return self.get_by_filters(
+                ctx, filters, limit=limit, marker=None,
+                marker_values=[record[key]
+                               for key in self.sort_ctx.sort_keys],
+                **kwargs)
+        marker_id = self.marker_identifier
+        try:
+            return self.get_by_filters(ctx, filters, limit=limit,
+                                       marker=record[marker_id], **kwargs)
+        except exception.MarkerNotFound:
+            # NOTE: The record was deleted since it was listed, for
+            # instance by an archive or a purge. This marker was not sent
+            # by the user, so continue with the record that now follows
+            # the values of its sort keys, as is done for the cells which
+            # do not hold the global marker.
+            pass
+        local_marker = self.get_marker_by_values(
+            ctx, [record[key] for key in self.sort_ctx.sort_keys])
+        if not local_marker:
+            return []
+        local_marker_filters = copy.copy(filters)
+        if marker_id not in local_marker_filters:
+            local_marker_filters[marker_id] = [local_marker]
+        records = list(self.get_by_filters(
+            ctx, local_marker_filters, limit=1, marker=None, **kwargs))
+        if len(records) < limit:
+            records.extend(self.get_by_filters(
+                ctx, filters, limit=limit - len(records),
+                marker=local_marker, **kwargs))
+        return records
 
     @property
     @abc.abstractmethod
@@ -151,10 +198,12 @@ class CrossCellLister(object):
         This function is a generator of records from the database like what you
         would get from instance_get_all_by_filters_sort() in the DB API.
 
-        NOTE: Since we do these in parallel, a nonzero limit will be passed
-        to each database query, although the limit will be enforced in the
-        output of this function. Meaning, we will still query $limit from each
-        database, but only return $limit total results.
+        NOTE: Since we do these in parallel, the first batch of records
+        is queried from each database at once, even though the limit will be
+        enforced in the output of this function. Further batches are only
+        queried from a database once the previous one has been consumed by
+        the merge, so that we do not hold up to $limit records per database
+        in memory when only $limit total results are returned.
 
         """
 
@@ -169,6 +218,31 @@ class CrossCellLister(object):
             global_marker_values = [global_marker_record[key]
                                     for key in self.sort_ctx.sort_keys]
 
+        batch_size = self.batch_size or limit
+        if limit and batch_size:
+            batch_size = min(batch_size, limit)
+
+        def query_batches(ctx, first_batch):
+            """Generate the records of a cell, querying them in batches.
+
+            The first batch is queried in parallel by do_query() and
+            further batches are queried by the caller as it iterates the
+            results, starting after the last record of the previous batch.
+            """
+            remaining = limit
+            batch = first_batch
+            while True:
+                for record in batch:
+                    yield record
+                if remaining:
+                    remaining -= len(batch)
+                if not batch_size or len(batch) < batch_size or (
+                        limit and remaining <= 0):
+                    return
+                batch = self._get_by_filters_after(
+                    ctx, filters, min(batch_size, remaining or batch_size),
+                    batch[-1], **kwargs)
+
         def do_query(ctx):
             """Generate RecordWrapper(record) objects from a cell.
 
@@ -194,6 +268,17 @@ class CrossCellLister(object):
 
             marker_id = self.marker_identifier
 
+            if marker and self.supports_marker_values:
+                # We can list the records after the values of the global
+                # marker in each cell directly, whether or not the marker
+                # record is in this cell, without looking up a local
+                # marker.
+                main_query_result = self.get_by_filters(
+                    ctx, filters, limit=batch_size, marker=None,
+                    marker_values=global_marker_values, **kwargs)
+                return (RecordWrapper(self.sort_ctx, inst) for inst in
+                        query_batches(ctx, main_query_result))
+
             if marker:
                 # FIXME(danms): If we knew which cell we were in here, we could
                 # avoid looking up the marker again. But, we don't currently.
@@ -233,10 +318,10 @@ class CrossCellLister(object):
                     # full unpaginated set for our cell.
                     return []
 
-            main_query_result = self.get_by_filters(
-                ctx, filters,
-                limit=limit, marker=local_marker,
-                **kwargs)
+            main_query_result = query_batches(
+                ctx, self.get_by_filters(ctx, filters,
+                                         limit=batch_size, marker=local_marker,
+                                         **kwargs))
 
             return (RecordWrapper(self.sort_ctx, inst) for inst in
                     itertools.chain(local_marker_prefix, main_query_result))
@@ -247,19 +332,19 @@ class CrossCellLister(object):
         # handle this anywhere yet anyway.
         results = context.scatter_gather_all_cells(ctx, do_query)
 
-        # If a limit was provided, it was passed to the per-cell query
-        # routines.  That means we have NUM_CELLS * limit items across
-        # results. So, we need to consume from that limit below and
-        # stop returning results.
-        limit = limit or 0
+        # If a limit was provided, the per-cell generators may together
+        # yield up to NUM_CELLS * limit items. So, we need to consume from
+        # that limit below and stop returning results, which also stops
+        # querying further batches from the cells.
+        remaining = limit or 0
 
         # Generate results from heapq so we can return the inner
         # instance instead of the wrapper. This is basically free
         # as it works as our caller iterates the results.
         for i in heapq.merge(*results.values()):
             yield i._db_record
-            limit -= 1
-            if limit == 0:
+            remaining -= 1
+            if remaining == 0:
                 # We'll only hit this if limit was nonzero and we just
                 # generated our last one
                 return
@@ -31,22 +31,65 @@ LOG = logging.getLogger(__name__)
 _LOCK_NAME = 'provider-tree-lock'
 
 # Point-in-time representation of a resource provider in the tree.
-# Note that, whereas namedtuple enforces read-only-ness of instances as a
-# whole, nothing prevents modification of the internals of attributes of
-# complex types (children/inventory/traits/aggregates).  However, any such
-# modifications still have no effect on the ProviderTree the instance came
-# from.  Like, you can Sharpie a moustache on a Polaroid of my face, but that
-# doesn't make a moustache appear on my actual face.
+# The complex attributes (inventory/traits/aggregates) are immutable and are
+# shared by reference with the _Provider they came from: the tree never
+# modifies them in place, but replaces them wholesale whenever they change
+# (copy-on-write).  So taking a snapshot is cheap, and a snapshot is still a
+# faithful Polaroid of the provider at the time it was taken, no matter what
+# happens to the tree afterward.  If you want to Sharpie a moustache on it,
+# make a copy first.
 ProviderData = collections.namedtuple(
     'ProviderData', ['uuid', 'name', 'generation', 'parent_uuid', 'inventory',
                      'traits', 'aggregates'])
 
 
+class _ReadOnlyDict(dict):
+    """A dict which refuses to be modified after construction.
+
+    Copies (shallow or deep) of a _ReadOnlyDict are regular, mutable dicts.
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(_("Provider data is read-only"))
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+_EMPTY_INVENTORY = _ReadOnlyDict()
+
+
+def _freeze_inventory(inventory):
+    """Produce an immutable copy of an inventory dict, keyed by resource
+    class, of inventory records.
+    """
+    if not inventory:
+        return _EMPTY_INVENTORY
+    return _ReadOnlyDict(
+        (rc, _ReadOnlyDict(copy.deepcopy(rec)))
+        for rc, rec in inventory.items())
+
+
 class _Provider(object):
     """Represents a resource provider in the tree. All operations against the
     tree should be done using the ProviderTree interface, since it controls
     thread-safety.
+
+    The inventory, traits and aggregates of a _Provider are immutable; they
+    are replaced rather than modified when they change, so they can be handed
+    out by data() without copying.
     """
+    __slots__ = ('uuid', 'name', 'generation', 'parent_uuid', 'children',
+                 'inventory', 'traits', 'aggregates')
+
     def __init__(self, name, uuid=None, generation=None, parent_uuid=None):
         if uuid is None:
             uuid = uuidutils.generate_uuid()
@@ -57,12 +100,12 @@ class _Provider(object):
         # Contains a dict, keyed by uuid of child resource providers having
         # this provider as a parent
         self.children = {}
-        # dict of inventory records, keyed by resource class
-        self.inventory = {}
-        # Set of trait names
-        self.traits = set()
-        # Set of aggregate UUIDs
-        self.aggregates = set()
+        # Read-only dict of inventory records, keyed by resource class
+        self.inventory = _EMPTY_INVENTORY
+        # Frozen set of trait names
+        self.traits = frozenset()
+        # Frozen set of aggregate UUIDs
+        self.aggregates = frozenset()
 
     @classmethod
     def from_dict(cls, pdict):
@@ -78,12 +121,11 @@ class _Provider(object):
                    parent_uuid=pdict.get('parent_provider_uuid'))
 
     def data(self):
-        inventory = copy.deepcopy(self.inventory)
-        traits = copy.copy(self.traits)
-        aggregates = copy.copy(self.aggregates)
+        # No copying needed: the complex attributes are immutable and are
+        # replaced, never modified, by the update_* methods.
         return ProviderData(
             self.uuid, self.name, self.generation, self.parent_uuid,
-            inventory, traits, aggregates)
+            self.inventory, self.traits, self.aggregates)
 
     def get_provider_uuids(self):
         """Returns a list, in top-down traversal order, of UUIDs of this
@@ -160,7 +202,7 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.has_inventory_changed(inventory):
-            self.inventory = copy.deepcopy(inventory)
+            self.inventory = _freeze_inventory(inventory)
             return True
         return False
 
@@ -175,7 +217,7 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.have_traits_changed(new):
-            self.traits = set(new)  # create a copy of the new traits
+            self.traits = frozenset(new)  # create a copy of the new traits
             return True
         return False
 
@@ -200,7 +242,8 @@ class _Provider(object):
         """
         self._update_generation(generation)
         if self.have_aggregates_changed(new):
-            self.aggregates = set(new)  # create a copy of the new aggregates
+            # create a copy of the new aggregates
+            self.aggregates = frozenset(new)
             return True
         return False
 
@@ -221,6 +264,9 @@ class ProviderTree(object):
         """Create an empty provider tree."""
         self.lock = lockutils.internal_lock(_LOCK_NAME)
         self.roots = []
+        # Index of every _Provider in the tree, keyed by UUID, so lookups by
+        # UUID don't have to walk the tree.
+        self._by_uuid = {}
 
     def get_provider_uuids(self, name_or_uuid=None):
         """Return a list, in top-down traversable order, of the UUIDs of all
@@ -242,6 +288,40 @@ class ProviderTree(object):
                 ret.extend(root.get_provider_uuids())
         return ret
 
+    @staticmethod
+    def _insertion_order(to_add_by_uuid):
+        """Return the UUIDs of the providers in to_add_by_uuid ordered such
+        that each provider comes after its parent, if the parent is also
+        being added.
+
+        :raises: ValueError if the parentage of the providers contains a
+                 cycle.
+        """
+        ordered = []
+        done = set()
+        for uuid in to_add_by_uuid:
+            # Walk up the ancestry until we reach a provider that is already
+            # ordered or isn't being added at all, then emit top-down.
+            path = []
+            seen = set()
+            cur = uuid
+            while cur in to_add_by_uuid and cur not in done:
+                if cur in seen:
+                    # This should never happen for data coming from
+                    # placement, since it can't represent a cycle.  But to
+                    # quell the paranoia...
+                    raise ValueError(
+                        _("Unexpectedly failed to find parents already in the"
+                          "tree for any of the following: %s") %
+                        ','.join(seen))
+                seen.add(cur)
+                path.append(cur)
+                cur = to_add_by_uuid[cur].get('parent_provider_uuid')
+            path.reverse()
+            ordered.extend(path)
+            done.update(path)
+        return ordered
+
     def populate_from_iterable(self, provider_dicts):
         """Populates this ProviderTree from an iterable of provider dicts.
 
@@ -265,65 +345,41 @@ class ProviderTree(object):
         # *adding* via this method.
         to_add_by_uuid = {pd['uuid']: pd for pd in provider_dicts}
 
+        # Do as much of the work as possible before taking the lock, so
+        # readers of the tree aren't held up while we build new providers.
+        providers = [_Provider.from_dict(to_add_by_uuid[uuid])
+                     for uuid in self._insertion_order(to_add_by_uuid)]
+
         with self.lock:
             # Sanity check for orphans.  Every parent UUID must either be None
             # (the provider is a root), or be in the tree already, or exist as
             # a key in to_add_by_uuid (we're adding it).
-            all_parents = set([None]) | set(to_add_by_uuid)
-            # NOTE(efried): Can't use get_provider_uuids directly because we're
-            # already under lock.
-            for root in self.roots:
-                all_parents |= set(root.get_provider_uuids())
             missing_parents = set()
-            for pd in to_add_by_uuid.values():
-                parent_uuid = pd.get('parent_provider_uuid')
-                if parent_uuid not in all_parents:
+            for provider in providers:
+                parent_uuid = provider.parent_uuid
+                if (parent_uuid is not None and
+                        parent_uuid not in to_add_by_uuid and
+                        parent_uuid not in self._by_uuid):
                     missing_parents.add(parent_uuid)
             if missing_parents:
                 raise ValueError(
                     _("The following parents were not found: %s") %
                     ', '.join(missing_parents))
 
-            # Ready to do the work.
-            # Use to_add_by_uuid to keep track of which providers are left to
-            # be added.
-            while to_add_by_uuid:
-                # Find a provider that's suitable to inject.
-                for uuid, pd in to_add_by_uuid.items():
-                    # Roots are always okay to inject (None won't be a key in
-                    # to_add_by_uuid).  Otherwise, we have to make sure we
-                    # already added the parent (and, by recursion, all
-                    # ancestors) if present in the input.
-                    parent_uuid = pd.get('parent_provider_uuid')
-                    if parent_uuid not in to_add_by_uuid:
-                        break
-                else:
-                    # This should never happen - we already ensured all parents
-                    # exist in the tree, which means we can't have any branches
-                    # that don't wind up at the root, which means we can't have
-                    # cycles.  But to quell the paranoia...
-                    raise ValueError(
-                        _("Unexpectedly failed to find parents already in the"
-                          "tree for any of the following: %s") %
-                        ','.join(set(to_add_by_uuid)))
-
-                # Add or replace the provider, either as a root or under its
-                # parent
-                try:
-                    self._remove_with_lock(uuid)
-                except ValueError:
-                    # Wasn't there in the first place - fine.
-                    pass
-
-                provider = _Provider.from_dict(pd)
-                if parent_uuid is None:
-                    self.roots.append(provider)
-                else:
-                    parent = self._find_with_lock(parent_uuid)
-                    parent.add_child(provider)
-
-                # Remove this entry to signify we're done with it.
-                to_add_by_uuid.pop(uuid)
+            # Ready to do the work.  Add or replace each provider, either as a
+            # root or under its parent.  Parents are always handled before
+            # their children.
+            for provider in providers:
+                if provider.uuid in self._by_uuid:
+                    self._remove_with_lock(provider.uuid)
+                self._add_with_lock(provider)
+
+    def _add_with_lock(self, provider):
+        if provider.parent_uuid is None:
+            self.roots.append(provider)
+        else:
+            self._by_uuid[provider.parent_uuid].add_child(provider)
+        self._by_uuid[provider.uuid] = provider
 
     def _remove_with_lock(self, name_or_uuid):
         found = self._find_with_lock(name_or_uuid)
@@ -332,6 +388,8 @@ class ProviderTree(object):
             parent.remove_child(found)
         else:
             self.roots.remove(found)
+        for uuid in found.get_provider_uuids():
+            self._by_uuid.pop(uuid, None)
 
     def remove(self, name_or_uuid):
         """Safely removes the provider identified by the supplied name_or_uuid
@@ -359,10 +417,13 @@ class ProviderTree(object):
                 raise ValueError(err % uuid)
 
             p = _Provider(name, uuid=uuid, generation=generation)
-            self.roots.append(p)
+            self._add_with_lock(p)
             return p.uuid
 
     def _find_with_lock(self, name_or_uuid):
+        found = self._by_uuid.get(name_or_uuid)
+        if found:
+            return found
         for root in self.roots:
             found = root.find(name_or_uuid)
             if found:
@@ -370,7 +431,11 @@ class ProviderTree(object):
         raise ValueError(_("No such provider %s") % name_or_uuid)
 
     def data(self, name_or_uuid):
-        """Return a point-in-time copy of the specified provider's data.
+        """Return a point-in-time snapshot of the specified provider's data.
+
+        The snapshot shares the provider's (immutable) inventory, traits and
+        aggregates by reference, so this is cheap regardless of the size of
+        the provider's inventory.
 
         :param name_or_uuid: Either name or UUID of the resource provider whose
                              data is to be returned.
@@ -407,7 +472,7 @@ class ProviderTree(object):
         with self.lock:
             parent_node = self._find_with_lock(parent)
             p = _Provider(name, uuid, generation, parent_node.uuid)
-            parent_node.add_child(p)
+            self._add_with_lock(p)
             return p.uuid
 
     def has_inventory(self, name_or_uuid):
@@ -20,9 +20,14 @@ model.
 """
 import collections
 import copy
+import functools
+import inspect
+import time
 
+from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 
 from nova.compute import claims
 from nova.compute import monitors
@@ -41,6 +46,7 @@ from nova.pci import manager as pci_manager
 from nova.pci import request as pci_request
 from nova import rpc
 from nova.scheduler import client as scheduler_client
+from nova.scheduler.client import report
 from nova.scheduler import utils as scheduler_utils
 from nova import utils
 from nova.virt import hardware
@@ -49,6 +55,58 @@ CONF = nova.conf.CONF
 
 LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
+# Compute node usage fields compared against the usage tracked incrementally
+# when a node is fully audited.
+_AUDITED_USAGE_FIELDS = ('vcpus_used', 'memory_mb_used', 'local_gb_used',
+                         'running_vms')
+# Instance fields loaded up front for the audit of a compute node.
+_AUDIT_INSTANCE_ATTRS = ['system_metadata', 'numa_topology', 'flavor',
+                         'migration_context']
+# Compute node fields from which the inventory of the node's resource
+# provider is built when the virt driver does not implement get_inventory().
+_PLACEMENT_FIELDS = ('uuid', 'hypervisor_hostname', 'vcpus', 'memory_mb',
+                     'local_gb', 'cpu_allocation_ratio',
+                     'ram_allocation_ratio', 'disk_allocation_ratio')
+
+
+def _node_semaphore(nodename):
+    """Returns the name of the lock serializing resource tracking operations
+    for a single compute node.
+    """
+    return '%s-%s' % (COMPUTE_RESOURCE_SEMAPHORE, nodename)
+
+
+def _synchronized_by_node(function):
+    """Decorator for ResourceTracker methods taking a nodename argument.
+
+    The decorated method is serialized against any other claim or audit of
+    the same compute node. It must hold _shared_state_lock() itself while it
+    updates the in-memory state of the tracker, so that it does not wait for
+    the database, placement or hypervisor calls made for unrelated nodes.
+    """
+    @functools.wraps(function)
+    def decorated_function(self, *args, **kwargs):
+        nodename = inspect.getcallargs(function, self, *args,
+                                       **kwargs)['nodename']
+
+        @utils.synchronized(_node_semaphore(nodename))
+        def _locked_function():
+            return function(self, *args, **kwargs)
+
+        return _locked_function()
+
+    return decorated_function
+
+
+def _shared_state_lock():
+    """Returns a context manager serializing the changes to the in-memory
+    state of the tracker which is shared by all its compute nodes, e.g. the
+    tracked instances and migrations, stats and PCI devices.
+
+    Nothing should wait on the database, placement or the hypervisor while
+    it is held, since the claims and audits of all the nodes wait for it.
+    """
+    return lockutils.lock(COMPUTE_RESOURCE_SEMAPHORE)
 
 
 def _instance_in_resize_state(instance):
@@ -80,6 +138,30 @@ def _is_trackable_migration(migration):
                                         'evacuation')
 
 
+def _get_changed_fields(compute_node, old_compute):
+    """Returns the set of names of the fields of compute_node which are set
+    to a different value than in old_compute, ignoring updated_at.
+    """
+    changed = set()
+    for field in compute_node.obj_fields:
+        if field == 'updated_at' or not compute_node.obj_attr_is_set(field):
+            continue
+        if (not old_compute.obj_attr_is_set(field) or
+                _field_primitive(getattr(compute_node, field)) !=
+                _field_primitive(getattr(old_compute, field))):
+            changed.add(field)
+    return changed
+
+
+def _field_primitive(value):
+    """Returns a primitive of a compute node field value to compare it,
+    including plain lists of objects like supported_hv_specs.
+    """
+    if isinstance(value, list):
+        return [obj_base.obj_to_primitive(item) for item in value]
+    return obj_base.obj_to_primitive(value)
+
+
 def _normalize_inventory_from_cn_obj(inv_data, cn):
     """Helper function that injects various information from a compute node
     object into the inventory dict returned from the virt driver's
@@ -142,6 +224,11 @@ class ResourceTracker(object):
         monitor_handler = monitors.MonitorHandler(self)
         self.monitors = monitor_handler.monitors
         self.old_resources = collections.defaultdict(objects.ComputeNode)
+        # Time of the last full audit of each node, keyed by nodename
+        self._last_full_audit = {}
+        # Tuples of the inventory last reported to placement for each node,
+        # and when, keyed by nodename
+        self._placement_updates = {}
         self.scheduler_client = scheduler_client.SchedulerClient()
         self.reportclient = self.scheduler_client.reportclient
         self.ram_allocation_ratio = CONF.ram_allocation_ratio
@@ -154,7 +241,7 @@ class ResourceTracker(object):
         except KeyError:
             raise exception.ComputeHostNotFound(host=nodename)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def instance_claim(self, context, instance, nodename, limits=None):
         """Indicate that some resources are needed for an upcoming compute
         instance build operation.
@@ -210,25 +297,28 @@ class ResourceTracker(object):
         cn = self.compute_nodes[nodename]
         pci_requests = objects.InstancePCIRequests.get_by_instance_uuid(
             context, instance.uuid)
-        claim = claims.Claim(context, instance, nodename, self, cn,
-                             pci_requests, overhead=overhead, limits=limits)
+        with _shared_state_lock():
+            claim = claims.Claim(context, instance, nodename, self, cn,
+                                 pci_requests, overhead=overhead,
+                                 limits=limits)
 
         # self._set_instance_host_and_node() will save instance to the DB
         # so set instance.numa_topology first.  We need to make sure
-        # that numa_topology is saved while under COMPUTE_RESOURCE_SEMAPHORE
+        # that numa_topology is saved while under the node's semaphore
         # so that the resource audit knows about any cpus we've pinned.
         instance_numa_topology = claim.claimed_numa_topology
         instance.numa_topology = instance_numa_topology
         self._set_instance_host_and_node(instance, nodename)
 
-        if self.pci_tracker:
-            # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
-            # in _update_usage_from_instance().
-            self.pci_tracker.claim_instance(context, pci_requests,
-                                            instance_numa_topology)
+        with _shared_state_lock():
+            if self.pci_tracker:
+                # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
+                # in _update_usage_from_instance().
+                self.pci_tracker.claim_instance(context, pci_requests,
+                                                instance_numa_topology)
 
-        # Mark resources in-use and update stats
-        self._update_usage_from_instance(context, instance, nodename)
+            # Mark resources in-use and update stats
+            self._update_usage_from_instance(context, instance, nodename)
 
         elevated = context.elevated()
         # persist changes to the compute node:
@@ -236,7 +326,7 @@ class ResourceTracker(object):
 
         return claim
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def rebuild_claim(self, context, instance, nodename, limits=None,
                       image_meta=None, migration=None):
         """Create a claim for a rebuild operation."""
@@ -245,7 +335,7 @@ class ResourceTracker(object):
                                 migration, move_type='evacuation',
                                 limits=limits, image_meta=image_meta)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def resize_claim(self, context, instance, instance_type, nodename,
                      migration, image_meta=None, limits=None):
         """Create a claim for a resize or cold-migration move."""
@@ -317,18 +407,19 @@ class ResourceTracker(object):
             for request in instance.pci_requests.requests:
                 if request.alias_name is None:
                     new_pci_requests.requests.append(request)
-        claim = claims.MoveClaim(context, instance, nodename,
-                                 new_instance_type, image_meta, self, cn,
-                                 new_pci_requests, overhead=overhead,
-                                 limits=limits)
-
-        claim.migration = migration
-        claimed_pci_devices_objs = []
-        if self.pci_tracker:
-            # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
-            # in _update_usage_from_instance().
-            claimed_pci_devices_objs = self.pci_tracker.claim_instance(
-                    context, new_pci_requests, claim.claimed_numa_topology)
+        with _shared_state_lock():
+            claim = claims.MoveClaim(context, instance, nodename,
+                                     new_instance_type, image_meta, self, cn,
+                                     new_pci_requests, overhead=overhead,
+                                     limits=limits)
+
+            claim.migration = migration
+            claimed_pci_devices_objs = []
+            if self.pci_tracker:
+                # NOTE(jaypipes): ComputeNode.pci_device_pools is set below
+                # in _update_usage_from_instance().
+                claimed_pci_devices_objs = self.pci_tracker.claim_instance(
+                        context, new_pci_requests, claim.claimed_numa_topology)
         claimed_pci_devices = objects.PciDeviceList(
                 objects=claimed_pci_devices_objs)
 
@@ -349,8 +440,9 @@ class ResourceTracker(object):
 
         # Mark the resources in-use for the resize landing on this
         # compute host:
-        self._update_usage_from_migration(context, instance, migration,
-                                          nodename)
+        with _shared_state_lock():
+            self._update_usage_from_migration(context, instance, migration,
+                                              nodename)
         elevated = context.elevated()
         self._update(elevated, cn)
 
@@ -414,11 +506,12 @@ class ResourceTracker(object):
         instance.node = None
         instance.save()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def abort_instance_claim(self, context, instance, nodename):
         """Remove usage from the given instance."""
-        self._update_usage_from_instance(context, instance, nodename,
-                                         is_removed=True)
+        with _shared_state_lock():
+            self._update_usage_from_instance(context, instance, nodename,
+                                             is_removed=True)
 
         instance.clear_numa_topology()
         self._unset_instance_host_and_node(instance)
@@ -437,9 +530,21 @@ class ResourceTracker(object):
                 dev_pools_obj = self.pci_tracker.stats.to_device_pools_obj()
                 self.compute_nodes[nodename].pci_device_pools = dev_pools_obj
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def drop_move_claim(self, context, instance, nodename,
                         instance_type=None, prefix='new_'):
+        if self._drop_move_claim_usage(context, instance, nodename,
+                                       instance_type, prefix):
+            ctxt = context.elevated()
+            self._update(ctxt, self.compute_nodes[nodename])
+
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    def _drop_move_claim_usage(self, context, instance, nodename,
+                               instance_type, prefix):
+        """Remove the usage of a move claim from the tracker.
+
+        :returns: True if the usage of the compute node changed
+        """
         # Remove usage for an incoming/outgoing migration on the destination
         # node.
         if instance['uuid'] in self.tracked_migrations:
@@ -457,9 +562,7 @@ class ResourceTracker(object):
                         instance_type, numa_topology=numa_topology)
                 self._drop_pci_devices(instance, nodename, prefix)
                 self._update_usage(usage, nodename, sign=-1)
-
-                ctxt = context.elevated()
-                self._update(ctxt, self.compute_nodes[nodename])
+                return True
         # Remove usage for an instance that is not tracked in migrations (such
         # as on the source node after a migration).
         # NOTE(lbeliveau): On resize on the same node, the instance is
@@ -468,11 +571,10 @@ class ResourceTracker(object):
             self.tracked_instances.pop(instance['uuid'])
             self._drop_pci_devices(instance, nodename, prefix)
             # TODO(lbeliveau): Validate if numa needs the same treatment.
+            return True
+        return False
 
-            ctxt = context.elevated()
-            self._update(ctxt, self.compute_nodes[nodename])
-
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_by_node
     def update_usage(self, context, instance, nodename):
         """Update the resource usage and stats after a change in an
         instance
@@ -484,8 +586,11 @@ class ResourceTracker(object):
 
         # don't update usage for this instance unless it submitted a resource
         # claim first:
-        if uuid in self.tracked_instances:
-            self._update_usage_from_instance(context, instance, nodename)
+        with _shared_state_lock():
+            tracked = uuid in self.tracked_instances
+            if tracked:
+                self._update_usage_from_instance(context, instance, nodename)
+        if tracked:
             self._update(context.elevated(), self.compute_nodes[nodename])
 
     def disabled(self, nodename):
@@ -589,6 +694,7 @@ class ResourceTracker(object):
         self._setup_pci_tracker(context, cn, resources)
         self._update(context, cn)
 
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def _setup_pci_tracker(self, context, compute_node, resources):
         if not self.pci_tracker:
             n_id = compute_node.id
@@ -652,11 +758,19 @@ class ResourceTracker(object):
         declared a need for resources, but not necessarily retrieved them from
         the hypervisor layer yet.
 
+        If the node was fully audited less than
+        CONF.update_resources_full_audit_interval seconds ago, only the usage
+        tracked by claims since then is reported.
+
         :param nodename: Temporary parameter representing the Ironic resource
                          node. This parameter will be removed once Ironic
                          baremetal resource nodes are handled like any other
                          resource in the system.
         """
+        if not self._full_audit_due(nodename):
+            self._refresh_available_resource(context, nodename)
+            return
+
         LOG.debug("Auditing locally available compute resources for "
                   "%(host)s (node: %(node)s)",
                  {'node': nodename,
@@ -679,8 +793,101 @@ class ResourceTracker(object):
 
         self._update_available_resource(context, resources)
 
-    def _pair_instances_to_migrations(self, migrations, instances):
+    def _full_audit_due(self, nodename):
+        """Returns whether the usage of the node should be recalculated from
+        scratch rather than relying on the usage tracked by claims.
+        """
+        interval = CONF.update_resources_full_audit_interval
+        if interval <= 0 or self.disabled(nodename):
+            return True
+        last_audit = self._last_full_audit.get(nodename)
+        return last_audit is None or time.time() - last_audit >= interval
+
+    def _refresh_available_resource(self, context, nodename):
+        """Report the usage of a compute node, as tracked by claims since its
+        last full audit, without auditing the node.
+        """
+        LOG.debug("Skipping audit of compute resources for %(host)s "
+                  "(node: %(node)s), last audited %(age)d seconds ago",
+                  {'host': self.host, 'node': nodename,
+                   'age': time.time() - self._last_full_audit[nodename]})
+
+        @utils.synchronized(_node_semaphore(nodename))
+        def _refresh_node_available_resource():
+            cn = self.compute_nodes[nodename]
+            metrics = self._get_host_metrics(context, nodename)
+            cn.metrics = jsonutils.dumps(metrics)
+            self._update(context, cn)
+
+        _refresh_node_available_resource()
+
+    def _get_tracked_usage(self, nodename):
+        """Returns a dict of the usage tracked by claims on a compute node
+        since its last full audit, or None if it was never audited.
+        """
+        cn = self.compute_nodes.get(nodename)
+        if cn is None or nodename not in self._last_full_audit:
+            return None
+        return {field: getattr(cn, field) for field in _AUDITED_USAGE_FIELDS
+                if cn.obj_attr_is_set(field)}
+
+    def _report_usage_drift(self, nodename, tracked_usage):
+        """Log any difference between the usage of a compute node tracked by
+        claims and the usage found by auditing it.
+
+        :returns: True if the tracked usage drifted from the audited usage,
+                  False otherwise.
+        """
+        if not tracked_usage:
+            return False
+        cn = self.compute_nodes[nodename]
+        drift = {field: getattr(cn, field) - value
+                 for field, value in tracked_usage.items()
+                 if getattr(cn, field) != value}
+        if drift:
+            LOG.warning("Resource usage tracked for %(host)s (node: %(node)s) "
+                        "drifted from the audited usage by %(drift)s",
+                        {'host': self.host, 'node': nodename,
+                         'drift': drift})
+        return bool(drift)
+
+    def _get_instances_and_migrations(self, context, nodename):
+        """Load the instances and the in-progress migrations of a compute node
+        for its audit, with all the instance fields the audit needs.
+
+        :returns: tuple of the InstanceList of the instances assigned to the
+                  node and the MigrationList of its in-progress migrations,
+                  each paired with its instance.
+        """
+        # Grab all instances assigned to this node:
+        instances = objects.InstanceList.get_by_host_and_node(
+            context, self.host, nodename,
+            expected_attrs=_AUDIT_INSTANCE_ATTRS)
+
+        # Grab all in-progress migrations:
+        migrations = objects.MigrationList.get_in_progress_by_host_and_node(
+                context, self.host, nodename)
+
+        self._pair_instances_to_migrations(context, migrations, instances)
+        return instances, migrations
+
+    def _pair_instances_to_migrations(self, context, migrations, instances):
         instance_by_uuid = {inst.uuid: inst for inst in instances}
+        # NOTE(tdurakov): The instance of a migration can be on another host,
+        # e.g. for a resize/cold migration which is finished but not yet
+        # confirmed/reverted, as the instance has already changed host to the
+        # destination. Load all of those at once, rather than letting each
+        # migration lazy-load its instance, and the fields we need from it,
+        # separately.
+        other_uuids = (set(mig.instance_uuid for mig in migrations) -
+                       set(instance_by_uuid))
+        if other_uuids:
+            other_instances = objects.InstanceList.get_by_filters(
+                context, {'uuid': sorted(other_uuids)},
+                expected_attrs=_AUDIT_INSTANCE_ATTRS)
+            instance_by_uuid.update(
+                (inst.uuid, inst) for inst in other_instances)
+
         for migration in migrations:
             try:
                 migration.instance = instance_by_uuid[migration.instance_uuid]
@@ -688,51 +895,85 @@ class ResourceTracker(object):
                 # NOTE(danms): If this happens, we don't set it here, and
                 # let the code either fail or lazy-load the instance later
                 # which is what happened before we added this optimization.
-                # NOTE(tdurakov) this situation is possible for resize/cold
-                # migration when migration is finished but haven't yet
-                # confirmed/reverted in that case instance already changed host
-                # to destination and no matching happens
+                # This is the case if the instance has been deleted.
                 LOG.debug('Migration for instance %(uuid)s refers to '
-                              'another host\'s instance!',
+                          'an instance which was not found!',
                           {'uuid': migration.instance_uuid})
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def _update_available_resource(self, context, resources):
+        nodename = resources['hypervisor_hostname']
 
-        # initialize the compute node object, creating it
-        # if it does not already exist.
-        self._init_compute_node(context, resources)
+        # NOTE: Only the audit of this compute node is serialized against
+        # claims on it; the global semaphore is held just while the tracker's
+        # in-memory state is recalculated, so that the database and placement
+        # round-trips of one node's audit don't block claims on other nodes.
+        @utils.synchronized(_node_semaphore(nodename))
+        def _update_node_available_resource():
+            # Only compare usage to what claims tracked when audits don't
+            # happen on every run of the periodic task.
+            tracked_usage = None
+            if CONF.update_resources_full_audit_interval > 0:
+                tracked_usage = self._get_tracked_usage(nodename)
+
+            # initialize the compute node object, creating it
+            # if it does not already exist.
+            self._init_compute_node(context, resources)
+
+            # if we could not init the compute node the tracker will be
+            # disabled and we should quit now
+            if self.disabled(nodename):
+                return
+
+            instances, migrations = self._get_instances_and_migrations(
+                context, nodename)
+
+            instance_usage = self.driver.get_per_instance_usage()
+            tracked_instance_uuids = self._update_usage_from_audit(
+                context, instances, migrations, nodename, instance_usage)
+            self._refresh_allocations(context, instances, nodename)
+            self._last_full_audit[nodename] = time.time()
+            if self._report_usage_drift(nodename, tracked_usage):
+                # NOTE: The audit corrected the usage, but the claims failed
+                # to track it since the previous audit, so don't rely on
+                # them until an audit finds no drift again.
+                self._last_full_audit[nodename] = 0
+
+            self._remove_deleted_instances_allocations(
+                context, self.compute_nodes[nodename], migrations,
+                instance_uuids=tracked_instance_uuids)
 
-        nodename = resources['hypervisor_hostname']
+            cn = self.compute_nodes[nodename]
 
-        # if we could not init the compute node the tracker will be
-        # disabled and we should quit now
-        if self.disabled(nodename):
-            return
+            metrics = self._get_host_metrics(context, nodename)
+            # TODO(pmurray): metrics should not be a json string in
+            # ComputeNode, but it is. This should be changed in ComputeNode
+            cn.metrics = jsonutils.dumps(metrics)
 
-        # Grab all instances assigned to this node:
-        instances = objects.InstanceList.get_by_host_and_node(
-            context, self.host, nodename,
-            expected_attrs=['system_metadata',
-                            'numa_topology',
-                            'flavor', 'migration_context'])
+            # update the compute_node
+            self._update(context, cn)
+            LOG.debug('Compute_service record updated for %(host)s:%(node)s',
+                      {'host': self.host, 'node': nodename})
 
+        _update_node_available_resource()
+
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    def _update_usage_from_audit(self, context, instances, migrations,
+                                 nodename, instance_usage):
+        """Recalculate the usage of a compute node from the instances and
+        migrations assigned to it.
+
+        :param instance_usage: the usage of the instances running on the
+                               hypervisor, as returned by the driver's
+                               get_per_instance_usage()
+        :returns: set of the UUIDs of the instances tracked on the node
+        """
         # Now calculate usage based on instance utilization:
         self._update_usage_from_instances(context, instances, nodename)
-
-        # Grab all in-progress migrations:
-        migrations = objects.MigrationList.get_in_progress_by_host_and_node(
-                context, self.host, nodename)
-
-        self._pair_instances_to_migrations(migrations, instances)
         self._update_usage_from_migrations(context, migrations, nodename)
 
-        self._remove_deleted_instances_allocations(
-            context, self.compute_nodes[nodename], migrations)
-
         # Detect and account for orphaned instances that may exist on the
         # hypervisor, but are not in the DB:
-        orphans = self._find_orphaned_instances()
+        orphans = self._find_orphaned_instances(instance_usage)
         self._update_usage_from_orphans(orphans, nodename)
 
         cn = self.compute_nodes[nodename]
@@ -747,15 +988,7 @@ class ResourceTracker(object):
 
         self._report_final_resource_view(nodename)
 
-        metrics = self._get_host_metrics(context, nodename)
-        # TODO(pmurray): metrics should not be a json string in ComputeNode,
-        # but it is. This should be changed in ComputeNode
-        cn.metrics = jsonutils.dumps(metrics)
-
-        # update the compute_node
-        self._update(context, cn)
-        LOG.debug('Compute_service record updated for %(host)s:%(node)s',
-                  {'host': self.host, 'node': nodename})
+        return set(self.tracked_instances)
 
     def _get_compute_node(self, context, nodename):
         """Returns compute node for the host and nodename."""
@@ -840,19 +1073,46 @@ class ResourceTracker(object):
                   'pci_stats': pci_stats})
 
     def _resource_change(self, compute_node):
-        """Check to see if any resources have changed."""
+        """Check to see if any resources have changed.
+
+        Fields which have been set again to the value they had when the
+        compute node was last saved are not considered changed, and are not
+        written back when it is saved.
+        """
         nodename = compute_node.hypervisor_hostname
         old_compute = self.old_resources[nodename]
-        if not obj_base.obj_equal_prims(
-                compute_node, old_compute, ['updated_at']):
+        changed = _get_changed_fields(compute_node, old_compute)
+        unchanged = compute_node.obj_what_changed() - changed
+        # NOTE: obj_reset_changes() resets all the fields when given an
+        # empty set, which would drop the fields which really changed.
+        if unchanged:
+            compute_node.obj_reset_changes(unchanged, recursive=True)
+        if changed:
             self.old_resources[nodename] = copy.deepcopy(compute_node)
             return True
         return False
 
+    def _placement_update_needed(self, nodename, inventory):
+        """Check to see if the inventory of the node needs to be reported to
+        placement.
+
+        It does if it differs from the inventory last reported, or if that
+        was long enough ago that placement should be resynchronized anyway.
+        """
+        last_inventory, last_time = self._placement_updates.get(
+            nodename, (None, 0))
+        return (inventory != last_inventory or
+                time.time() - last_time > report.ASSOCIATION_REFRESH)
+
+    def _placement_updated(self, nodename, inventory):
+        self._placement_updates[nodename] = (copy.deepcopy(inventory),
+                                             time.time())
+
     def _update(self, context, compute_node):
         """Update partial stats locally and populate them to Scheduler."""
         if self._resource_change(compute_node):
-            # If the compute_node's resource changed, update to DB.
+            # If the compute_node's resource changed, update to DB. Only the
+            # fields which actually changed are written.
             # NOTE(jianghuaw): Once we completely move to use get_inventory()
             # for all resource provider's inv data. We can remove this check.
             # At the moment we still need this check and save compute_node.
@@ -865,23 +1125,39 @@ class ResourceTracker(object):
         # to get inventory and use scheduler_client interfaces to update
         # inventory to placement. It's scheduler_client's responsibility to
         # ensure the update request to placement only happens when inventory
-        # is changed.
+        # is changed. Placement is not even queried when neither the
+        # inventory nor the compute node fields it is built from changed
+        # since they were last reported, e.g. if only stats or metrics did.
         nodename = compute_node.hypervisor_hostname
         # Persist the stats to the Scheduler
         try:
             inv_data = self.driver.get_inventory(nodename)
             _normalize_inventory_from_cn_obj(inv_data, compute_node)
-            self.scheduler_client.set_inventory_for_provider(
-                context,
-                compute_node.uuid,
-                compute_node.hypervisor_hostname,
-                inv_data,
-            )
+            if self._placement_update_needed(nodename, inv_data):
+                # NOTE: the inventory is only remembered once placement
+                # confirmed it, so that a failed push is retried on the
+                # next update rather than after ASSOCIATION_REFRESH.
+                if self.scheduler_client.set_inventory_for_provider(
+                        context,
+                        compute_node.uuid,
+                        compute_node.hypervisor_hostname,
+                        inv_data):
+                    self._placement_updated(nodename, inv_data)
+                else:
+                    self._placement_updates.pop(nodename, None)
         except NotImplementedError:
             # Eventually all virt drivers will return an inventory dict in the
             # format that the placement API expects and we'll be able to remove
             # this code branch
-            self.scheduler_client.update_compute_node(context, compute_node)
+            placement_inputs = {field: getattr(compute_node, field)
+                                for field in _PLACEMENT_FIELDS
+                                if compute_node.obj_attr_is_set(field)}
+            if self._placement_update_needed(nodename, placement_inputs):
+                if self.scheduler_client.update_compute_node(context,
+                                                             compute_node):
+                    self._placement_updated(nodename, placement_inputs)
+                else:
+                    self._placement_updates.pop(nodename, None)
 
         try:
             traits = self.driver.get_traits(nodename)
@@ -893,11 +1169,19 @@ class ResourceTracker(object):
             # to set_inventory_for_provider or update_compute_node to ensure
             # that the resource provider exists in the tree and has had its
             # cached traits refreshed.
-            self.reportclient.set_traits_for_provider(
-                context, compute_node.uuid, traits)
+            try:
+                self.reportclient.set_traits_for_provider(
+                    context, compute_node.uuid, traits)
+            except Exception:
+                # The report client may have dropped the provider from its
+                # cache, so make sure it is refreshed next time.
+                with excutils.save_and_reraise_exception():
+                    self._placement_updates.pop(nodename, None)
 
         if self.pci_tracker:
-            self.pci_tracker.save(context)
+            # NOTE: the PCI device tracker is shared by all the nodes.
+            with _shared_state_lock():
+                self.pci_tracker.save(context)
 
     def _update_usage(self, usage, nodename, sign=1):
         mem_usage = usage['memory_mb']
@@ -1078,7 +1362,7 @@ class ResourceTracker(object):
                 continue
 
     def _update_usage_from_instance(self, context, instance, nodename,
-            is_removed=False, require_allocation_refresh=False):
+            is_removed=False):
         """Update usage for a single instance."""
 
         uuid = instance['uuid']
@@ -1106,10 +1390,6 @@ class ResourceTracker(object):
                 self.pci_tracker.update_pci_for_instance(context,
                                                          instance,
                                                          sign=sign)
-            if require_allocation_refresh:
-                LOG.debug("Auto-correcting allocations.")
-                self.reportclient.update_instance_allocation(context, cn,
-                                                             instance, sign)
             # new instance, update compute node resource usage:
             self._update_usage(self._get_usage_dict(instance), nodename,
                                sign=sign)
@@ -1139,6 +1419,18 @@ class ResourceTracker(object):
         cn.current_workload = 0
         cn.running_vms = 0
 
+        for instance in instances:
+            if instance.vm_state not in vm_states.ALLOW_RESOURCE_REMOVAL:
+                self._update_usage_from_instance(context, instance, nodename)
+
+    def _refresh_allocations(self, context, instances, nodename):
+        """Auto-correct the allocations of the instances of a compute node
+        in placement, if the deployment or the driver still requires it.
+
+        This is called once the usage of the node was audited, rather than
+        while its instances are tracked, since it calls placement for each
+        instance.
+        """
         # NOTE(jaypipes): In Pike, we need to be tolerant of Ocata compute
         # nodes that overwrite placement allocations to look like what the
         # resource tracker *thinks* is correct. When an instance is
@@ -1213,16 +1505,26 @@ class ResourceTracker(object):
                 "Will auto-correct allocations to handle "
                 "Ocata-style assumptions.")
 
+        cn = self.compute_nodes[nodename]
         for instance in instances:
             if instance.vm_state not in vm_states.ALLOW_RESOURCE_REMOVAL:
                 if msg_allocation_refresh:
                     LOG.debug(msg_allocation_refresh)
                     msg_allocation_refresh = False
-                self._update_usage_from_instance(context, instance, nodename,
-                    require_allocation_refresh=require_allocation_refresh)
+                if require_allocation_refresh:
+                    LOG.debug("Auto-correcting allocations.")
+                    self.reportclient.update_instance_allocation(
+                        context, cn, instance, 1)
 
     def _remove_deleted_instances_allocations(self, context, cn,
-                                              migrations):
+                                              migrations, instance_uuids=None):
+        """Remove allocations against the compute node for instances which
+        are no longer on it.
+
+        :param instance_uuids: set of UUIDs of the instances tracked on the
+                               compute node. Defaults to the instances
+                               currently tracked.
+        """
         migration_uuids = [migration.uuid for migration in migrations
                            if 'uuid' in migration]
         # NOTE(jaypipes): All of this code sucks. It's basically dealing with
@@ -1230,7 +1532,10 @@ class ResourceTracker(object):
         # operations for when allocations should be deleted when things didn't
         # happen according to the normal flow of events where the scheduler
         # always creates allocations for an instance
-        known_instances = set(self.tracked_instances.keys())
+        if instance_uuids is None:
+            known_instances = set(self.tracked_instances.keys())
+        else:
+            known_instances = instance_uuids
         allocations = self.reportclient.get_allocations_for_resource_provider(
                 context, cn.uuid) or {}
         read_deleted_context = context.elevated(read_deleted='yes')
@@ -1358,7 +1663,7 @@ class ResourceTracker(object):
                       {'operation': operation, 'node': cn.uuid},
                       instance=instance)
 
-    def _find_orphaned_instances(self):
+    def _find_orphaned_instances(self, usage):
         """Given the set of instances and migrations already account for
         by resource tracker, sanity check the hypervisor to determine
         if there are any "orphaned" instances left hanging around.
@@ -1371,7 +1676,6 @@ class ResourceTracker(object):
         uuids2 = frozenset(self.tracked_migrations.keys())
         uuids = uuids1 | uuids2
 
-        usage = self.driver.get_per_instance_usage()
         vuuids = frozenset(usage.keys())
 
         orphan_uuids = vuuids - uuids
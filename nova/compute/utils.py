@@ -22,6 +22,8 @@ import math
 import string
 import traceback
 
+import eventlet
+from eventlet import semaphore
 import netifaces
 from oslo_log import log
 import six
@@ -30,6 +32,8 @@ from nova import block_device
 from nova.compute import power_state
 from nova.compute import task_states
 import nova.conf
+from nova import context as nova_context
+from nova import db
 from nova import exception
 from nova import notifications
 from nova.notifications.objects import aggregate as aggregate_notification
@@ -926,6 +930,136 @@ def remove_shelved_keys_from_system_metadata(instance):
             del (instance.system_metadata[key])
 
 
+class ActionEventBuffer(object):
+    """Buffer of instance action events written in batches.
+
+    Events are written in the order they were reported, at most
+    instance_action_events_flush_interval seconds after being buffered. The
+    start and the finish of an event that are buffered together are written
+    as a single row.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._started = {}
+        self._timer = None
+        self._flush_lock = semaphore.Semaphore()
+
+    def event_start(self, context, instance_uuid, event_name):
+        values = objects.InstanceActionEvent.pack_action_event_start(
+            context, instance_uuid, event_name)
+        values['start_time'] = utils.strtime(values['start_time'])
+        self._add(context, values)
+
+    def event_finish_with_failure(self, context, instance_uuid, event_name,
+                                  exc_val=None, exc_tb=None):
+        values = objects.InstanceActionEvent.pack_action_event_finish(
+            context, instance_uuid, event_name, exc_val=exc_val,
+            exc_tb=exc_tb)
+        values['finish_time'] = utils.strtime(values['finish_time'])
+        if exc_tb is not None:
+            values['message'] = six.text_type(exc_val)
+            if not isinstance(exc_tb, six.string_types):
+                values['traceback'] = ''.join(traceback.format_tb(exc_tb))
+        self._add(context, values)
+
+    def _add(self, context, values):
+        key = (values['instance_uuid'], values['request_id'],
+               values['event'])
+        if 'finish_time' in values:
+            started = self._started.pop(key, None)
+            if started is not None:
+                started.update(values)
+                return
+        else:
+            self._started[key] = values
+        self._events.append((context, values))
+
+        if len(self._events) == CONF.instance_action_events_buffer_size:
+            utils.spawn_n(self.flush)
+        elif self._timer is None:
+            self._timer = eventlet.spawn_after(
+                CONF.instance_action_events_flush_interval,
+                self._flush_on_timer)
+
+    def _flush_on_timer(self):
+        self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Write all the buffered events."""
+        # NOTE: flushes are serialized so that the events of an action are
+        # written in order even when a flush starts while another one is
+        # still writing.
+        with self._flush_lock:
+            events, self._events = self._events, []
+            self._started = {}
+            if events:
+                self._write(events)
+
+    @staticmethod
+    def _write(events):
+        values = [event[1] for event in events]
+        indirection_api = objects.InstanceActionEvent.indirection_api
+        try:
+            ctxt = nova_context.get_admin_context()
+            if indirection_api is None:
+                db.action_events_write(ctxt, values)
+            elif hasattr(indirection_api, 'action_events_write'):
+                indirection_api.action_events_write(ctxt, values)
+            else:
+                raise NotImplementedError()
+            return
+        except NotImplementedError:
+            # NOTE: the conductor is too old for batches
+            pass
+        except Exception:
+            LOG.exception('Failed to write %d instance action events',
+                          len(events))
+            return
+
+        for context, event in events:
+            try:
+                if 'start_time' in event:
+                    objects.InstanceActionEvent.event_start(
+                        context, event['instance_uuid'], event['event'],
+                        want_result=False)
+                if 'finish_time' in event:
+                    objects.InstanceActionEvent.event_finish_with_failure(
+                        context, event['instance_uuid'], event['event'],
+                        exc_val=event.get('message'),
+                        exc_tb=event.get('traceback'), want_result=False)
+            except Exception:
+                LOG.exception('Failed to write instance action event '
+                              '%(event)s of instance %(instance)s',
+                              {'event': event['event'],
+                               'instance': event['instance_uuid']})
+
+
+# NOTE: only the compute service buffers events, see
+# enable_action_event_buffer(), since it's the only one writing them when it
+# stops. Every other service writes them synchronously.
+_ACTION_EVENT_BUFFER = None
+
+
+def enable_action_event_buffer():
+    """Buffer the instance action events reported by this process, if
+    instance_action_events_flush_interval is positive.
+
+    This must only be called by services which call flush_action_events()
+    when they stop.
+    """
+    global _ACTION_EVENT_BUFFER
+    if _ACTION_EVENT_BUFFER is None:
+        _ACTION_EVENT_BUFFER = ActionEventBuffer()
+
+
+def flush_action_events():
+    """Write the buffered instance action events."""
+    if _ACTION_EVENT_BUFFER is not None:
+        _ACTION_EVENT_BUFFER.flush()
+
+
 class EventReporter(object):
     """Context manager to report instance action events."""
 
@@ -934,18 +1068,41 @@ class EventReporter(object):
         self.event_name = event_name
         self.instance_uuids = instance_uuids
 
+    def _buffered(self):
+        # NOTE: the events reported without a project may have to be matched
+        # with the last action of the instance, see action_event_start(), so
+        # they are not buffered.
+        if (_ACTION_EVENT_BUFFER is not None and
+                CONF.instance_action_events_flush_interval and
+                self.context.project_id):
+            return True
+        # NOTE: write the buffered events first to keep them in order
+        flush_action_events()
+        return False
+
     def __enter__(self):
+        buffered = self._buffered()
         for uuid in self.instance_uuids:
-            objects.InstanceActionEvent.event_start(
-                self.context, uuid, self.event_name, want_result=False)
+            if buffered:
+                _ACTION_EVENT_BUFFER.event_start(
+                    self.context, uuid, self.event_name)
+            else:
+                objects.InstanceActionEvent.event_start(
+                    self.context, uuid, self.event_name, want_result=False)
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        buffered = self._buffered()
         for uuid in self.instance_uuids:
-            objects.InstanceActionEvent.event_finish_with_failure(
-                self.context, uuid, self.event_name, exc_val=exc_val,
-                exc_tb=exc_tb, want_result=False)
+            if buffered:
+                _ACTION_EVENT_BUFFER.event_finish_with_failure(
+                    self.context, uuid, self.event_name, exc_val=exc_val,
+                    exc_tb=exc_tb)
+            else:
+                objects.InstanceActionEvent.event_finish_with_failure(
+                    self.context, uuid, self.event_name, exc_val=exc_val,
+                    exc_tb=exc_tb, want_result=False)
         return False
 
 
@@ -37,6 +37,7 @@ from nova.conductor.tasks import live_migrate
 from nova.conductor.tasks import migrate
 from nova import context as nova_context
 from nova.db import base
+from nova.db import stats as db_stats
 from nova import exception
 from nova.i18n import _
 from nova import image
@@ -67,7 +68,7 @@ def targets_cell(fn):
     def wrapper(self, context, *args, **kwargs):
         instance = kwargs.get('instance') or args[0]
         try:
-            im = objects.InstanceMapping.get_by_instance_uuid(
+            im = objects.InstanceMapping.get_by_instance_uuid_cached(
                 context, instance.uuid)
         except exception.InstanceMappingNotFound:
             LOG.error('InstanceMapping not found, unable to target cell',
@@ -98,7 +99,7 @@ class ConductorManager(manager.Manager):
     namespace.  See the ComputeTaskManager class for details.
     """
 
-    target = messaging.Target(version='3.0')
+    target = messaging.Target(version='3.3')
 
     def __init__(self, *args, **kwargs):
         super(ConductorManager, self).__init__(service_name='conductor',
@@ -130,7 +131,10 @@ class ConductorManager(manager.Manager):
         objclass = nova_object.NovaObject.obj_class_from_name(
             objname, object_versions[objname])
         args = tuple([context] + list(args))
-        result = self._object_dispatch(objclass, objmethod, args, kwargs)
+        try:
+            result = self._object_dispatch(objclass, objmethod, args, kwargs)
+        finally:
+            db_stats.report(context, '%s.%s' % (objname, objmethod))
         # NOTE(danms): The RPC layer will convert to primitives for us,
         # but in this case, we need to honor the version the client is
         # asking for, so we do it before returning here.
@@ -153,7 +157,11 @@ class ConductorManager(manager.Manager):
     def object_action(self, context, objinst, objmethod, args, kwargs):
         """Perform an action on an object."""
         oldobj = objinst.obj_clone()
-        result = self._object_dispatch(objinst, objmethod, args, kwargs)
+        try:
+            result = self._object_dispatch(objinst, objmethod, args, kwargs)
+        finally:
+            db_stats.report(context, '%s.%s' % (objinst.obj_name(),
+                                                objmethod))
         updates = dict()
         # NOTE(danms): Diff the object with the one passed to us and
         # generate a list of changes to forward back
@@ -170,6 +178,42 @@ class ConductorManager(manager.Manager):
         updates['obj_what_changed'] = objinst.obj_what_changed()
         return updates, result
 
+    def object_actions(self, context, actions):
+        """Perform a batch of actions on objects.
+
+        :param actions: A list of dicts with the arguments of object_action()
+        :returns: A list with, for each action, what object_action() returns
+                  or None if the action failed. The caller is expected to
+                  retry failed actions on their own to get the error.
+        """
+        results = []
+        for action in actions:
+            try:
+                results.append(self.object_action(context, **action))
+            except messaging.ExpectedException:
+                LOG.debug('Failed to %(method)s %(obj)s in a batch',
+                          {'method': action['objmethod'],
+                           'obj': action['objinst'].obj_name()})
+                results.append(None)
+        return results
+
+    def action_events_write(self, context, events):
+        """Write a batch of events on instance actions."""
+        self.db.action_events_write(context, events)
+
+    def bw_usage_update_multi(self, context, usages, start_period,
+                              last_refreshed, update_cells):
+        """Update the bandwidth usage of several instance networks."""
+        self.db.bw_usage_update_multi(context, usages, start_period,
+                                      last_refreshed=last_refreshed,
+                                      update_cells=update_cells)
+
+    def vol_usage_update_multi(self, context, usages):
+        """Update the current usage of several volumes."""
+        db_vol_usages = self.db.vol_usage_update_multi(context, usages)
+        return [jsonutils.to_primitive(db_vol_usage)
+                for db_vol_usage in db_vol_usages]
+
     def object_backport_versions(self, context, objinst, object_versions):
         target = object_versions[objinst.obj_name()]
         LOG.debug('Backporting %(obj)s to %(ver)s with versions %(manifest)s',
@@ -183,6 +227,8 @@ class ConductorManager(manager.Manager):
 
     def reset(self):
         objects.Service.clear_min_version_cache()
+        objects.InstanceMapping.clear_cell_cache()
+        objects.HostMapping.clear_cell_cache()
 
 
 @contextlib.contextmanager
@@ -497,8 +543,8 @@ class ComputeTaskManager(base.Base):
             return None
         else:
             try:
-                host_mapping = objects.HostMapping.get_by_host(context,
-                        host.service_host)
+                host_mapping = objects.HostMapping.get_by_host_cached(
+                    context, host.service_host)
             except exception.HostMappingNotFound:
                 # NOTE(alaski): For now this exception means that a
                 # deployment has not migrated to cellsv2 and we should
@@ -1131,7 +1177,7 @@ class ComputeTaskManager(base.Base):
             # Convert host from the scheduler into a cell record
             if host.service_host not in host_mapping_cache:
                 try:
-                    host_mapping = objects.HostMapping.get_by_host(
+                    host_mapping = objects.HostMapping.get_by_host_cached(
                         context, host.service_host)
                     host_mapping_cache[host.service_host] = host_mapping
                 except exception.HostMappingNotFound as exc:
@@ -195,6 +195,10 @@ class ConductorAPI(object):
     that they can handle the version_cap being set to 3.0.
 
     * Remove provider_fw_rule_get_all()
+
+    * 3.1 - Add object_actions()
+    * 3.2 - Add action_events_write()
+    * 3.3 - Add bw_usage_update_multi() and vol_usage_update_multi()
     """
 
     VERSION_ALIASES = {
@@ -244,6 +248,34 @@ class ConductorAPI(object):
         return cctxt.call(context, 'object_action', objinst=objinst,
                           objmethod=objmethod, args=args, kwargs=kwargs)
 
+    def object_actions(self, context, actions):
+        if not self.client.can_send_version('3.1'):
+            raise NotImplementedError()
+        cctxt = self.client.prepare(version='3.1')
+        return cctxt.call(context, 'object_actions', actions=actions)
+
+    def action_events_write(self, context, events):
+        if not self.client.can_send_version('3.2'):
+            raise NotImplementedError()
+        cctxt = self.client.prepare(version='3.2')
+        return cctxt.call(context, 'action_events_write', events=events)
+
+    def bw_usage_update_multi(self, context, usages, start_period,
+                              last_refreshed, update_cells):
+        if not self.client.can_send_version('3.3'):
+            raise NotImplementedError()
+        cctxt = self.client.prepare(version='3.3')
+        return cctxt.call(context, 'bw_usage_update_multi', usages=usages,
+                          start_period=start_period,
+                          last_refreshed=last_refreshed,
+                          update_cells=update_cells)
+
+    def vol_usage_update_multi(self, context, usages):
+        if not self.client.can_send_version('3.3'):
+            raise NotImplementedError()
+        cctxt = self.client.prepare(version='3.3')
+        return cctxt.call(context, 'vol_usage_update_multi', usages=usages)
+
     def object_backport_versions(self, context, objinst, object_versions):
         cctxt = self.client.prepare()
         return cctxt.call(context, 'object_backport_versions', objinst=objinst,
@@ -249,7 +249,7 @@ class LiveMigrationTask(base.TaskBase):
         :raises: MigrationPreCheckError - in case a mapping is not found
         """
         try:
-            return objects.HostMapping.get_by_host(
+            return objects.HostMapping.get_by_host_cached(
                 self.context, self.destination).cell_mapping
         except exception.HostMappingNotFound:
             raise exception.MigrationPreCheckError(
@@ -229,6 +229,26 @@ osapi_opts = [
         help="""
 As a query can potentially return many thousands of items, you can limit the
 maximum number of items in a single response by setting this option.
+"""),
+    cfg.IntOpt("instance_list_cells_batch_size",
+        default=100,
+        min=1,
+        help="""
+Number of instances to query at once from each cell when listing instances.
+
+When listing instances across cells, each cell is queried for batches of
+this many instances, sorted as requested, and the batches are merged into
+the response. Further batches are only queried from a cell once its previous
+batch has been merged, so that listing does not read up to the requested
+limit of instances from every cell.
+
+The simple tenant usage API also queries the instances of each cell in
+batches of this many instances, accounting for the usage of each batch
+before querying the next one.
+
+Related options:
+
+* max_limit: batches are never larger than the requested limit.
 """),
     cfg.StrOpt("compute_link_prefix",
         deprecated_group="DEFAULT",
@@ -253,6 +273,56 @@ unchanged.
 Possible values:
 
 * Any string, including an empty string (the default).
+"""),
+    cfg.ListOpt("db_replica_read_resources",
+        default=[],
+        help="""
+API resources whose GET requests read from the database replicas.
+
+The GET requests on these resources, for example ``servers`` for listing and
+showing servers, run their cell database reads, and their reads of flavors
+from the API database, with the asynchronous reader. It uses the
+``slave_connection`` of the ``[database]`` and ``[api_database]`` groups when
+one is configured. Such reads can return slightly stale data, see
+``db_replica_write_pin``.
+
+Cells whose database connection is not the one of the ``[database]`` group
+have no replica and are always read from their database.
+
+Possible values:
+
+* An empty list (the default), to read from the primary databases.
+* A list of top level resources of the compute API, for example
+  ``servers,flavors,os-hypervisors,os-simple-tenant-usage``.
+
+Related options:
+
+* db_replica_write_pin
+"""),
+    cfg.IntOpt("db_replica_write_pin",
+        default=5,
+        min=0,
+        help="""
+Number of seconds a user keeps reading from the primary databases after a
+write.
+
+Any API request with another method than GET or HEAD is considered a write.
+For that long after it, the GET requests of the same user on the resources
+of ``db_replica_read_resources`` read from the primary databases, so that
+users read their own writes despite the replication lag. The times of the
+last writes are kept in the cache configured in the ``[cache]`` group, so
+that they are shared by all the API workers. When this option is positive,
+the replicas are therefore only read from if ``[cache]/enabled`` is set.
+
+Possible values:
+
+* 0: Never pin users to the primary databases.
+* Any positive integer: The number of seconds, which should be larger than
+  the usual replication lag.
+
+Related options:
+
+* db_replica_read_resources
 """),
 ]
 
@@ -60,6 +60,21 @@ entry.
     cfg.StrOpt(
         'tempdir',
         help='Explicitly specify the temporary working directory.'),
+    cfg.BoolOpt(
+        'rpc_compact_objects',
+        default=False,
+        help="""
+Send versioned objects over RPC in a compact format.
+
+When enabled, each object sent over RPC is packed with msgpack and
+compressed, instead of being sent as its expanded primitive form. This
+makes messages carrying large objects, such as instances with their
+flavor, NUMA topology and network info cache, several times smaller.
+
+All services are able to receive objects in the compact format, but
+services from older releases are not. Only enable this option once all
+the services of the deployment have been upgraded.
+"""),
     cfg.BoolOpt(
         'monkey_patch',
         default=False,
@@ -621,7 +621,96 @@ for performance reasons, for example, with Ironic.
 Possible values:
 
 * Any positive integer representing greenthreads count.
-""")
+"""),
+    cfg.IntOpt('update_resources_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of greenthreads available for use to update compute node resources.
+
+The update_available_resource periodic task audits the resources of every
+compute node managed by this service. This option controls how many of
+those nodes are audited concurrently. It is mostly useful for services
+managing many nodes, for example with Ironic, where auditing the nodes one
+after another can take longer than the periodic interval. Claims against a
+compute node only wait for the audit of that same node.
+
+Possible values:
+
+* Any positive integer representing greenthreads count. The default of 1
+  audits the nodes one at a time.
+
+Related options:
+
+* update_resources_interval
+"""),
+    cfg.IntOpt('init_host_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of greenthreads available for use to initialize instances when the
+compute service starts.
+
+On startup the compute service checks every instance on the host, plugging
+its VIFs and fixing up its state when needed. This option controls how many
+instances are handled concurrently. Hosts with many instances can restart
+much faster with a higher value, at the cost of more concurrent requests to
+the hypervisor, Neutron and Cinder. Instances are started in a stable order
+and the service waits for all of them before it reports them to the
+scheduler.
+
+Possible values:
+
+* Any positive integer representing greenthreads count. The default of 1
+  initializes the instances one at a time.
+"""),
+    cfg.FloatOpt('instance_action_events_flush_interval',
+        default=0.0,
+        min=0.0,
+        help="""
+Number of seconds instance action events are buffered before being written.
+
+Every operation recorded in the actions of an instance writes the start and
+the finish of an event. By default each of them is written synchronously
+through the conductor. With a positive value, the events reported by the
+nova-compute service are buffered and written in batches, at most this many
+seconds after they were reported. Other services, such as nova-api and
+nova-conductor, always write them synchronously. An event that starts and
+finishes within the interval is written as a single row. Events of an action
+are always written in the order they were reported.
+
+Buffered events are written when the service stops gracefully, but the
+events buffered when a service crashes are lost, and errors writing them are
+logged rather than raised to the operation. Events reported without a project,
+for example while the compute service initializes its instances, are always
+written synchronously.
+
+Possible values:
+
+* 0: Write events synchronously. This is the default.
+* Any positive number of seconds.
+
+Related options:
+
+* instance_action_events_buffer_size
+"""),
+    cfg.IntOpt('instance_action_events_buffer_size',
+        default=100,
+        min=1,
+        help="""
+Number of buffered instance action events that triggers a write.
+
+When instance action events are buffered, they are written as soon as this
+many of them are waiting, without waiting for the flush interval.
+
+Possible values:
+
+* Any positive integer representing a number of events.
+
+Related options:
+
+* instance_action_events_flush_interval
+"""),
 ]
 
 compute_group_opts = [
@@ -713,6 +802,23 @@ Possible values:
 
 * Any positive integer in seconds.
 * Any value <=0 will disable the sync. This is not recommended.
+"""),
+    cfg.IntOpt('heal_instance_info_cache_batch_size',
+        default=10,
+        min=1,
+        help="""
+Maximum number of instances whose network information cache is updated
+by each run of the periodic healing task.
+
+The instances of a batch are refreshed together, which for Neutron means
+their ports are fetched with a single query. Instances which recently
+received a ``network-changed`` event are healed first, followed by the
+instances with the oldest network information cache. This value bounds
+the load the healing task puts on the networking service.
+
+Related options:
+
+* ``heal_instance_info_cache_interval``
 """),
     cfg.IntOpt('reclaim_instance_interval',
         default=0,
@@ -876,6 +982,32 @@ Possible values:
 * 0: Will run at the default periodic interval.
 * Any value < 0: Disables the option.
 * Any positive integer in seconds.
+"""),
+    cfg.IntOpt('update_resources_full_audit_interval',
+        default=0,
+        min=0,
+        help="""
+Interval for fully auditing compute resource usage.
+
+Resource claims, claim drops and instance state changes update the resource
+usage of a compute node as they happen. The update_available_resource
+periodic task additionally recalculates the usage of each compute node from
+scratch, reading all of its instances and migrations from the database. This
+option specifies the minimum number of seconds between such full audits of a
+compute node. Runs of the periodic task in between only report the usage
+tracked so far, along with the node metrics, without querying the database
+or the hypervisor. Any difference between the tracked usage and the usage
+found by a full audit is logged as a warning, and the usage is then fully
+audited again on every run of the periodic task until no difference is found.
+
+Possible values:
+
+* 0: Fully audit every compute node on every run of the periodic task.
+* Any positive integer in seconds.
+
+Related options:
+
+* update_resources_interval
 """)
 ]
 
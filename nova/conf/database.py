@@ -32,6 +32,77 @@ db_driver_opt = cfg.StrOpt(
         deprecated_since='13.0.0',
         help='The driver to use for database access')
 
+db_stats_opts = [
+    cfg.BoolOpt('db_statement_stats',
+        default=False,
+        help="""
+Collect statistics of the database statements run for each request.
+
+When enabled, the number of statements, the rows they returned or changed
+and the time spent running them are counted per request and per DB API
+function. The totals are added to the API request log and logged by the
+conductor for each object call it runs on behalf of a compute service.
+"""),
+    cfg.IntOpt('db_statement_budget',
+        default=0,
+        min=0,
+        help="""
+Maximum number of database statements a single request is expected to run.
+
+A warning naming the DB API functions which ran the most statements is
+logged for every request which goes over the budget. This helps to spot
+N+1 query patterns, where the number of statements grows with the number
+of objects handled by a request. Only used when ``db_statement_stats`` is
+enabled.
+
+Possible values:
+
+* 0: No budget, never warn (default).
+* Any positive integer: The number of statements allowed per request.
+
+Related options:
+
+* ``db_statement_stats``
+"""),
+]
+
+
+mapping_cache_opts = [
+    cfg.IntOpt('mapping_cache_ttl',
+        default=300,
+        min=0,
+        help="""
+Number of seconds the instance and host mappings are cached for.
+
+The API, conductor and scheduler services cache the cell which instances and
+compute hosts are mapped to, which saves a query to the API database on most
+server actions. A mapping is removed from the cache of a service when it is
+changed or deleted by that service, and the other services notice the change
+once their cached mapping expires.
+
+Possible values:
+
+* 0: Disable the cache.
+* Any positive integer: The number of seconds to cache each mapping for.
+
+Related options:
+
+* mapping_cache_size
+"""),
+    cfg.IntOpt('mapping_cache_size',
+        default=10000,
+        min=1,
+        help="""
+Maximum number of instance mappings, and of host mappings, to cache.
+
+The least recently used mappings are evicted first.
+
+Related options:
+
+* mapping_cache_ttl
+"""),
+]
+
 
 # NOTE(markus_z): We cannot simply do:
 # conf.register_opts(oslo_db_options.database_opts, 'api_database')
@@ -117,6 +188,8 @@ def enrich_help_text(alt_db_opts):
 def register_opts(conf):
     oslo_db_options.set_defaults(conf, connection=_DEFAULT_SQL_CONNECTION)
     conf.register_opt(db_driver_opt)
+    conf.register_opts(db_stats_opts)
+    conf.register_opts(mapping_cache_opts)
     conf.register_opts(api_db_opts, group=api_db_group)
 
 
@@ -129,6 +202,6 @@ def list_opts():
     # in the "sample.conf" file, I omit the listing of the "oslo_db_options"
     # here.
     enrich_help_text(api_db_opts)
-    return {'DEFAULT': [db_driver_opt],
+    return {'DEFAULT': [db_driver_opt] + db_stats_opts + mapping_cache_opts,
             api_db_group: api_db_opts,
             }
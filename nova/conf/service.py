@@ -80,6 +80,55 @@ Possible Values:
 
 * Any positive integer (in seconds)
 * 0 : disable the random delay
+"""),
+    cfg.BoolOpt('periodic_task_host_jitter',
+                default=True,
+                help="""
+Spread the runs of each periodic task across hosts.
+
+When enabled, every periodic task is shifted by an offset derived from the
+host name and the task name, between zero and the interval of the task.
+Services running on different hosts then run a given task at different
+times, even if they were started at the same time, instead of all hitting
+the conductor and the database in lockstep. The offset of a host does not
+change across restarts.
+
+Related options:
+
+* periodic_fuzzy_delay
+"""),
+    cfg.IntOpt('periodic_task_max_backoff',
+               default=1,
+               min=1,
+               help="""
+Maximum factor by which the interval of an idle periodic task is stretched.
+
+Some periodic tasks report when a run found nothing to do, for example
+because there were no instances to poll. Each consecutive idle run doubles
+the interval until the next run of such a task, up to this factor times
+its configured interval. The first run which finds work resets the
+interval.
+
+Possible values:
+
+* 1 (default): periodic tasks always run at their configured interval
+* Any integer greater than 1
+"""),
+    cfg.IntOpt('periodic_task_stats_interval',
+               default=0,
+               min=0,
+               help="""
+Number of seconds between reports of the periodic task statistics.
+
+Every service records, for each of its periodic tasks, the number of runs,
+skipped runs and failures, the time spent and the number of RPC messages
+and notifications sent. When this option is set, these statistics are
+logged at the INFO level at most once per interval.
+
+Possible values:
+
+* 0 (default): do not log the statistics
+* Any positive integer (in seconds)
 """),
     cfg.ListOpt('enabled_apis',
                 item_type=cfg.types.String(choices=['osapi_compute',
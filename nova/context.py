@@ -138,6 +138,15 @@ class RequestContext(context.RequestContext):
         self.db_connection = None
         self.mq_connection = None
 
+        # NOTE: Statistics of the database statements run for this request,
+        # see nova.db.stats. They are never sent over RPC.
+        self.db_stats = None
+
+        # NOTE: Set for the API requests whose database reads all go to the
+        # replicas, see nova.api.openstack.db_replica. It is never sent over
+        # RPC, the services handling the request read from the primary.
+        self.db_replica_reads = False
+
         self.user_auth_plugin = user_auth_plugin
         if self.is_admin is None:
             self.is_admin = policy.check_is_admin(self)
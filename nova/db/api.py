@@ -791,15 +791,18 @@ def instance_get_all_by_filters(context, filters, sort_key='created_at',
 
 def instance_get_all_by_filters_sort(context, filters, limit=None,
                                      marker=None, columns_to_join=None,
-                                     sort_keys=None, sort_dirs=None):
+                                     sort_keys=None, sort_dirs=None,
+                                     marker_values=None):
     """Get all instances that match all filters sorted by multiple keys.
 
-    sort_keys and sort_dirs must be a list of strings.
+    sort_keys and sort_dirs must be a list of strings. If marker_values is
+    given, it is the list of the values of sort_keys after which to return
+    instances, and is used in place of the marker instance.
     """
     return IMPL.instance_get_all_by_filters_sort(
         context, filters, limit=limit, marker=marker,
         columns_to_join=columns_to_join, sort_keys=sort_keys,
-        sort_dirs=sort_dirs)
+        sort_dirs=sort_dirs, marker_values=marker_values)
 
 
 def instance_get_by_sort_filters(context, sort_keys, sort_dirs, values):
@@ -1748,6 +1751,28 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
     return rv
 
 
+def bw_usage_update_multi(context, usages, start_period, last_refreshed=None,
+                          update_cells=True):
+    """Update the cached bandwidth usage of several instance networks.
+
+    :param usages: A list of dicts with the uuid, mac, bw_in, bw_out,
+                   last_ctr_in and last_ctr_out of each network
+    """
+    IMPL.bw_usage_update_multi(context, usages, start_period,
+                               last_refreshed=last_refreshed)
+    if update_cells:
+        try:
+            cells_api = cells_rpcapi.CellsAPI()
+            for usage in usages:
+                cells_api.bw_usage_update_at_top(context,
+                        usage['uuid'], usage['mac'], start_period,
+                        usage['bw_in'], usage['bw_out'],
+                        usage['last_ctr_in'], usage['last_ctr_out'],
+                        last_refreshed)
+        except Exception:
+            LOG.exception("Failed to notify cells of bw_usage update")
+
+
 ###################
 
 
@@ -1769,6 +1794,20 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
                                  update_totals=update_totals)
 
 
+def vol_usage_update_multi(context, usages):
+    """Update the current usage of several volumes.
+
+    Creates new records if needed.
+
+    :param usages: A list of dicts with the volume_id, instance_uuid,
+                   project_id, user_id, availability_zone, curr_reads,
+                   curr_read_bytes, curr_writes and curr_write_bytes of each
+                   volume
+    :returns: The updated volume usages
+    """
+    return IMPL.vol_usage_update_multi(context, usages)
+
+
 ###################
 
 
@@ -1836,6 +1875,17 @@ def action_event_finish(context, values):
     return IMPL.action_event_finish(context, values)
 
 
+def action_events_write(context, events):
+    """Write a batch of events on instance actions.
+
+    Each item of events holds the values of the start of an event, of the
+    finish of an event, or of both. Events are written in order and the
+    starts are inserted with multi-row statements. Events whose action or
+    started event can't be found are logged and skipped.
+    """
+    return IMPL.action_events_write(context, events)
+
+
 def action_events_get(context, action_id):
     """Get the events by action id."""
     return IMPL.action_events_get(context, action_id)
@@ -1914,10 +1964,20 @@ def task_log_get(context, task_name, period_beginning,
 ####################
 
 
-def archive_deleted_rows(max_rows=None):
+def archive_deleted_rows(max_rows=None, context=None, purge=False,
+                         markers=None, workers=1):
     """Move up to max_rows rows from production tables to corresponding shadow
     tables.
 
+    :param context: The request context targeting the database to archive,
+                    or None to archive the main database
+    :param purge: Whether to delete the rows without copying them to the
+                  shadow tables
+    :param markers: Optional dict of table name to the primary key of the
+                    last row archived from that table, updated as rows are
+                    archived so that the next call resumes after them
+    :param workers: Number of independent tables to archive concurrently
+
     :returns: dict that maps table name to number of rows archived from that
               table, for example:
 
@@ -1930,7 +1990,9 @@ def archive_deleted_rows(max_rows=None):
         }
 
     """
-    return IMPL.archive_deleted_rows(max_rows=max_rows)
+    return IMPL.archive_deleted_rows(max_rows=max_rows, context=context,
+                                     purge=purge, markers=markers,
+                                     workers=workers)
 
 
 def pcidevice_online_data_migration(context, max_count):
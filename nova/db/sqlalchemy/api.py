@@ -23,7 +23,9 @@ import datetime
 import functools
 import inspect
 import sys
+import time
 
+import eventlet
 from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import enginefacade
@@ -66,6 +68,7 @@ from nova.compute import vm_states
 import nova.conf
 import nova.context
 from nova.db.sqlalchemy import models
+from nova.db import stats as db_stats
 from nova import exception
 from nova.i18n import _
 from nova import safe_utils
@@ -108,14 +111,55 @@ def configure(conf):
         api_context_manager.append_on_engine_create(
             lambda eng: profiler_sqlalchemy.add_tracing(sa, eng, "db"))
 
+    if CONF.db_statement_stats:
+        main_context_manager.append_on_engine_create(add_statement_stats)
+        api_context_manager.append_on_engine_create(add_statement_stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('nova_statement_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.time() - conn.info['nova_statement_start'].pop()
+    db_stats.record(cursor.rowcount, elapsed)
+
+
+def add_statement_stats(engine):
+    """Record the statements run by an engine into nova.db.stats."""
+    if not sa.event.contains(engine, 'before_cursor_execute',
+                             _before_cursor_execute):
+        sa.event.listen(engine, 'before_cursor_execute',
+                        _before_cursor_execute)
+        sa.event.listen(engine, 'after_cursor_execute',
+                        _after_cursor_execute)
+
+
+def remove_statement_stats(engine):
+    if sa.event.contains(engine, 'before_cursor_execute',
+                         _before_cursor_execute):
+        sa.event.remove(engine, 'before_cursor_execute',
+                        _before_cursor_execute)
+        sa.event.remove(engine, 'after_cursor_execute',
+                        _after_cursor_execute)
+
 
 def create_context_manager(connection=None):
     """Create a database context manager object.
 
     : param connection: The database connection string
     """
+    db_conf = _get_db_conf(CONF.database, connection=connection)
+    # NOTE: The slave connection of the [database] group is a replica of its
+    # connection, it must not be used to read the database of another cell.
+    if connection is not None and connection != CONF.database.connection:
+        db_conf['slave_connection'] = None
     ctxt_mgr = enginefacade.transaction_context()
-    ctxt_mgr.configure(**_get_db_conf(CONF.database, connection=connection))
+    ctxt_mgr.configure(**db_conf)
+    if CONF.db_statement_stats:
+        ctxt_mgr.append_on_engine_create(add_statement_stats)
     return ctxt_mgr
 
 
@@ -127,6 +171,15 @@ def get_context_manager(context):
     return _context_manager_from_context(context) or main_context_manager
 
 
+def _reads_from_replica(context):
+    """Whether all the reads of a request go to the database replicas.
+
+    This is set on the RequestContext of the API requests routed to the
+    replicas, see nova.api.openstack.db_replica.
+    """
+    return getattr(context, 'db_replica_reads', False)
+
+
 def get_engine(use_slave=False, context=None):
     """Get a database engine object.
 
@@ -201,12 +254,12 @@ def select_db_reader_mode(f):
         context = keyed_args['context']
         use_slave = keyed_args.get('use_slave', False)
 
-        if use_slave:
+        if use_slave or _reads_from_replica(context):
             reader_mode = get_context_manager(context).async
         else:
             reader_mode = get_context_manager(context).reader
 
-        with reader_mode.using(context):
+        with reader_mode.using(context), db_stats.db_api_function(f.__name__):
             return f(*args, **kwargs)
     return wrapper
 
@@ -221,7 +274,8 @@ def pick_context_manager_writer(f):
     @functools.wraps(f)
     def wrapped(context, *args, **kwargs):
         ctxt_mgr = get_context_manager(context)
-        with ctxt_mgr.writer.using(context):
+        with ctxt_mgr.writer.using(context), \
+                db_stats.db_api_function(f.__name__):
             return f(context, *args, **kwargs)
     return wrapped
 
@@ -230,13 +284,20 @@ def pick_context_manager_reader(f):
     """Decorator to use a reader db context manager.
 
     The db context manager will be picked from the RequestContext.
+    The asynchronous reader is used for the requests reading from the
+    database replicas.
 
     Wrapped function must have a RequestContext in the arguments.
     """
     @functools.wraps(f)
     def wrapped(context, *args, **kwargs):
         ctxt_mgr = get_context_manager(context)
-        with ctxt_mgr.reader.using(context):
+        if _reads_from_replica(context):
+            reader_mode = ctxt_mgr.async
+        else:
+            reader_mode = ctxt_mgr.reader
+        with reader_mode.using(context), \
+                db_stats.db_api_function(f.__name__):
             return f(context, *args, **kwargs)
     return wrapped
 
@@ -245,13 +306,40 @@ def pick_context_manager_reader_allow_async(f):
     """Decorator to use a reader.allow_async db context manager.
 
     The db context manager will be picked from the RequestContext.
+    The asynchronous reader is used for the requests reading from the
+    database replicas.
 
     Wrapped function must have a RequestContext in the arguments.
     """
     @functools.wraps(f)
     def wrapped(context, *args, **kwargs):
         ctxt_mgr = get_context_manager(context)
-        with ctxt_mgr.reader.allow_async.using(context):
+        if _reads_from_replica(context):
+            reader_mode = ctxt_mgr.async
+        else:
+            reader_mode = ctxt_mgr.reader.allow_async
+        with reader_mode.using(context), \
+                db_stats.db_api_function(f.__name__):
+            return f(context, *args, **kwargs)
+    return wrapped
+
+
+def pick_api_context_manager_reader(f):
+    """Decorator to use a reader API db context manager.
+
+    The asynchronous reader is used for the requests reading from the
+    database replicas, the synchronous one otherwise.
+
+    Wrapped function must have a RequestContext in the arguments.
+    """
+    @functools.wraps(f)
+    def wrapped(context, *args, **kwargs):
+        if _reads_from_replica(context):
+            reader_mode = api_context_manager.async
+        else:
+            reader_mode = api_context_manager.reader
+        with reader_mode.using(context), \
+                db_stats.db_api_function(f.__name__):
             return f(context, *args, **kwargs)
     return wrapped
 
@@ -1914,10 +2002,15 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
     :param context: security context
     :param instances: list of instances to fill
     :param manual_joins: list of tables to manually join (can be any
-                         combination of 'metadata' and 'system_metadata' or
-                         None to take the default of both)
+                         combination of 'metadata', 'system_metadata',
+                         'pci_devices', 'fault', 'security_groups' and 'tags'
+                         or None to take the default of 'metadata' and
+                         'system_metadata')
     """
     uuids = [inst['uuid'] for inst in instances]
+    # NOTE: Like the security_groups and tags relationships of the Instance
+    # model, deleted instances have no security groups nor tags.
+    live_uuids = [inst['uuid'] for inst in instances if not inst['deleted']]
 
     if manual_joins is None:
         manual_joins = ['metadata', 'system_metadata']
@@ -1937,6 +2030,17 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
         for row in _instance_pcidevs_get_multi(context, uuids):
             pcidevs[row['instance_uuid']].append(row)
 
+    secgroups = collections.defaultdict(list)
+    if 'security_groups' in manual_joins:
+        for instance_uuid, secgroup in _instance_security_groups_get_multi(
+                context, live_uuids):
+            secgroups[instance_uuid].append(secgroup)
+
+    tags = collections.defaultdict(list)
+    if 'tags' in manual_joins:
+        for row in _instance_tags_get_multi(context, live_uuids):
+            tags[row['resource_id']].append(row)
+
     if 'fault' in manual_joins:
         faults = instance_fault_get_by_instance_uuids(context, uuids,
                                                       latest=True)
@@ -1950,6 +2054,10 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
         inst['metadata'] = meta[inst['uuid']]
         if 'pci_devices' in manual_joins:
             inst['pci_devices'] = pcidevs[inst['uuid']]
+        if 'security_groups' in manual_joins:
+            inst['security_groups'] = secgroups[inst['uuid']]
+        if 'tags' in manual_joins:
+            inst['tags'] = tags[inst['uuid']]
         inst_faults = faults.get(inst['uuid'])
         inst['fault'] = inst_faults and inst_faults[0] or None
         filled_instances.append(inst)
@@ -1960,9 +2068,12 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
 def _manual_join_columns(columns_to_join):
     """Separate manually joined columns from columns_to_join
 
-    If columns_to_join contains 'metadata', 'system_metadata', 'fault', or
-    'pci_devices' those columns are removed from columns_to_join and added
-    to a manual_joins list to be used with the _instances_fill_metadata method.
+    If columns_to_join contains 'metadata', 'system_metadata', 'fault',
+    'pci_devices', 'security_groups' or 'tags' those columns are removed from
+    columns_to_join and added to a manual_joins list to be used with the
+    _instances_fill_metadata method. Loading these collections with one
+    query each, rather than joining them to the instances query, avoids
+    returning the cartesian product of the collections of each instance.
 
     The columns_to_join formal parameter is copied and not modified, the return
     tuple has the modified columns_to_join list to be used with joinedload in
@@ -1973,7 +2084,8 @@ def _manual_join_columns(columns_to_join):
     """
     manual_joins = []
     columns_to_join_new = copy.copy(columns_to_join)
-    for column in ('metadata', 'system_metadata', 'pci_devices', 'fault'):
+    for column in ('metadata', 'system_metadata', 'pci_devices', 'fault',
+                   'security_groups', 'tags'):
         if column in columns_to_join_new:
             columns_to_join_new.remove(column)
             manual_joins.append(column)
@@ -1984,8 +2096,8 @@ def _manual_join_columns(columns_to_join):
 @pick_context_manager_reader
 def instance_get_all(context, columns_to_join=None):
     if columns_to_join is None:
-        columns_to_join_new = ['info_cache', 'security_groups']
-        manual_joins = ['metadata', 'system_metadata']
+        columns_to_join_new = ['info_cache']
+        manual_joins = ['metadata', 'system_metadata', 'security_groups']
     else:
         manual_joins, columns_to_join_new = (
             _manual_join_columns(columns_to_join))
@@ -2023,11 +2135,16 @@ def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
 @pick_context_manager_reader_allow_async
 def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
                                      columns_to_join=None, sort_keys=None,
-                                     sort_dirs=None):
+                                     sort_dirs=None, marker_values=None):
     """Return instances that match all filters sorted by the given keys.
     Deleted instances will be returned by default, unless there's a filter that
     says otherwise.
 
+    Instead of the uuid of a marker instance, marker_values can be given as
+    the list of the values of the sort keys after which to return instances,
+    in the order of sort_keys. This saves looking up the marker instance and
+    does not require an instance with those values to exist.
+
     Depending on the name of a filter, matching for that filter is
     performed using either exact matching or as regular expression
     matching. Exact matching is applied for the following filters::
@@ -2093,8 +2210,8 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
                                                default_dir='desc')
 
     if columns_to_join is None:
-        columns_to_join_new = ['info_cache', 'security_groups']
-        manual_joins = ['metadata', 'system_metadata']
+        columns_to_join_new = ['info_cache']
+        manual_joins = ['metadata', 'system_metadata', 'security_groups']
     else:
         manual_joins, columns_to_join_new = (
             _manual_join_columns(columns_to_join))
@@ -2211,7 +2328,9 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     query_prefix = _regex_instance_filter(query_prefix, filters)
 
     # paginate query
-    if marker is not None:
+    if marker_values is not None:
+        marker = _SortKeysMarker(dict(zip(sort_keys, marker_values)))
+    elif marker is not None:
         try:
             marker = _instance_get_by_uuid(
                     context.elevated(read_deleted='yes'), marker)
@@ -2229,6 +2348,24 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     return _instances_fill_metadata(context, query_prefix.all(), manual_joins)
 
 
+class _SortKeysMarker(object):
+    """Marker made of the values of the sort keys, in place of a record.
+
+    paginate_query() only reads the values of the sort keys from its marker.
+    The sort keys without a value, like the default sort keys appended by
+    process_sort_params(), are None and are skipped by paginate_query(),
+    which is fine as long as the given values include a unique key.
+    """
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        return self._values.get(key)
+
+
 @require_context
 @pick_context_manager_reader_allow_async
 def instance_get_by_sort_filters(context, sort_keys, sort_dirs, values):
@@ -2368,6 +2505,40 @@ def _get_regexp_ops(connection):
             regexp_op_map.get(db_type, 'LIKE'))
 
 
+# NOTE: Databases on which LIKE follows the same case sensitivity as the
+# regular expression operator, so that a literal regular expression can be
+# matched with LIKE instead.
+_REGEX_TO_LIKE_DB_TYPES = ('mysql', 'postgresql')
+_REGEX_SPECIAL_CHARS = frozenset('\\.^$*+?()[]{}|')
+_LIKE_ESCAPE_CHAR = '!'
+
+
+def _regex_to_like(regex):
+    """Translate a literal regular expression into a LIKE pattern.
+
+    Only regular expressions made of literal characters, optionally
+    anchored at the beginning and/or at the end, are translated. Unlike the
+    regular expression, a pattern anchored at the beginning can use an
+    index on the column, and a LIKE pattern is cheaper to evaluate than a
+    regular expression anyway.
+
+    :param regex: regular expression to translate
+    :returns: the LIKE pattern to use with _LIKE_ESCAPE_CHAR as escape
+              character, or None if the regular expression is not literal
+    """
+    start = 1 if regex.startswith('^') else 0
+    end = len(regex)
+    if end > start and regex.endswith('$'):
+        end -= 1
+    literal = regex[start:end]
+    if any(c in _REGEX_SPECIAL_CHARS for c in literal):
+        return None
+    for c in (_LIKE_ESCAPE_CHAR, '%', '_'):
+        literal = literal.replace(c, _LIKE_ESCAPE_CHAR + c)
+    return (u'' if start else u'%') + literal + (
+        u'' if end < len(regex) else u'%')
+
+
 def _regex_instance_filter(query, filters):
 
     """Applies regular expression filtering to an Instance query.
@@ -2380,6 +2551,8 @@ def _regex_instance_filter(query, filters):
 
     model = models.Instance
     safe_regex_filter, db_regexp_op = _get_regexp_ops(CONF.database.connection)
+    regex_to_like = (_db_connection_type(CONF.database.connection) in
+                     _REGEX_TO_LIKE_DB_TYPES)
     for filter_name in filters:
         try:
             column_attr = getattr(model, filter_name)
@@ -2391,9 +2564,13 @@ def _regex_instance_filter(query, filters):
         # Sometimes the REGEX filter value is not a string
         if not isinstance(filter_val, six.string_types):
             filter_val = str(filter_val)
+        like_val = _regex_to_like(filter_val) if regex_to_like else None
         if db_regexp_op == 'LIKE':
             query = query.filter(column_attr.op(db_regexp_op)(
                                  u'%' + filter_val + u'%'))
+        elif like_val is not None:
+            query = query.filter(column_attr.like(
+                like_val, escape=_LIKE_ESCAPE_CHAR))
         else:
             filter_val = safe_regex_filter(filter_val)
             query = query.filter(column_attr.op(db_regexp_op)(
@@ -2535,8 +2712,8 @@ def instance_get_active_by_window_joined(context, begin, end=None,
     query = context.session.query(models.Instance)
 
     if columns_to_join is None:
-        columns_to_join_new = ['info_cache', 'security_groups']
-        manual_joins = ['metadata', 'system_metadata']
+        columns_to_join_new = ['info_cache']
+        manual_joins = ['metadata', 'system_metadata', 'security_groups']
     else:
         manual_joins, columns_to_join_new = (
             _manual_join_columns(columns_to_join))
@@ -2586,10 +2763,14 @@ def _instance_get_all_query(context, project_only=False, joins=None):
 
 @pick_context_manager_reader_allow_async
 def instance_get_all_by_host(context, host, columns_to_join=None):
+    if columns_to_join is None:
+        manual_joins = None
+    else:
+        manual_joins, columns_to_join = _manual_join_columns(columns_to_join)
     query = _instance_get_all_query(context, joins=columns_to_join)
     return _instances_fill_metadata(context,
                                     query.filter_by(host=host).all(),
-                                    manual_joins=columns_to_join)
+                                    manual_joins=manual_joins)
 
 
 def _instance_get_all_uuids_by_host(context, host):
@@ -4943,6 +5124,29 @@ def _instance_metadata_get_multi(context, instance_uuids):
         models.InstanceMetadata.instance_uuid.in_(instance_uuids))
 
 
+def _instance_security_groups_get_multi(context, instance_uuids):
+    """Return (instance uuid, security group) tuples for instance_uuids."""
+    if not instance_uuids:
+        return []
+    assoc = models.SecurityGroupInstanceAssociation
+    # NOTE: query from the association so that the join is not attempted
+    # from the association to itself, which SQLAlchemy 1.2 refuses.
+    return model_query(context, assoc,
+                       (assoc.instance_uuid, models.SecurityGroup),
+                       read_deleted='no').\
+        join(models.SecurityGroup,
+             assoc.security_group_id == models.SecurityGroup.id).\
+        filter(models.SecurityGroup.deleted == 0).\
+        filter(assoc.instance_uuid.in_(instance_uuids))
+
+
+def _instance_tags_get_multi(context, instance_uuids):
+    if not instance_uuids:
+        return []
+    return context.session.query(models.Tag).filter(
+        models.Tag.resource_id.in_(instance_uuids))
+
+
 def _instance_metadata_get_query(context, instance_uuid):
     return model_query(context, models.InstanceMetadata, read_deleted="no").\
                     filter_by(instance_uuid=instance_uuid)
@@ -5173,6 +5377,65 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
     return bwusage
 
 
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def bw_usage_update_multi(context, usages, start_period,
+                          last_refreshed=None):
+    if last_refreshed is None:
+        last_refreshed = timeutils.utcnow()
+
+    ts_values = {'last_refreshed': last_refreshed,
+                 'start_period': start_period}
+    ts_values = convert_objects_related_datetimes(ts_values, 'start_period',
+                                                  'last_refreshed')
+    # NOTE: like bw_usage_update(), update the record with the lowest id
+    # when there are several for the same instance and mac
+    usage_ids = {}
+    query = model_query(context, models.BandwidthUsage,
+                        (models.BandwidthUsage.id,
+                         models.BandwidthUsage.uuid,
+                         models.BandwidthUsage.mac),
+                        read_deleted='yes').\
+        filter_by(start_period=ts_values['start_period']).\
+        filter(models.BandwidthUsage.uuid.in_(
+            set(usage['uuid'] for usage in usages))).\
+        order_by(desc(models.BandwidthUsage.id))
+    for usage_id, uuid, mac in query:
+        usage_ids[(uuid, mac)] = usage_id
+
+    updates = []
+    inserts = []
+    for usage in usages:
+        values = {'last_refreshed': ts_values['last_refreshed'],
+                  'bw_in': usage['bw_in'],
+                  'bw_out': usage['bw_out'],
+                  'last_ctr_in': usage['last_ctr_in'],
+                  'last_ctr_out': usage['last_ctr_out']}
+        usage_id = usage_ids.get((usage['uuid'], usage['mac']))
+        if usage_id is None:
+            values.update(start_period=ts_values['start_period'],
+                          uuid=usage['uuid'], mac=usage['mac'])
+            inserts.append(values)
+        else:
+            # NOTE: the SET clause reserves the column names as parameters
+            values = {'b_' + key: value for key, value in values.items()}
+            values['b_id'] = usage_id
+            updates.append(values)
+
+    table = models.BandwidthUsage.__table__
+    if updates:
+        context.session.execute(
+            table.update().
+            where(table.c.id == sql.bindparam('b_id')).
+            values({key: sql.bindparam('b_' + key)
+                    for key in ('last_refreshed', 'bw_in', 'bw_out',
+                                'last_ctr_in', 'last_ctr_out')}),
+            updates)
+    if inserts:
+        context.session.execute(table.insert(), inserts)
+
+
 ####################
 
 
@@ -5293,6 +5556,77 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
     return vol_usage
 
 
+_VOL_USAGE_CURR_COLUMNS = ('curr_reads', 'curr_read_bytes', 'curr_writes',
+                           'curr_write_bytes')
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def vol_usage_update_multi(context, usages):
+    refreshed = timeutils.utcnow()
+    volume_ids = set(usage['volume_id'] for usage in usages)
+    current_usages = {}
+    query = model_query(context, models.VolumeUsage, read_deleted="yes").\
+        filter(models.VolumeUsage.volume_id.in_(volume_ids)).\
+        order_by(desc(models.VolumeUsage.id))
+    for current_usage in query:
+        current_usages[current_usage['volume_id']] = current_usage
+
+    updates = []
+    inserts = []
+    for usage in usages:
+        values = {key: usage[key]
+                  for key in ('instance_uuid', 'project_id', 'user_id',
+                              'availability_zone') +
+                  _VOL_USAGE_CURR_COLUMNS}
+        values['curr_last_refreshed'] = refreshed
+        current_usage = current_usages.get(usage['volume_id'])
+        if current_usage is None:
+            values['volume_id'] = usage['volume_id']
+            inserts.append(values)
+            continue
+
+        # NOTE: the SET clause reserves the column names as parameters
+        values = {'b_' + key: value for key, value in values.items()}
+        values['b_id'] = current_usage['id']
+        for column in _VOL_USAGE_CURR_COLUMNS:
+            values['b_tot_' + column[5:]] = 0
+        if any(usage[column] < current_usage[column]
+               for column in _VOL_USAGE_CURR_COLUMNS):
+            LOG.info("Volume(%s) has lower stats then what is in "
+                     "the database. Instance must have been rebooted "
+                     "or crashed. Updating totals.", usage['volume_id'])
+            for column in _VOL_USAGE_CURR_COLUMNS:
+                values['b_tot_' + column[5:]] = current_usage[column]
+        updates.append(values)
+
+    table = models.VolumeUsage.__table__
+    if updates:
+        set_values = {key: sql.bindparam('b_' + key)
+                      for key in ('instance_uuid', 'project_id', 'user_id',
+                                  'availability_zone', 'curr_last_refreshed') +
+                      _VOL_USAGE_CURR_COLUMNS}
+        for column in _VOL_USAGE_CURR_COLUMNS:
+            tot_column = 'tot_' + column[5:]
+            set_values[tot_column] = (table.c[tot_column] +
+                                      sql.bindparam('b_' + tot_column))
+        context.session.execute(
+            table.update().
+            where(table.c.id == sql.bindparam('b_id')).
+            values(set_values),
+            updates)
+    if inserts:
+        context.session.execute(table.insert(), inserts)
+
+    # NOTE: the usages loaded above are stale after the update
+    return model_query(context, models.VolumeUsage, read_deleted="yes").\
+        filter(models.VolumeUsage.volume_id.in_(volume_ids)).\
+        order_by(desc(models.VolumeUsage.id)).\
+        populate_existing().\
+        all()
+
+
 ####################
 
 
@@ -5577,6 +5911,72 @@ def action_event_finish(context, values):
     return event_ref
 
 
+_ACTION_EVENT_INSERT_COLUMNS = ('action_id', 'event', 'start_time',
+                                'finish_time', 'result', 'traceback', 'host',
+                                'details')
+
+
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def action_events_write(context, events):
+    """Write a batch of events on instance actions."""
+    table = models.InstanceActionEvent.__table__
+    actions = {}
+    inserts = []
+
+    def _insert_pending():
+        if inserts:
+            context.session.execute(table.insert(), inserts)
+            del inserts[:]
+
+    for values in events:
+        values = convert_objects_related_datetimes(dict(values),
+                                                   'start_time', 'finish_time')
+        key = (values['instance_uuid'], values['request_id'])
+        if key not in actions:
+            actions[key] = _action_get_by_request_id(
+                context, values['instance_uuid'], values['request_id'])
+        action = actions[key]
+        if not action:
+            LOG.warning('Instance action not found for request %(request)s '
+                        'of instance %(instance)s, dropping event %(event)s',
+                        {'request': values['request_id'],
+                         'instance': values['instance_uuid'],
+                         'event': values['event']})
+            continue
+
+        if 'start_time' in values:
+            # NOTE: all the rows have the same keys so that the starts can
+            # be inserted with a single multi-row statement
+            values['action_id'] = action['id']
+            inserts.append({column: values.get(column)
+                            for column in _ACTION_EVENT_INSERT_COLUMNS})
+        else:
+            # NOTE: the start of the event may be waiting to be inserted
+            _insert_pending()
+            event_ref = model_query(context, models.InstanceActionEvent).\
+                                    filter_by(action_id=action['id']).\
+                                    filter_by(event=values['event']).\
+                                    first()
+            if not event_ref:
+                LOG.warning('Instance action event %(event)s not found for '
+                            'action %(action)s, dropping its finish',
+                            {'event': values['event'],
+                             'action': action['id']})
+                continue
+            event_ref.update(values)
+
+        if (values.get('result') or '').lower() == 'error':
+            action.update({'message': 'Error'})
+        action.update({'updated_at': values.get('finish_time') or
+                                     values['start_time']})
+
+    _insert_pending()
+    for action in actions.values():
+        if action:
+            action.save(context.session)
+
+
 @pick_context_manager_reader
 def action_events_get(context, action_id):
     events = model_query(context, models.InstanceActionEvent).\
@@ -5726,7 +6126,7 @@ def task_log_end_task(context, task_name, period_beginning, period_ending,
 
 
 def _archive_if_instance_deleted(table, shadow_table, instances, conn,
-                                 max_rows):
+                                 max_rows, purge=False):
     """Look for records that pertain to deleted instances, but may not be
     deleted themselves. This catches cases where we delete an instance,
     but leave some residue because of a failure in a cleanup path or
@@ -5734,6 +6134,9 @@ def _archive_if_instance_deleted(table, shadow_table, instances, conn,
 
     Logic is: if I have a column called instance_uuid, and that instance
     is deleted, then I can be deleted.
+
+    If purge is True, the records are deleted without being copied to the
+    shadow table.
     """
     query_insert = shadow_table.insert(inline=True).\
         from_select(
@@ -5754,7 +6157,8 @@ def _archive_if_instance_deleted(table, shadow_table, instances, conn,
 
     try:
         with conn.begin():
-            conn.execute(query_insert)
+            if not purge:
+                conn.execute(query_insert)
             result_delete = conn.execute(delete_statement)
             return result_delete.rowcount
     except db_exc.DBReferenceError as ex:
@@ -5764,13 +6168,23 @@ def _archive_if_instance_deleted(table, shadow_table, instances, conn,
         return 0
 
 
-def _archive_deleted_rows_for_table(tablename, max_rows):
+def _archive_deleted_rows_for_table(tablename, max_rows, context=None,
+                                    purge=False, markers=None):
     """Move up to max_rows rows from one tables to the corresponding
     shadow table.
 
+    :param context: The request context targeting the database to archive,
+                    or None to archive the main database
+    :param purge: Whether to delete the rows without copying them to the
+                  shadow table
+    :param markers: Optional dict of table name to the primary key of the
+                    last row archived from that table. Only rows after the
+                    marker are considered and the marker is moved forward as
+                    rows are archived, so that repeated calls do not scan
+                    the same rows of the table again.
     :returns: number of rows archived
     """
-    engine = get_engine()
+    engine = get_engine(context=context)
     conn = engine.connect()
     metadata = MetaData()
     metadata.bind = engine
@@ -5799,6 +6213,7 @@ def _archive_deleted_rows_for_table(tablename, max_rows):
     # database's limit of maximum parameter in one SQL statement.
     deleted_column = table.c.deleted
     columns = [c.name for c in table.c]
+    marker = markers.get(tablename) if markers is not None else None
 
     # NOTE(clecomte): Tables instance_actions and instances_actions_events
     # have to be manage differently so we soft-delete them here to let
@@ -5812,6 +6227,8 @@ def _archive_deleted_rows_for_table(tablename, max_rows):
             where(instances.c.deleted != instances.c.deleted.default.arg)
         update_statement = table.update().values(deleted=table.c.id).\
             where(table.c.instance_uuid.in_(deleted_instances))
+        if marker is not None:
+            update_statement = update_statement.where(column > marker)
 
         conn.execute(update_statement)
 
@@ -5828,12 +6245,17 @@ def _archive_deleted_rows_for_table(tablename, max_rows):
 
         update_statement = table.update().values(deleted=table.c.id).\
             where(table.c.action_id.in_(deleted_actions))
+        if marker is not None:
+            update_statement = update_statement.where(column > marker)
 
         conn.execute(update_statement)
 
-    select = sql.select([column],
-                        deleted_column != deleted_column.default.arg).\
-                        order_by(column).limit(max_rows)
+    where = deleted_column != deleted_column.default.arg
+    if marker is not None:
+        # NOTE: Resume after the last archived row rather than scanning the
+        # rows which were not deleted at the beginning of the table again.
+        where = and_(where, column > marker)
+    select = sql.select([column], where).order_by(column).limit(max_rows)
     rows = conn.execute(select).fetchall()
     records = [r[0] for r in rows]
 
@@ -5854,9 +6276,12 @@ def _archive_deleted_rows_for_table(tablename, max_rows):
         try:
             # Group the insert and delete in a transaction.
             with conn.begin():
-                conn.execute(insert)
+                if not purge:
+                    conn.execute(insert)
                 result_delete = conn.execute(delete)
             rows_archived = result_delete.rowcount
+            if markers is not None:
+                markers[tablename] = records[-1]
         except db_exc.DBReferenceError as ex:
             # A foreign key constraint keeps us from deleting some of
             # these rows until we clean up a dependent table.  Just
@@ -5870,16 +6295,56 @@ def _archive_deleted_rows_for_table(tablename, max_rows):
         instances = models.BASE.metadata.tables['instances']
         limit = max_rows - rows_archived if max_rows is not None else None
         extra = _archive_if_instance_deleted(table, shadow_table, instances,
-                                             conn, limit)
+                                             conn, limit, purge=purge)
         rows_archived += extra
 
     return rows_archived, deleted_instance_uuids
 
 
-def archive_deleted_rows(max_rows=None):
+def _get_archive_table_groups(meta):
+    """Group the tables to archive so that the tables of a group do not
+    reference each other.
+
+    :returns: list of lists of table names, in the order the groups must be
+              archived: a table referencing another table by foreign key is
+              in an earlier group than the referenced table.
+    """
+    depths = {}
+    for table in meta.sorted_tables:
+        # sorted_tables lists the referenced tables first, so their depth is
+        # already known, except for the table referencing itself.
+        depths[table.name] = max([depths[fk.column.table.name] + 1
+                                  for fk in table.foreign_keys
+                                  if fk.column.table.name in depths] or [0])
+    groups = collections.defaultdict(list)
+    for table in reversed(meta.sorted_tables):
+        tablename = table.name
+        # skip the special sqlalchemy-migrate migrate_version table and any
+        # shadow tables
+        if (tablename == 'migrate_version' or
+                tablename.startswith(_SHADOW_TABLE_PREFIX)):
+            continue
+        groups[depths[tablename]].append(tablename)
+    return [groups[depth] for depth in sorted(groups, reverse=True)]
+
+
+def archive_deleted_rows(max_rows=None, context=None, purge=False,
+                         markers=None, workers=1):
     """Move up to max_rows rows from production tables to the corresponding
     shadow tables.
 
+    :param context: The request context targeting the database to archive,
+                    or None to archive the main database
+    :param purge: Whether to delete the rows without copying them to the
+                  shadow tables
+    :param markers: Optional dict of table name to the primary key of the
+                    last row archived from that table, updated as rows are
+                    archived
+    :param workers: Number of tables to archive concurrently. Only tables
+                    which do not reference each other are archived
+                    concurrently, each of them with the number of rows
+                    left to archive, so that more than max_rows rows may be
+                    archived in total when workers is greater than 1.
     :returns: dict that maps table name to number of rows archived from that
               table, for example:
 
@@ -5895,26 +6360,33 @@ def archive_deleted_rows(max_rows=None):
     table_to_rows_archived = {}
     deleted_instance_uuids = []
     total_rows_archived = 0
-    meta = MetaData(get_engine(use_slave=True))
+    meta = MetaData(get_engine(use_slave=True, context=context))
     meta.reflect()
-    # Reverse sort the tables so we get the leaf nodes first for processing.
-    for table in reversed(meta.sorted_tables):
-        tablename = table.name
-        rows_archived = 0
-        # skip the special sqlalchemy-migrate migrate_version table and any
-        # shadow tables
-        if (tablename == 'migrate_version' or
-                tablename.startswith(_SHADOW_TABLE_PREFIX)):
-            continue
-        rows_archived,\
-        deleted_instance_uuid = _archive_deleted_rows_for_table(
-                tablename, max_rows=max_rows - total_rows_archived)
-        total_rows_archived += rows_archived
-        if tablename == 'instances':
-            deleted_instance_uuids = deleted_instance_uuid
-        # Only report results for tables that had updates.
-        if rows_archived:
-            table_to_rows_archived[tablename] = rows_archived
+
+    def _archive(tablename, limit):
+        return tablename, _archive_deleted_rows_for_table(
+            tablename, max_rows=limit, context=context, purge=purge,
+            markers=markers)
+
+    pool = eventlet.GreenPool(workers)
+    # Get the groups of tables with the leaf nodes first for processing.
+    for tablenames in _get_archive_table_groups(meta):
+        if workers > 1:
+            limit = max_rows - total_rows_archived
+            results = pool.imap(_archive, tablenames,
+                                [limit] * len(tablenames))
+        else:
+            results = (_archive(tablename, max_rows - total_rows_archived)
+                       for tablename in tablenames)
+        for tablename, (rows_archived, deleted_instance_uuid) in results:
+            total_rows_archived += rows_archived
+            if tablename == 'instances':
+                deleted_instance_uuids = deleted_instance_uuid
+            # Only report results for tables that had updates.
+            if rows_archived:
+                table_to_rows_archived[tablename] = rows_archived
+            if workers == 1 and total_rows_archived >= max_rows:
+                break
         if total_rows_archived >= max_rows:
             break
     return table_to_rows_archived, deleted_instance_uuids
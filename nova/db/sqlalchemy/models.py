@@ -221,6 +221,8 @@ class Instance(BASE, NovaBase, models.SoftDeleteMixin):
               'deleted', 'created_at'),
         Index('instances_updated_at_project_id_idx',
               'updated_at', 'project_id'),
+        Index('instances_display_name_deleted_idx',
+              'display_name', 'deleted'),
         schema.UniqueConstraint('uuid', name='uniq_instances0uuid'),
     )
     injected_files = []
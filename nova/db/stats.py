@@ -0,0 +1,151 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Statistics of the database statements run on behalf of a request.
+
+The database backend calls :func:`record` once for every statement it runs.
+The statement is accounted to the request context which is current in the
+greenthread, and to the outermost DB API function being called, see
+:func:`db_api_function`.
+"""
+
+import contextlib
+import threading
+
+from oslo_context import context as common_context
+from oslo_log import log as logging
+
+import nova.conf
+
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# Name used for statements run outside of a DB API function, for example by
+# objects using the enginefacade directly.
+UNKNOWN_FUNCTION = '-'
+
+_local = threading.local()
+_collectors = []
+
+
+class DBStats(object):
+    """Statements, rows and time spent in the database.
+
+    The totals are kept along with a breakdown per DB API function.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+        self.time = 0.0
+        self.functions = {}
+
+    def add(self, function, rows, elapsed):
+        self.statements += 1
+        self.rows += rows
+        self.time += elapsed
+        counts = self.functions.setdefault(function, [0, 0, 0.0])
+        counts[0] += 1
+        counts[1] += rows
+        counts[2] += elapsed
+
+    def top_functions(self, limit=5):
+        """Return the DB API functions which ran the most statements.
+
+        :returns: A list of (function, statements) tuples, the biggest first
+        """
+        top = sorted(self.functions.items(),
+                     key=lambda item: item[1][0], reverse=True)
+        return [(function, counts[0]) for function, counts in top[:limit]]
+
+    def __str__(self):
+        return ('%(statements)d statements, %(rows)d rows, %(time).6fs' %
+                {'statements': self.statements, 'rows': self.rows,
+                 'time': self.time})
+
+
+@contextlib.contextmanager
+def db_api_function(name):
+    """Account the statements run within the block to a DB API function.
+
+    DB API functions calling each other are accounted to the outermost one,
+    which is the one called from outside of the database layer.
+    """
+    if getattr(_local, 'function', None) is not None:
+        yield
+        return
+    _local.function = name
+    try:
+        yield
+    finally:
+        _local.function = None
+
+
+def record(rows, elapsed):
+    """Record a statement run in the current greenthread.
+
+    :param rows: The number of rows returned or changed by the statement, as
+                 reported by the driver. Negative values are ignored.
+    :param elapsed: The time it took to run the statement, in seconds
+    """
+    function = getattr(_local, 'function', None) or UNKNOWN_FUNCTION
+    rows = max(rows or 0, 0)
+    for stats in _collectors:
+        stats.add(function, rows, elapsed)
+
+    if not CONF.db_statement_stats:
+        return
+    context = common_context.get_current()
+    if context is None:
+        return
+    stats = getattr(context, 'db_stats', None)
+    if stats is None:
+        stats = context.db_stats = DBStats()
+    stats.add(function, rows, elapsed)
+
+
+def add_collector(stats):
+    """Record all the statements run by the process into stats as well."""
+    _collectors.append(stats)
+
+
+def remove_collector(stats):
+    _collectors.remove(stats)
+
+
+def report(context, description):
+    """Log and reset the statistics collected for a request context.
+
+    A warning is logged when the statements go over the configured budget.
+
+    :param context: The request context the statements were accounted to
+    :param description: What the statements were run for, used in the logs
+    :returns: The DBStats of the context, or None if nothing was recorded
+    """
+    stats = getattr(context, 'db_stats', None)
+    if stats is None:
+        return None
+    context.db_stats = None
+
+    LOG.debug('Database statements of %(description)s: %(stats)s',
+              {'description': description, 'stats': stats})
+    budget = CONF.db_statement_budget
+    if budget and stats.statements > budget:
+        LOG.warning('%(description)s ran %(statements)d database statements '
+                    'which is over the budget of %(budget)d, this could be '
+                    'an N+1 query pattern. DB API functions running the most '
+                    'statements: %(top)s',
+                    {'description': description,
+                     'statements': stats.statements, 'budget': budget,
+                     'top': ', '.join('%s (%d)' % item
+                                      for item in stats.top_functions())})
+    return stats
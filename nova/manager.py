@@ -51,7 +51,13 @@ This module provides Manager, a base class for managers.
 
 """
 
+import functools
+import time
+import zlib
+
+from oslo_log import log as logging
 from oslo_service import periodic_task
+from oslo_utils import timeutils
 import six
 
 import nova.conf
@@ -62,10 +68,108 @@ from nova import rpc
 
 CONF = nova.conf.CONF
 
+LOG = logging.getLogger(__name__)
+
+# Periodic tasks return this when a run found nothing to do, which lets
+# the interval of the task be stretched, see CONF.periodic_task_max_backoff.
+PERIODIC_TASK_IDLE = 'idle'
+
+
+class PeriodicTaskStats(object):
+    """Accounting of the runs of a periodic task."""
+
+    def __init__(self):
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.messages = 0
+        self.idle_runs = 0
+        self.runs_to_skip = 0
+
+    def to_dict(self):
+        return {'runs': self.runs, 'skipped': self.skipped,
+                'errors': self.errors, 'total_time': self.total_time,
+                'max_time': self.max_time, 'messages': self.messages}
+
 
 class PeriodicTasks(periodic_task.PeriodicTasks):
     def __init__(self):
         super(PeriodicTasks, self).__init__(CONF)
+        self._periodic_task_stats = {}
+        self._last_periodic_task_stats_report = time.time()
+        self._periodic_tasks = [(name, self._account_periodic_task(name, task))
+                                for name, task in self._periodic_tasks]
+        if CONF.periodic_task_host_jitter:
+            host = getattr(self, 'host', None) or CONF.host
+            for name, last_run in self._periodic_last_run.items():
+                # NOTE: tasks which run immediately keep doing so
+                if last_run is not None:
+                    spacing = max(int(self._periodic_spacing[name]), 1)
+                    key = ('%s.%s' % (host, name)).encode('utf-8')
+                    offset = (zlib.crc32(key) & 0xffffffff) % spacing
+                    self._periodic_last_run[name] = last_run - offset
+
+    def _account_periodic_task(self, name, task):
+        """Wrap a periodic task to account for its runs and back it off while
+        it reports it is idle.
+        """
+        stats = self._periodic_task_stats[name] = PeriodicTaskStats()
+
+        @functools.wraps(task)
+        def wrapper(manager, context):
+            if stats.runs_to_skip > 0:
+                stats.runs_to_skip -= 1
+                stats.skipped += 1
+                return
+            with rpc.MessageCounter() as counter:
+                with timeutils.StopWatch() as timer:
+                    try:
+                        result = task(manager, context)
+                    except Exception:
+                        stats.errors += 1
+                        raise
+                    finally:
+                        elapsed = timer.elapsed()
+                        stats.runs += 1
+                        stats.total_time += elapsed
+                        stats.max_time = max(stats.max_time, elapsed)
+                        stats.messages += counter.count
+            LOG.debug('Periodic task %(name)s took %(time)0.2f seconds and '
+                      'sent %(messages)d messages',
+                      {'name': name, 'time': elapsed,
+                       'messages': counter.count})
+            if result == PERIODIC_TASK_IDLE:
+                stats.idle_runs += 1
+                # Stretch the interval of the task by skipping the next
+                # runs, doubling the interval on each idle run.
+                factor = min(2 ** stats.idle_runs,
+                             CONF.periodic_task_max_backoff)
+                stats.runs_to_skip = factor - 1
+            else:
+                stats.idle_runs = 0
+            return result
+
+        return wrapper
+
+    def get_periodic_task_stats(self):
+        """Return the accounting of the periodic tasks, keyed by name."""
+        return {name: stats.to_dict()
+                for name, stats in self._periodic_task_stats.items()}
+
+    def _report_periodic_task_stats(self):
+        interval = CONF.periodic_task_stats_interval
+        if (not interval or time.time() <
+                self._last_periodic_task_stats_report + interval):
+            return
+        self._last_periodic_task_stats_report = time.time()
+        for name, stats in sorted(self.get_periodic_task_stats().items()):
+            LOG.info('Periodic task %(name)s: %(runs)d runs, %(skipped)d '
+                     'skipped, %(errors)d errors, %(total_time)0.2f seconds '
+                     'in total, %(max_time)0.2f seconds at most, '
+                     '%(messages)d messages sent',
+                     dict(stats, name=name))
 
 
 class ManagerMeta(profiler.get_traced_meta(), type(PeriodicTasks)):
@@ -103,7 +207,10 @@ class Manager(base.Base, PeriodicTasks):
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
-        return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
+        idle_for = self.run_periodic_tasks(context,
+                                           raise_on_error=raise_on_error)
+        self._report_periodic_task_stats()
+        return idle_for
 
     def init_host(self):
         """Hook to do additional manager initialization when one requests
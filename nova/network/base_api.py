@@ -21,6 +21,7 @@ from oslo_log import log as logging
 from oslo_utils import excutils
 
 from nova.db import base
+from nova import exception
 from nova import hooks
 from nova.i18n import _
 from nova.network import model as network_model
@@ -257,6 +258,33 @@ class NetworkAPI(base.Base):
                                                update_cells=update_cells)
         return result
 
+    def get_instances_nw_info(self, context, instances, **kwargs):
+        """Refreshes the network info of several instances.
+
+        Failures are logged and do not stop the other instances from
+        being refreshed.
+
+        :returns: dict of network info keyed by instance uuid, for the
+                  instances which could be refreshed.
+        """
+        result = {}
+        for instance in instances:
+            try:
+                result[instance.uuid] = self.get_instance_nw_info(
+                    context, instance, **kwargs)
+            except exception.InstanceNotFound:
+                # Instance is gone.
+                LOG.debug('Instance no longer exists. Unable to refresh',
+                          instance=instance)
+            except exception.InstanceInfoCacheNotFound:
+                # InstanceInfoCache is gone.
+                LOG.debug('InstanceInfoCache no longer exists. '
+                          'Unable to refresh', instance=instance)
+            except Exception:
+                LOG.error('An error occurred while refreshing the network '
+                          'cache.', instance=instance, exc_info=True)
+        return result
+
     def _get_instance_nw_info(self, context, instance, **kwargs):
         """Template method, so a subclass can implement for neutron/network."""
         raise NotImplementedError()
@@ -22,6 +22,7 @@ from keystoneauth1 import loading as ks_loading
 from neutronclient.common import exceptions as neutron_client_exc
 from neutronclient.v2_0 import client as clientv20
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import uuidutils
 import six
@@ -55,6 +56,9 @@ DEFAULT_SECGROUP = 'default'
 BINDING_PROFILE = 'binding:profile'
 BINDING_HOST_ID = 'binding:host_id'
 MIGRATING_ATTR = 'migrating_to'
+# Maximum number of ids used to filter a single Neutron list query when
+# resources of several instances are fetched at once.
+_BULK_QUERY_CHUNK_SIZE = 50
 
 
 def reset_state():
@@ -192,6 +196,134 @@ def get_client(context, admin=False):
                          admin=admin or context.is_admin)
 
 
+def _list_by_ids(list_func, resource, key, ids, **search_opts):
+    """List the Neutron resources whose key is one of ids.
+
+    The ids are sent _BULK_QUERY_CHUNK_SIZE at a time so that the request
+    URIs stay short enough for the Neutron server.
+    """
+    ids = list(ids)
+    result = []
+    for i in range(0, len(ids), _BULK_QUERY_CHUNK_SIZE):
+        search_opts[key] = ids[i:i + _BULK_QUERY_CHUNK_SIZE]
+        result.extend(list_func(**search_opts).get(resource, []))
+    return result
+
+
+class _BulkClient(object):
+    """A Neutron client answering from resources fetched in bulk.
+
+    Building the network info of an instance lists its ports, networks,
+    subnets, DHCP ports and floating IPs. This client answers exactly those
+    queries from data which was fetched for several instances at once, and
+    passes anything else through to the wrapped client.
+
+    The data is fetched before the refresh_cache lock of each instance is
+    taken, so is_current() must be checked with the lock held before the
+    client is used to build the network info of an instance.
+    """
+    def __init__(self, client, ports, networks, subnets, dhcp_ports,
+                 floatingips, network_info):
+        """:param client: the client to pass other queries through to
+        :param ports: dict of lists of ports, keyed by device_id
+        :param networks: dict of networks keyed by id; None for the ids
+                         which were queried but not found
+        :param subnets: dict of subnets keyed by id; None for the ids
+                        which were queried but not found
+        :param dhcp_ports: dict of lists of DHCP ports, keyed by network id
+        :param floatingips: dict of lists of floating IPs, keyed by port id
+        :param network_info: dict of the cached network info the data was
+                             fetched for, as returned by
+                             dump_network_info(), keyed by instance uuid
+        """
+        self.client = client
+        self._ports = ports
+        self._networks = networks
+        self._subnets = subnets
+        self._dhcp_ports = dhcp_ports
+        self._floatingips = floatingips
+        self._network_info = network_info
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @staticmethod
+    def dump_network_info(instance):
+        return jsonutils.dumps(instance.get_network_info(), sort_keys=True)
+
+    def is_current(self, instance):
+        """Check that the data fetched for an instance is still current.
+
+        An interface attach or detach, for instance, may have changed the
+        ports of the instance and saved its info cache since the data was
+        fetched, in which case building the network info from it would
+        overwrite the newer info cache with stale data.
+        """
+        if instance.uuid not in self._ports:
+            return False
+        if (self._network_info[instance.uuid] !=
+                self.dump_network_info(instance)):
+            return False
+        ports = self.client.list_ports(device_id=instance.uuid)['ports']
+
+        def by_id(port):
+            return port['id']
+
+        return (sorted(ports, key=by_id) ==
+                sorted(self._ports[instance.uuid], key=by_id))
+
+    @staticmethod
+    def _get_by_ids(resources, ids):
+        """Return the found resources for ids, or None if any of the ids
+        was not part of the bulk query.
+        """
+        if not isinstance(ids, list) or not ids:
+            return None
+        if any(id_ not in resources for id_ in ids):
+            return None
+        found = []
+        for id_ in ids:
+            resource = resources[id_]
+            if resource is not None and resource not in found:
+                found.append(resource)
+        return found
+
+    def list_ports(self, **search_opts):
+        if (set(search_opts) == {'tenant_id', 'device_id'} and
+                search_opts['device_id'] in self._ports):
+            return {'ports': [
+                port for port in self._ports[search_opts['device_id']]
+                if port['tenant_id'] == search_opts['tenant_id']]}
+        if (set(search_opts) == {'network_id', 'device_owner'} and
+                search_opts['device_owner'] == 'network:dhcp' and
+                search_opts['network_id'] in self._dhcp_ports):
+            return {'ports': self._dhcp_ports[search_opts['network_id']]}
+        return self.client.list_ports(**search_opts)
+
+    def list_networks(self, **search_opts):
+        if set(search_opts) == {'id'}:
+            networks = self._get_by_ids(self._networks, search_opts['id'])
+            if networks is not None:
+                return {'networks': networks}
+        return self.client.list_networks(**search_opts)
+
+    def list_subnets(self, **search_opts):
+        if set(search_opts) == {'id'}:
+            subnets = self._get_by_ids(self._subnets, search_opts['id'])
+            if subnets is not None:
+                return {'subnets': subnets}
+        return self.client.list_subnets(**search_opts)
+
+    def list_floatingips(self, **search_opts):
+        if (set(search_opts) == {'fixed_ip_address', 'port_id'} and
+                search_opts['port_id'] in self._floatingips):
+            return {'floatingips': [
+                fip for fip in self._floatingips[search_opts['port_id']]
+                if (fip['fixed_ip_address'] ==
+                    search_opts['fixed_ip_address'])]}
+        return self.client.list_floatingips(**search_opts)
+
+
 def _is_not_duplicate(item, items, items_list_name, instance):
     present = item in items
 
@@ -1374,6 +1506,74 @@ class API(base_api.NetworkAPI):
                    {'port_id': port_id, 'reason': exc})
             raise exception.NovaException(message=msg)
 
+    def get_instances_nw_info(self, context, instances, **kwargs):
+        """Refreshes the network info of several instances.
+
+        The ports, networks, subnets and floating IPs of all the instances
+        are fetched with a few bulk requests to Neutron rather than several
+        requests per instance. They are only used for an instance if its
+        ports and info cache did not change in the meantime.
+        """
+        if not instances:
+            return {}
+        client = get_client(context, admin=True)
+        try:
+            client = self._get_bulk_client(client, instances)
+        except Exception:
+            LOG.warning('Failed to fetch the network resources of %d '
+                        'instances in bulk, they will be fetched one '
+                        'instance at a time.', len(instances), exc_info=True)
+        return super(API, self).get_instances_nw_info(
+            context, instances, admin_client=client, **kwargs)
+
+    def _get_bulk_client(self, client, instances):
+        """Fetch what is needed to build the network info of instances and
+        return a _BulkClient answering from it.
+        """
+        ports = {instance.uuid: [] for instance in instances}
+        for port in _list_by_ids(client.list_ports, 'ports', 'device_id',
+                                 ports):
+            if port['device_id'] in ports:
+                ports[port['device_id']].append(port)
+        all_ports = [port for instance_ports in ports.values()
+                     for port in instance_ports]
+
+        net_ids = set()
+        for instance in instances:
+            net_ids.update(vif['network']['id']
+                           for vif in instance.get_network_info() or [])
+        networks = dict.fromkeys(net_ids)
+        networks.update(
+            (net['id'], net) for net in
+            _list_by_ids(client.list_networks, 'networks', 'id', net_ids))
+
+        subnet_ids = set(ip['subnet_id'] for port in all_ports
+                         for ip in port['fixed_ips'])
+        subnets = dict.fromkeys(subnet_ids)
+        subnets.update(
+            (subnet['id'], subnet) for subnet in
+            _list_by_ids(client.list_subnets, 'subnets', 'id', subnet_ids))
+
+        dhcp_ports = {subnet['network_id']: [] for subnet in subnets.values()
+                      if subnet is not None}
+        for port in _list_by_ids(client.list_ports, 'ports', 'network_id',
+                                 dhcp_ports, device_owner='network:dhcp'):
+            if port['network_id'] in dhcp_ports:
+                dhcp_ports[port['network_id']].append(port)
+
+        floatingips = {port['id']: [] for port in all_ports}
+        port_ids = list(floatingips)
+        for i in range(0, len(port_ids), _BULK_QUERY_CHUNK_SIZE):
+            chunk = port_ids[i:i + _BULK_QUERY_CHUNK_SIZE]
+            for fip in self._safe_get_floating_ips(client, port_id=chunk):
+                if fip['port_id'] in floatingips:
+                    floatingips[fip['port_id']].append(fip)
+
+        network_info = {instance.uuid: _BulkClient.dump_network_info(instance)
+                        for instance in instances}
+        return _BulkClient(client, ports, networks, subnets, dhcp_ports,
+                           floatingips, network_info)
+
     def _get_instance_nw_info(self, context, instance, networks=None,
                               port_ids=None, admin_client=None,
                               preexisting_port_ids=None, **kwargs):
@@ -1385,6 +1585,11 @@ class API(base_api.NetworkAPI):
         # Otherwise multiple requests could collide and cause cache
         # corruption.
         compute_utils.refresh_info_cache_for_instance(context, instance)
+        if (isinstance(admin_client, _BulkClient) and
+                not admin_client.is_current(instance)):
+            LOG.debug('The network resources fetched in bulk are outdated, '
+                      'fetching them again.', instance=instance)
+            admin_client = admin_client.client
         nw_info = self._build_network_info_model(context, instance, networks,
                                                  port_ids, admin_client,
                                                  preexisting_port_ids)
@@ -13,6 +13,7 @@
 from nova import db
 from nova.objects import base
 from nova.objects import fields
+from nova import utils
 
 
 @base.NovaObjectRegistry.register
@@ -97,3 +98,36 @@ class BandwidthUsageList(base.ObjectListBase, base.NovaObject):
                                                 start_period=start_period,
                                                 use_slave=use_slave)
         return base.obj_make_list(context, cls(), BandwidthUsage, db_bw_usages)
+
+    @classmethod
+    def update_all(cls, context, usages, start_period, last_refreshed=None,
+                   update_cells=True):
+        """Update the bandwidth usage of several instance networks.
+
+        When remoted through the indirection API, the usages are updated in
+        a single round-trip instead of one per network.
+
+        :param:usages: A list of dicts with the uuid, mac, bw_in, bw_out,
+                       last_ctr_in and last_ctr_out of each network
+        """
+        if cls.indirection_api is None:
+            db.bw_usage_update_multi(context, usages, start_period,
+                                     last_refreshed=last_refreshed,
+                                     update_cells=update_cells)
+            return
+
+        try:
+            if not hasattr(cls.indirection_api, 'bw_usage_update_multi'):
+                raise NotImplementedError()
+            cls.indirection_api.bw_usage_update_multi(
+                context, usages, utils.strtime(start_period),
+                last_refreshed and utils.strtime(last_refreshed),
+                update_cells)
+        except NotImplementedError:
+            # NOTE: the conductor is too old for batches
+            for usage in usages:
+                BandwidthUsage(context=context).create(
+                    usage['uuid'], usage['mac'], usage['bw_in'],
+                    usage['bw_out'], usage['last_ctr_in'],
+                    usage['last_ctr_out'], start_period=start_period,
+                    last_refreshed=last_refreshed, update_cells=update_cells)
@@ -14,24 +14,36 @@
 
 """Nova common internal object model"""
 
+import base64
+import collections
 import contextlib
 import datetime
 import functools
 import traceback
+import zlib
 
 import netaddr
 import oslo_messaging as messaging
+from oslo_serialization import msgpackutils
 from oslo_utils import versionutils
 from oslo_versionedobjects import base as ovoo_base
 from oslo_versionedobjects import exception as ovoo_exc
 import six
 
+import nova.conf
 from nova import exception
 from nova import objects
 from nova.objects import fields as obj_fields
 from nova import utils
 
 
+CONF = nova.conf.CONF
+
+# NOTE: key of the compact form of an object primitive, see
+# CONF.rpc_compact_objects
+COMPACT_PRIMITIVE_KEY = 'nova_object.compact'
+
+
 def get_attrname(name):
     """Return the mangled name of the attribute's underlying storage."""
     # FIXME(danms): This is just until we use o.vo's class properties
@@ -170,6 +182,18 @@ class ObjectListBase(ovoo_base.ObjectListBase):
             return primitive.get(key, default)
 
 
+def obj_compact_primitive(primitive):
+    """Pack an object primitive into its compact form."""
+    packed = zlib.compress(msgpackutils.dumps(primitive))
+    return {COMPACT_PRIMITIVE_KEY: base64.b64encode(packed).decode('ascii')}
+
+
+def obj_expand_primitive(compact):
+    """Unpack an object primitive from its compact form."""
+    packed = base64.b64decode(compact[COMPACT_PRIMITIVE_KEY])
+    return msgpackutils.loads(zlib.decompress(packed))
+
+
 class NovaObjectSerializer(messaging.NoOpSerializer):
     """A NovaObject-aware Serializer.
 
@@ -235,9 +259,13 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         elif (hasattr(entity, 'obj_to_primitive') and
               callable(entity.obj_to_primitive)):
             entity = entity.obj_to_primitive()
+            if CONF.rpc_compact_objects:
+                entity = obj_compact_primitive(entity)
         return entity
 
     def deserialize_entity(self, context, entity):
+        if isinstance(entity, dict) and COMPACT_PRIMITIVE_KEY in entity:
+            entity = obj_expand_primitive(entity)
         if isinstance(entity, dict) and 'nova_object.name' in entity:
             entity = self._process_object(context, entity)
         elif isinstance(entity, (tuple, list, set, dict)):
@@ -290,6 +318,77 @@ def obj_make_dict_of_lists(context, list_cls, obj_list, item_key):
     return obj_lists
 
 
+def _obj_apply_updates(obj, updates):
+    """Apply the updates returned by a remoted object action to obj.
+
+    This mirrors what the remotable decorator does with the result of
+    the object_action() call of the indirection API.
+    """
+    for key, value in updates.items():
+        if key in obj.fields:
+            field = obj.fields[key]
+            if isinstance(value, ovoo_base.VersionedObject):
+                setattr(obj, key, value)
+            else:
+                setattr(obj, key, field.from_primitive(obj, key, value))
+    obj.obj_reset_changes()
+    obj._changed_fields = set(updates.get('obj_what_changed', []))
+
+
+def obj_save_all(objs, **kwargs):
+    """Save all the given objects.
+
+    When objects are remoted through the indirection API, the saves of
+    the objects sharing a context are sent in a single round-trip instead
+    of one per object. If that round-trip fails, the objects are saved one
+    at a time instead, so errors are always reported per object.
+
+    :param:objs: The objects to save
+    :param:kwargs: Keyword arguments to pass to each save() call
+    :returns: A list with, for each object, the exception raised while
+              saving it or None
+    """
+    errors = [None] * len(objs)
+    pending = list(range(len(objs)))
+    indirection_api = NovaObject.indirection_api
+    if (len(objs) > 1 and
+            hasattr(indirection_api, 'object_actions')):
+        pending = []
+        by_context = collections.OrderedDict()
+        for i, obj in enumerate(objs):
+            if obj._context is None:
+                pending.append(i)
+            else:
+                by_context.setdefault(id(obj._context), []).append(i)
+        for indexes in by_context.values():
+            actions = [{'objinst': objs[i], 'objmethod': 'save',
+                        'args': (), 'kwargs': kwargs} for i in indexes]
+            try:
+                results = indirection_api.object_actions(
+                    objs[indexes[0]]._context, actions)
+            except NotImplementedError:
+                # NOTE: the conductor is too old for batches
+                results = [None] * len(indexes)
+            except messaging.MessagingException:
+                # NOTE: the batch was lost or timed out, so we don't know
+                # which objects were saved. Saving them again on their own
+                # is harmless and reports the errors per object.
+                results = [None] * len(indexes)
+            for i, outcome in zip(indexes, results):
+                if outcome is None:
+                    # NOTE: save the object on its own, which also gets us
+                    # the actual error if it failed in the batch
+                    pending.append(i)
+                else:
+                    _obj_apply_updates(objs[i], outcome[0])
+    for i in sorted(pending):
+        try:
+            objs[i].save(**kwargs)
+        except Exception as e:
+            errors[i] = e
+    return errors
+
+
 def serialize_args(fn):
     """Decorator that will do the arguments serialization before remoting."""
     def wrapper(obj, *args, **kwargs):
@@ -52,7 +52,7 @@ def _dict_with_extra_specs(flavor_model):
 # decorators with static methods. We pull these out for now and can
 # move them back into the actual staticmethods on the object when those
 # issues are resolved.
-@db_api.api_context_manager.reader
+@db_api.pick_api_context_manager_reader
 def _get_projects_from_db(context, flavorid):
     db_flavor = context.session.query(api_models.Flavors).\
                 filter_by(flavorid=flavorid).\
@@ -269,7 +269,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
         return flavor
 
     @staticmethod
-    @db_api.api_context_manager.reader
+    @db_api.pick_api_context_manager_reader
     def _flavor_get_query_from_db(context):
         query = context.session.query(api_models.Flavors).\
                 options(joinedload('extra_specs'))
@@ -283,6 +283,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     @staticmethod
     @require_context
+    @db_api.pick_api_context_manager_reader
     def _flavor_get_from_db(context, id):
         """Returns a dict describing specific flavor."""
         result = Flavor._flavor_get_query_from_db(context).\
@@ -294,6 +295,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     @staticmethod
     @require_context
+    @db_api.pick_api_context_manager_reader
     def _flavor_get_by_name_from_db(context, name):
         """Returns a dict describing specific flavor."""
         result = Flavor._flavor_get_query_from_db(context).\
@@ -305,6 +307,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     @staticmethod
     @require_context
+    @db_api.pick_api_context_manager_reader
     def _flavor_get_by_flavor_id_from_db(context, flavor_id):
         """Returns a dict describing specific flavor_id."""
         result = Flavor._flavor_get_query_from_db(context).\
@@ -582,7 +585,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
             payload=payload).emit(self._context)
 
 
-@db_api.api_context_manager.reader
+@db_api.pick_api_context_manager_reader
 def _flavor_get_all_from_db(context, inactive, filters, sort_key, sort_dir,
                             limit, marker):
     """Returns all flavors.
@@ -12,6 +12,7 @@
 
 from sqlalchemy.orm import joinedload
 
+import nova.conf
 from nova import context
 from nova.db.sqlalchemy import api as db_api
 from nova.db.sqlalchemy import api_models
@@ -20,6 +21,9 @@ from nova.i18n import _
 from nova.objects import base
 from nova.objects import cell_mapping
 from nova.objects import fields
+from nova import utils
+
+CONF = nova.conf.CONF
 
 
 def _cell_id_in_updates(updates):
@@ -50,6 +54,9 @@ class HostMapping(base.NovaTimestampObject, base.NovaObject):
         'cell_mapping': fields.ObjectField('CellMapping'),
         }
 
+    _CELL_CACHE = utils.ExpiringLRUCache()
+    _CELL_CACHING = False
+
     def _get_cell_mapping(self):
         with db_api.api_context_manager.reader.using(self._context) as session:
             cell_map = (session.query(api_models.CellMapping)
@@ -100,6 +107,39 @@ class HostMapping(base.NovaTimestampObject, base.NovaObject):
         db_mapping = cls._get_by_host_from_db(context, host)
         return cls._from_db_object(context, cls(), db_mapping)
 
+    @classmethod
+    def enable_cell_cache(cls):
+        cls.clear_cell_cache()
+        cls._CELL_CACHING = True
+
+    @classmethod
+    def clear_cell_cache(cls, host=None):
+        """Remove one host, or all of them, from the mapping cache."""
+        if host is None:
+            cls._CELL_CACHE.clear()
+        else:
+            cls._CELL_CACHE.delete(host)
+
+    @classmethod
+    def get_by_host_cached(cls, context, host):
+        """Get the mapping of a host, from the cache if possible.
+
+        The cached mappings can be up to [DEFAULT]/mapping_cache_ttl seconds
+        old, so callers getting a NotFound error from the cell should call
+        clear_cell_cache().
+        """
+        if not cls._CELL_CACHING or not CONF.mapping_cache_ttl:
+            return cls.get_by_host(context, host)
+
+        primitive = cls._CELL_CACHE.get(host)
+        if primitive is not None:
+            return cls.obj_from_primitive(primitive, context=context)
+
+        host_mapping = cls.get_by_host(context, host)
+        cls._CELL_CACHE.set(host, host_mapping.obj_to_primitive(),
+                            CONF.mapping_cache_ttl, CONF.mapping_cache_size)
+        return host_mapping
+
     @staticmethod
     @db_api.api_context_manager.writer
     def _create_in_db(context, updates):
@@ -128,6 +168,7 @@ class HostMapping(base.NovaTimestampObject, base.NovaObject):
         changes = self.obj_get_changes()
         # cell_mapping must be mapped to cell_id for updates
         _cell_id_in_updates(changes)
+        self.clear_cell_cache(self.host)
         db_mapping = self._save_in_db(self._context, self, changes)
         self._from_db_object(self._context, self, db_mapping)
         self.obj_reset_changes()
@@ -142,6 +183,7 @@ class HostMapping(base.NovaTimestampObject, base.NovaObject):
 
     @base.remotable
     def destroy(self):
+        self.clear_cell_cache(self.host)
         self._destroy_in_db(self._context, self.host)
 
 
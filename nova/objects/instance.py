@@ -12,7 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import contextlib
+import weakref
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
@@ -73,6 +75,23 @@ INSTANCE_DEFAULT_FIELDS = ['metadata', 'system_metadata',
 # Maximum count of tags to one instance
 MAX_TAG_COUNT = 50
 
+# These are fields that are lazy-loaded for all the members of an
+# InstanceList at once, when lazy-loaded on one of them
+_INSTANCE_BATCH_LOADABLE_ATTRS = ['metadata', 'system_metadata',
+                                  'info_cache', 'security_groups',
+                                  'pci_devices', 'tags', 'fault',
+                                  'flavor', 'old_flavor', 'new_flavor',
+                                  'numa_topology', 'pci_requests',
+                                  'vcpu_model', 'migration_context',
+                                  'device_metadata']
+_FLAVOR_ATTRS = ['flavor', 'old_flavor', 'new_flavor']
+
+# Number of lazy-loads of instance attributes, keyed by attribute and by
+# whether they were done for a whole InstanceList ('batch') or for a single
+# instance ('single'). Single loads of a member of an InstanceList are
+# counted as 'n+1', as they are where N+1 query patterns still happen.
+LAZY_LOAD_COUNTS = collections.Counter()
+
 
 def _expected_cols(expected_attrs):
     """Return expected_attrs that are columns needing joining.
@@ -1046,11 +1065,19 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             raise exception.OrphanedObjectError(method='obj_load_attr',
                                                 objtype=self.obj_name())
 
+        if self._load_attr_in_batch(attrname):
+            return
+
         LOG.debug("Lazy-loading '%(attr)s' on %(name)s uuid %(uuid)s",
                   {'attr': attrname,
                    'name': self.obj_name(),
                    'uuid': self.uuid,
                    })
+        instance_list = self._get_instance_list()
+        if instance_list is not None and len(instance_list) > 1:
+            LAZY_LOAD_COUNTS[(attrname, 'n+1')] += 1
+        else:
+            LAZY_LOAD_COUNTS[(attrname, 'single')] += 1
 
         # NOTE(danms): We handle some fields differently here so that we
         # can be more efficient
@@ -1096,6 +1123,52 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._load_generic(attrname)
         self.obj_reset_changes([attrname])
 
+    def _get_instance_list(self):
+        """Return the InstanceList this instance was taken from, if any."""
+        instance_list_ref = getattr(self, '_instance_list', None)
+        return instance_list_ref() if instance_list_ref else None
+
+    def _load_attr_in_batch(self, attrname):
+        """Lazy-load an attribute on all the members of our InstanceList.
+
+        :returns: True if the attribute was loaded on this instance, False
+                  if it has to be loaded on its own.
+        """
+        instance_list = self._get_instance_list()
+        if (instance_list is None or
+                attrname not in _INSTANCE_BATCH_LOADABLE_ATTRS or
+                self.obj_attr_is_set('deleted') and self.deleted):
+            return False
+        members = [inst for inst in instance_list
+                   if (not inst.obj_attr_is_set(attrname) and
+                       inst.obj_attr_is_set('uuid') and
+                       not (inst.obj_attr_is_set('deleted') and
+                            inst.deleted))]
+        if not any(inst is self for inst in members):
+            members.append(self)
+        if len(members) < 2:
+            return False
+
+        attrs = _FLAVOR_ATTRS if attrname in _FLAVOR_ATTRS else [attrname]
+        LOG.debug("Lazy-loading '%(attr)s' on %(count)d instances",
+                  {'attr': attrname, 'count': len(members)})
+        LAZY_LOAD_COUNTS[(attrname, 'batch')] += 1
+        loaded = InstanceList.get_by_filters(
+            self._context, {'uuid': [inst.uuid for inst in members],
+                            'deleted': False},
+            expected_attrs=attrs[:1])
+        loaded = {inst.uuid: inst for inst in loaded}
+        for inst in members:
+            source = loaded.get(inst.uuid)
+            if source is None:
+                continue
+            for attr in attrs:
+                if (source.obj_attr_is_set(attr) and
+                        not inst.obj_attr_is_set(attr)):
+                    setattr(inst, attr, getattr(source, attr))
+                    inst.obj_reset_changes([attr])
+        return self.obj_attr_is_set(attrname)
+
     def get_flavor(self, namespace=None):
         prefix = ('%s_' % namespace) if namespace is not None else ''
         attr = '%sflavor' % prefix
@@ -1220,6 +1293,22 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         'objects': fields.ListOfObjectsField('Instance'),
     }
 
+    def _link_member(self, inst):
+        # NOTE: Members keep a weak reference to the list, so that they
+        # can lazy-load attributes for all the members at once, see
+        # Instance._load_attr_in_batch().
+        if isinstance(inst, Instance):
+            inst._instance_list = weakref.ref(self)
+        return inst
+
+    def __iter__(self):
+        for inst in self.objects:
+            yield self._link_member(inst)
+
+    def __getitem__(self, index):
+        return self._link_member(
+            super(InstanceList, self).__getitem__(index))
+
     @classmethod
     @db.select_db_reader_mode
     def _get_by_filters_impl(cls, context, filters,
@@ -12,6 +12,7 @@
 
 from sqlalchemy.orm import joinedload
 
+import nova.conf
 from nova.db.sqlalchemy import api as db_api
 from nova.db.sqlalchemy import api_models
 from nova import exception
@@ -19,6 +20,9 @@ from nova import objects
 from nova.objects import base
 from nova.objects import cell_mapping
 from nova.objects import fields
+from nova import utils
+
+CONF = nova.conf.CONF
 
 
 @base.NovaObjectRegistry.register
@@ -33,6 +37,9 @@ class InstanceMapping(base.NovaTimestampObject, base.NovaObject):
         'project_id': fields.StringField(),
         }
 
+    _CELL_CACHE = utils.ExpiringLRUCache()
+    _CELL_CACHING = False
+
     def _update_with_cell_id(self, updates):
         cell_mapping_obj = updates.pop("cell_mapping", None)
         if cell_mapping_obj:
@@ -72,6 +79,42 @@ class InstanceMapping(base.NovaTimestampObject, base.NovaObject):
         db_mapping = cls._get_by_instance_uuid_from_db(context, instance_uuid)
         return cls._from_db_object(context, cls(), db_mapping)
 
+    @classmethod
+    def enable_cell_cache(cls):
+        cls.clear_cell_cache()
+        cls._CELL_CACHING = True
+
+    @classmethod
+    def clear_cell_cache(cls, instance_uuid=None):
+        """Remove one instance, or all of them, from the mapping cache."""
+        if instance_uuid is None:
+            cls._CELL_CACHE.clear()
+        else:
+            cls._CELL_CACHE.delete(instance_uuid)
+
+    @classmethod
+    def get_by_instance_uuid_cached(cls, context, instance_uuid):
+        """Get the mapping of an instance, from the cache if possible.
+
+        Only the mappings of instances in a cell are cached, since the others
+        are updated once the instance is scheduled. The cached mappings can be
+        up to [DEFAULT]/mapping_cache_ttl seconds old, so callers getting a
+        NotFound error from the cell should call clear_cell_cache().
+        """
+        if not cls._CELL_CACHING or not CONF.mapping_cache_ttl:
+            return cls.get_by_instance_uuid(context, instance_uuid)
+
+        primitive = cls._CELL_CACHE.get(instance_uuid)
+        if primitive is not None:
+            return cls.obj_from_primitive(primitive, context=context)
+
+        inst_mapping = cls.get_by_instance_uuid(context, instance_uuid)
+        if inst_mapping.cell_mapping is not None:
+            cls._CELL_CACHE.set(instance_uuid, inst_mapping.obj_to_primitive(),
+                                CONF.mapping_cache_ttl,
+                                CONF.mapping_cache_size)
+        return inst_mapping
+
     @staticmethod
     @db_api.api_context_manager.writer
     def _create_in_db(context, updates):
@@ -114,6 +157,7 @@ class InstanceMapping(base.NovaTimestampObject, base.NovaObject):
     def save(self):
         changes = self.obj_get_changes()
         changes = self._update_with_cell_id(changes)
+        self.clear_cell_cache(self.instance_uuid)
         db_mapping = self._save_in_db(self._context, self.instance_uuid,
                 changes)
         self._from_db_object(self._context, self, db_mapping)
@@ -129,6 +173,7 @@ class InstanceMapping(base.NovaTimestampObject, base.NovaObject):
 
     @base.remotable
     def destroy(self):
+        self.clear_cell_cache(self.instance_uuid)
         self._destroy_in_db(self._context, self.instance_uuid)
 
 
@@ -57,3 +57,38 @@ class VolumeUsage(base.NovaPersistentObject, base.NovaObject):
             self.instance_uuid, self.project_id, self.user_id,
             self.availability_zone, update_totals=update_totals)
         self._from_db_object(self._context, self, db_vol_usage)
+
+    @classmethod
+    def save_all(cls, context, vol_usages):
+        """Save the current usage of several volumes.
+
+        When remoted through the indirection API, the usages are saved in a
+        single round-trip instead of one per volume.
+
+        :param:vol_usages: The VolumeUsage objects to save
+        """
+        usages = [{field: getattr(vol_usage, field)
+                   for field in ('volume_id', 'instance_uuid', 'project_id',
+                                 'user_id', 'availability_zone',
+                                 'curr_reads', 'curr_read_bytes',
+                                 'curr_writes', 'curr_write_bytes')}
+                  for vol_usage in vol_usages]
+        if cls.indirection_api is None:
+            db_vol_usages = db.vol_usage_update_multi(context, usages)
+        else:
+            try:
+                if not hasattr(cls.indirection_api, 'vol_usage_update_multi'):
+                    raise NotImplementedError()
+                db_vol_usages = cls.indirection_api.vol_usage_update_multi(
+                    context, usages)
+            except NotImplementedError:
+                # NOTE: the conductor is too old for batches
+                for vol_usage in vol_usages:
+                    vol_usage.save()
+                return
+
+        db_vol_usages = {db_vol_usage['volume_id']: db_vol_usage
+                         for db_vol_usage in db_vol_usages}
+        for vol_usage in vol_usages:
+            cls._from_db_object(context, vol_usage,
+                                db_vol_usages[vol_usage.volume_id])
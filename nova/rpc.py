@@ -26,6 +26,7 @@ __all__ = [
 ]
 
 import functools
+import threading
 
 from oslo_log import log as logging
 import oslo_messaging as messaging
@@ -56,6 +57,9 @@ ALLOWED_EXMODS = [
 ]
 EXTRA_EXMODS = []
 
+# NOTE: threading.local is greenthread local once eventlet monkey patched it
+_LOCAL = threading.local()
+
 
 def init(conf):
     global TRANSPORT, NOTIFICATION_TRANSPORT, LEGACY_NOTIFIER, NOTIFIER
@@ -113,6 +117,34 @@ def get_allowed_exmods():
     return ALLOWED_EXMODS + EXTRA_EXMODS
 
 
+class MessageCounter(object):
+    """Context manager counting the RPC messages and notifications sent by
+    the current thread while it is active.
+
+    Counters can be nested, the messages counted by an inner counter are
+    also counted by the outer one.
+    """
+    def __init__(self):
+        self.count = 0
+        self._outer = None
+
+    def __enter__(self):
+        self._outer = getattr(_LOCAL, 'message_counter', None)
+        _LOCAL.message_counter = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _LOCAL.message_counter = self._outer
+        if self._outer is not None:
+            self._outer.count += self.count
+
+
+def _count_message():
+    counter = getattr(_LOCAL, 'message_counter', None)
+    if counter is not None:
+        counter.count += 1
+
+
 class JsonPayloadSerializer(messaging.NoOpSerializer):
     @staticmethod
     def serialize_entity(context, entity):
@@ -135,6 +167,8 @@ class RequestContextSerializer(messaging.Serializer):
         return self._base.deserialize_entity(context, entity)
 
     def serialize_context(self, context):
+        # NOTE: this is called once for every message sent
+        _count_message()
         return context.to_dict()
 
     def deserialize_context(self, context):
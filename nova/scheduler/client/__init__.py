@@ -60,7 +60,7 @@ class SchedulerClient(object):
 
     def set_inventory_for_provider(self, context, rp_uuid, rp_name, inv_data,
                                    parent_provider_uuid=None):
-        self.reportclient.set_inventory_for_provider(
+        return self.reportclient.set_inventory_for_provider(
             context,
             rp_uuid,
             rp_name,
@@ -69,7 +69,7 @@ class SchedulerClient(object):
         )
 
     def update_compute_node(self, context, compute_node):
-        self.reportclient.update_compute_node(context, compute_node)
+        return self.reportclient.update_compute_node(context, compute_node)
 
     def update_instance_info(self, context, host_name, instance_info):
         self.queryclient.update_instance_info(context, host_name,
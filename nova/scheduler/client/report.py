@@ -1013,6 +1013,8 @@ class SchedulerReportClient(object):
                 the UUID of the immediate parent, which is a provider for which
                 this method has already been invoked.
 
+        :returns: True if placement has the supplied inventory for the
+                  provider, False if it could not be updated.
         :raises: exc.InvalidResourceClass if a supplied custom resource class
                  name does not meet the placement API's format requirements.
         """
@@ -1028,7 +1030,7 @@ class SchedulerReportClient(object):
         # sending the generation down, so no way to trigger/detect a conflict
         # if an out-of-band update occurs between when we GET the latest and
         # when we invoke the DELETE.  See bug #1746374.
-        self._update_inventory(context, rp_uuid, inv_data)
+        return bool(self._update_inventory(context, rp_uuid, inv_data))
 
     @safe_connect
     def _ensure_traits(self, context, traits):
@@ -1223,6 +1225,8 @@ class SchedulerReportClient(object):
 
         :param context: The security context
         :param compute_node: updated nova.objects.ComputeNode to report
+        :returns: True if placement has the inventory of the compute node,
+                  False if it could not be updated.
         :raises `exception.InventoryInUse` if the compute node has had changes
                 to its inventory but there are still active allocations for
                 resource classes that would be deleted by an update to the
@@ -1236,7 +1240,8 @@ class SchedulerReportClient(object):
         # sending the generation down, so no way to trigger/detect a conflict
         # if an out-of-band update occurs between when we GET the latest and
         # when we invoke the DELETE.  See bug #1746374.
-        self._update_inventory(context, compute_node.uuid, inv_data)
+        return bool(self._update_inventory(context, compute_node.uuid,
+                                           inv_data))
 
     @safe_connect
     def get_allocations_for_consumer(self, context, consumer):
@@ -715,7 +715,7 @@ class HostManager(object):
 
     def _get_instances_by_host(self, context, host_name):
         try:
-            hm = objects.HostMapping.get_by_host(context, host_name)
+            hm = objects.HostMapping.get_by_host_cached(context, host_name)
         except exception.HostMappingNotFound:
             # It's possible to hit this when the compute service first starts
             # up and casts to update_instance_info with an empty list but
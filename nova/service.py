@@ -357,13 +357,16 @@ class WSGIService(service.Service):
         setup_profiler(name, self.host)
 
     def reset(self):
-        """Reset server greenpool size to default and service version cache.
+        """Reset server greenpool size to default and service version and
+        mapping caches.
 
         :returns: None
 
         """
         self.server.reset()
         service_obj.Service.clear_min_version_cache()
+        objects.InstanceMapping.clear_cell_cache()
+        objects.HostMapping.clear_cell_cache()
 
     def _get_manager(self):
         """Initialize a Manager object appropriate for this service.
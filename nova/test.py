@@ -273,6 +273,8 @@ class TestCase(testtools.TestCase):
             objects_base.NovaObjectRegistry._registry._obj_classes)
         self.addCleanup(self._restore_obj_registry)
         objects.Service.clear_min_version_cache()
+        objects.InstanceMapping.clear_cell_cache()
+        objects.HostMapping.clear_cell_cache()
 
         # NOTE(danms): Reset the cached list of cells
         from nova.compute import api
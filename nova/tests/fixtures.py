@@ -43,6 +43,7 @@ from nova.compute import rpcapi as compute_rpcapi
 from nova import context
 from nova.db import migration
 from nova.db.sqlalchemy import api as session
+from nova.db import stats as db_stats
 from nova import exception
 from nova.network import model as network_model
 from nova import objects
@@ -639,6 +640,41 @@ class DatabaseAtVersion(fixtures.Fixture):
         self.addCleanup(self.cleanup)
 
 
+class DatabaseStatementBudget(fixtures.Fixture):
+    """Fail when more database statements than a budget are run.
+
+    The statements run against the main and API databases are counted while
+    the fixture is in use, and an AssertionError listing the DB API functions
+    which ran them is raised on cleanup if there are more than the budget.
+    It is best used as a context manager around the calls being checked::
+
+        with nova_fixtures.DatabaseStatementBudget(3):
+            db.instance_get_all_by_filters(ctxt, {})
+    """
+
+    def __init__(self, budget):
+        super(DatabaseStatementBudget, self).__init__()
+        self.budget = budget
+
+    def setUp(self):
+        super(DatabaseStatementBudget, self).setUp()
+        self.stats = db_stats.DBStats()
+        for engine in (session.get_engine(), session.get_api_engine()):
+            session.add_statement_stats(engine)
+            self.addCleanup(session.remove_statement_stats, engine)
+        db_stats.add_collector(self.stats)
+        self.addCleanup(db_stats.remove_collector, self.stats)
+        self.addCleanup(self._check_budget)
+
+    def _check_budget(self):
+        if self.stats.statements > self.budget:
+            raise AssertionError(
+                '%d database statements were run, over the budget of %d: %s'
+                % (self.stats.statements, self.budget,
+                   ', '.join('%s (%d)' % item
+                             for item in self.stats.top_functions(None))))
+
+
 class DefaultFlavorsFixture(fixtures.Fixture):
     def setUp(self):
         super(DefaultFlavorsFixture, self).setUp()
@@ -1226,7 +1262,11 @@ class NeutronFixture(fixtures.Fixture):
     def _filter_ports(self, **_params):
         ports = copy.deepcopy(self._ports)
         for opt in _params:
-            filtered_ports = [p for p in ports if p.get(opt) == _params[opt]]
+            # Like Neutron, match any of the values when given a list
+            values = _params[opt]
+            if not isinstance(values, list):
+                values = [values]
+            filtered_ports = [p for p in ports if p.get(opt) in values]
             ports = filtered_ports
         return {'ports': ports}
 
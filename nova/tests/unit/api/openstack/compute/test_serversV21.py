@@ -1444,6 +1444,31 @@ class ServersControllerTest(ControllerTest):
         req = self.req('/fake/servers/detail', use_admin_context=True)
         self.assertIn('servers', self.controller.detail(req))
 
+    def test_get_servers_detail_expected_attrs(self):
+        def fake_get_all(compute_self, context, search_opts=None,
+                         limit=None, marker=None,
+                         expected_attrs=None, sort_keys=None, sort_dirs=None):
+            self.assertEqual(['flavor', 'info_cache', 'metadata',
+                              'security_groups', 'services'], expected_attrs)
+            return objects.InstanceList()
+
+        self.stubs.Set(compute_api.API, 'get_all', fake_get_all)
+
+        req = self.req('/fake/servers/detail')
+        self.assertIn('servers', self.controller.detail(req))
+
+    def test_get_servers_index_expected_attrs(self):
+        def fake_get_all(compute_self, context, search_opts=None,
+                         limit=None, marker=None,
+                         expected_attrs=None, sort_keys=None, sort_dirs=None):
+            self.assertEqual([], expected_attrs)
+            return objects.InstanceList()
+
+        self.stubs.Set(compute_api.API, 'get_all', fake_get_all)
+
+        req = self.req('/fake/servers')
+        self.assertIn('servers', self.controller.index(req))
+
 
 class ServersControllerTestV29(ServersControllerTest):
     wsgi_api_version = '2.9'
@@ -467,9 +467,11 @@ class SimpleTenantUsageLimitsTestV21(test.TestCase):
         return fakes.HTTPRequest.blank(url, version=self.version)
 
     def assert_limit(self, mock_get, limit):
+        # The instances are queried in batches of at most the limit
         mock_get.assert_called_with(
             mock.ANY, mock.ANY, mock.ANY, mock.ANY, expected_attrs=['flavor'],
-            limit=1000, marker=None)
+            limit=min(limit, CONF.api.instance_list_cells_batch_size),
+            marker=None)
 
     @mock.patch('nova.objects.InstanceList.get_active_by_window_joined')
     def test_limit_defaults_to_conf_max_limit_show(self, mock_get):
@@ -483,6 +485,28 @@ class SimpleTenantUsageLimitsTestV21(test.TestCase):
         self.controller.index(req)
         self.assert_limit(mock_get, CONF.api.max_limit)
 
+    @mock.patch('nova.objects.InstanceList.get_active_by_window_joined')
+    def test_limit_queried_in_batches(self, mock_get):
+        self.flags(instance_list_cells_batch_size=2, group='api')
+        instances = [objects.Instance(uuid=getattr(uuids, 'inst%i' % i))
+                     for i in range(5)]
+        mock_get.side_effect = [objects.InstanceList(objects=instances[:2]),
+                                objects.InstanceList(objects=instances[2:4]),
+                                objects.InstanceList(objects=instances[4:])]
+        cells = [objects.CellMapping(uuid=uuids.cell1)]
+        with test.nested(
+            mock.patch.object(objects.CellMappingList, 'get_all',
+                              return_value=cells),
+            mock.patch.object(context, 'target_cell')):
+            result = list(self.controller._get_instances_all_cells(
+                mock.sentinel.context, START, STOP, None, 5, None))
+        self.assertEqual(instances, result)
+        # Each batch starts after the last instance of the previous one and
+        # the last batch is limited to what is left of the limit.
+        self.assertEqual(
+            [(2, None), (2, uuids.inst1), (1, uuids.inst3)],
+            [(c[1]['limit'], c[1]['marker']) for c in mock_get.call_args_list])
+
 
 class SimpleTenantUsageLimitsTestV240(SimpleTenantUsageLimitsTestV21):
     version = '2.40'
@@ -591,6 +615,22 @@ class SimpleTenantUsageControllerTestV21(test.TestCase):
         flavor = self.controller._get_flavor(self.context, self.inst_obj, {})
         self.assertIsNone(flavor)
 
+    @mock.patch.object(simple_tenant_usage_v21.SimpleTenantUsageController,
+                       '_get_instances_all_cells')
+    def test_tenant_usages_for_period_server_usages(self, mock_get):
+        mock_get.side_effect = lambda *a: iter([self.inst_obj])
+        start = self.controller._parse_datetime(START)
+        stop = self.controller._parse_datetime(STOP)
+        for detailed, links, expected in ((False, False, 0),
+                                          (False, True, 1),
+                                          (True, False, 1)):
+            usages, server_usages = self.controller._tenant_usages_for_period(
+                self.context, start, stop, detailed=detailed, links=links)
+            self.assertEqual(1, len(usages))
+            self.assertEqual(HOURS, int(usages[0]['total_hours']))
+            self.assertEqual(detailed, 'server_usages' in usages[0])
+            self.assertEqual(expected, len(server_usages))
+
 
 class SimpleTenantUsageUtilsV21(test.NoDBTestCase):
     simple_tenant_usage = simple_tenant_usage_v21
@@ -0,0 +1,100 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import webob
+
+from nova.api.openstack import db_replica
+from nova import context
+from nova import test
+
+
+class DBReplicaRouteTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(DBReplicaRouteTestCase, self).setUp()
+        self.flags(db_replica_read_resources=['servers', 'flavors'],
+                   group='api')
+        self.flags(enabled=True, backend='oslo_cache.dict', group='cache')
+        self.stub_out('nova.api.openstack.db_replica.MC', None)
+        self.stub_out('nova.api.openstack.db_replica._CACHE_DISABLED_WARNED',
+                      False)
+
+    def _route(self, path, method='GET', user_id='fake-user'):
+        ctxt = context.RequestContext(user_id, 'fake-project')
+        req = webob.Request.blank(path, method=method)
+        with db_replica.route(req, ctxt):
+            pass
+        return ctxt.db_replica_reads
+
+    def test_route_disabled(self):
+        self.flags(db_replica_read_resources=[], group='api')
+        self.assertFalse(self._route('/servers/detail'))
+
+    def test_route_no_context(self):
+        req = webob.Request.blank('/servers')
+        with db_replica.route(req, None):
+            pass
+
+    def test_route_read(self):
+        self.assertTrue(self._route('/servers'))
+        self.assertTrue(self._route('/servers/detail'))
+        self.assertTrue(self._route('/fake-project/flavors/1'))
+        self.assertFalse(self._route('/os-keypairs'))
+        self.assertFalse(self._route('/'))
+
+    @mock.patch('time.time')
+    def test_route_pinned_after_write(self, mock_time):
+        mock_time.return_value = 1000
+        self.assertFalse(self._route('/servers', method='POST'))
+
+        mock_time.return_value = 1004
+        self.assertFalse(self._route('/servers'))
+        # Other users are not pinned
+        self.assertTrue(self._route('/servers', user_id='other-user'))
+
+        mock_time.return_value = 1005
+        self.assertTrue(self._route('/servers'))
+
+    def test_route_write_failed(self):
+        ctxt = context.RequestContext('fake-user', 'fake-project')
+        req = webob.Request.blank('/servers/1', method='DELETE')
+
+        def _delete():
+            with db_replica.route(req, ctxt):
+                raise test.TestingException()
+
+        self.assertRaises(test.TestingException, _delete)
+        self.assertFalse(self._route('/servers'))
+
+    def test_route_no_pin(self):
+        self.flags(db_replica_write_pin=0, group='api')
+        self.assertFalse(self._route('/servers', method='PUT'))
+        self.assertTrue(self._route('/servers'))
+
+    @mock.patch.object(db_replica, 'LOG')
+    def test_route_cache_disabled(self, mock_log):
+        # The writes could not be tracked across API workers, so the reads
+        # don't go to the replicas.
+        self.flags(enabled=False, group='cache')
+        self.assertFalse(self._route('/servers'))
+        self.assertFalse(self._route('/servers'))
+        self.assertEqual(1, mock_log.warning.call_count)
+
+        # ...unless users are not pinned after their writes.
+        self.flags(db_replica_write_pin=0, group='api')
+        self.assertTrue(self._route('/servers'))
+
+    @mock.patch.object(db_replica.cache_utils, 'get_client')
+    def test_write_pin_expires(self, mock_get_client):
+        self.assertFalse(self._route('/servers', method='POST'))
+        mock_get_client.assert_called_once_with(expiration_time=5)
@@ -17,7 +17,12 @@ import mock
 
 import fixtures as fx
 import testtools
+import webob
+import webob.dec
 
+from nova.api.openstack import requestlog
+from nova import context
+from nova.db import stats as db_stats
 from nova.tests import fixtures
 from nova.tests.unit import conf_fixture
 
@@ -126,6 +131,37 @@ class TestRequestLogMiddleware(testtools.TestCase):
                 ' status: 500 len: 0 microversion: - time:')
         self.assertIn(log1, self.stdlog.logger.output)
 
+    @mock.patch('nova.db.stats.report')
+    def test_logs_db_stats(self, report):
+        """Ensure the database statistics of a request are logged.
+
+        The statistics are reported for requests which have a context.
+        """
+
+        stats = db_stats.DBStats()
+        stats.add('instance_get', 2, 0.5)
+        report.return_value = stats
+        self.useFixture(conf_fixture.ConfFixture())
+        ctxt = context.RequestContext('fake-user', 'fake-project',
+                                      is_admin=False)
+
+        @webob.dec.wsgify
+        def app(req):
+            req.environ['nova.context'] = ctxt
+            return webob.Response(status=200)
+
+        req = webob.Request.blank('/v2.1/servers?limit=1',
+                                  remote_addr='127.0.0.1')
+        req.get_response(requestlog.RequestLog(app))
+
+        report.assert_called_once_with(ctxt, 'GET /v2.1/servers?limit=1')
+        log1 = ('INFO [nova.api.openstack.requestlog] 127.0.0.1 '
+                '"GET /v2.1/servers?limit=1" status: 200 len: 0 '
+                'microversion: - time:')
+        self.assertIn(log1, self.stdlog.logger.output)
+        self.assertIn(' db: 1 statements, 2 rows, 0.500000s',
+                      self.stdlog.logger.output)
+
     @mock.patch('nova.api.openstack.requestlog.RequestLog._should_emit')
     def test_no_log_under_eventlet(self, emit):
         """Ensure that logs don't end up under eventlet.
@@ -32,6 +32,8 @@ def restore_db():
         db.api.IMPL = orig
 
 
+# required so we don't buffer the instance action events globally
+@mock.patch('nova.compute.utils.enable_action_event_buffer', new=mock.Mock())
 class ComputeMainTest(test.NoDBTestCase):
     @mock.patch('nova.utils.monkey_patch')
     @mock.patch('nova.conductor.api.API.wait_until_ready')
@@ -24,6 +24,10 @@ from nova import test
 @mock.patch.object(config, 'parse_args', new=lambda *args, **kwargs: None)
 # required so we don't set the global service version cache
 @mock.patch('nova.objects.Service.enable_min_version_cache')
+# nor the global mapping caches
+@mock.patch('nova.objects.InstanceMapping.enable_cell_cache',
+            new=mock.Mock())
+@mock.patch('nova.objects.HostMapping.enable_cell_cache', new=mock.Mock())
 class TestNovaAPI(test.NoDBTestCase):
 
     def test_continues_on_failure(self, version_cache):
@@ -60,6 +60,8 @@ from nova import context
 from nova import db
 from nova import exception
 from nova.image import api as image_api
+from nova import manager
+from nova.network import base_api
 from nova.network import model as network_model
 from nova import objects
 from nova.objects import block_device as block_device_obj
@@ -7043,94 +7045,106 @@ class ComputeTestCase(BaseTestCase,
                                   _get_instance_nw_info_raise=False,
                                   _get_instance_nw_info_raise_cache=False):
         # Update on every call for the test
-        self.flags(heal_instance_info_cache_interval=-1)
+        self.flags(heal_instance_info_cache_interval=-1,
+                   heal_instance_info_cache_batch_size=2)
         ctxt = context.get_admin_context()
 
         instance_map = {}
         instances = []
         for x in range(8):
             inst_uuid = getattr(uuids, 'db_instance_%i' % x)
-            instance_map[inst_uuid] = fake_instance.fake_db_instance(
-                uuid=inst_uuid, host=CONF.host, created_at=None)
-            # These won't be in our instance since they're not requested
+            instance_map[inst_uuid] = fake_instance.fake_instance_obj(
+                ctxt, uuid=inst_uuid, host=CONF.host,
+                vm_state=vm_states.ACTIVE, task_state=None)
+            instance_map[inst_uuid].info_cache = objects.InstanceInfoCache(
+                instance_uuid=inst_uuid, updated_at=None)
             instances.append(instance_map[inst_uuid])
 
-        call_info = {'get_all_by_host': 0, 'get_by_uuid': 0,
-                'get_nw_info': 0, 'expected_instance': None}
-
-        def fake_instance_get_all_by_host(context, host,
-                                          columns_to_join, use_slave=False):
-            call_info['get_all_by_host'] += 1
-            self.assertEqual([], columns_to_join)
-            return instances[:]
-
-        def fake_instance_get_by_uuid(context, instance_uuid,
-                                      columns_to_join, use_slave=False):
-            if instance_uuid not in instance_map:
-                raise exception.InstanceNotFound(instance_id=instance_uuid)
-            call_info['get_by_uuid'] += 1
-            self.assertEqual(['system_metadata', 'info_cache', 'extra',
-                              'extra.flavor'],
-                             columns_to_join)
-            return instance_map[instance_uuid]
+        call_info = {'get_by_host': 0, 'get_by_filters': 0,
+                'get_nw_info': 0, 'expected_instances': None}
+
+        @staticmethod
+        def fake_get_by_host(context, host, expected_attrs, use_slave=False):
+            call_info['get_by_host'] += 1
+            self.assertEqual(['info_cache'], expected_attrs)
+            return objects.InstanceList(objects=instances[:])
+
+        @staticmethod
+        def fake_get_by_filters(context, filters, expected_attrs,
+                                use_slave=False):
+            call_info['get_by_filters'] += 1
+            self.assertFalse(filters['deleted'])
+            self.assertEqual(['system_metadata', 'info_cache', 'flavor'],
+                             expected_attrs)
+            return objects.InstanceList(
+                objects=[instance_map[uuid] for uuid in filters['uuid']
+                         if uuid in instance_map])
 
         # NOTE(comstud): Override the stub in setUp()
-        def fake_get_instance_nw_info(cls, context, instance,
-                                      use_slave=False):
-            # Note that this exception gets caught in compute/manager
-            # and is ignored.  However, the below increment of
-            # 'get_nw_info' won't happen, and you'll get an assert
-            # failure checking it below.
-            self.assertEqual(call_info['expected_instance']['uuid'],
-                             instance['uuid'])
+        def fake_get_instance_nw_info(cls, context, instance, **kwargs):
+            # Note that this exception gets caught in the network API and
+            # is ignored.  However, the below increment of 'get_nw_info'
+            # happens anyway.
+            self.assertIn(instance.uuid, call_info['expected_instances'])
             call_info['get_nw_info'] += 1
             if _get_instance_nw_info_raise:
-                raise exception.InstanceNotFound(instance_id=instance['uuid'])
+                raise exception.InstanceNotFound(instance_id=instance.uuid)
             if _get_instance_nw_info_raise_cache:
                 raise exception.InstanceInfoCacheNotFound(
-                                                instance_uuid=instance['uuid'])
+                                                instance_uuid=instance.uuid)
 
-        self.stub_out('nova.db.instance_get_all_by_host',
-                fake_instance_get_all_by_host)
-        self.stub_out('nova.db.instance_get_by_uuid',
-                fake_instance_get_by_uuid)
+        self.stub_out('nova.objects.InstanceList.get_by_host',
+                fake_get_by_host)
+        self.stub_out('nova.objects.InstanceList.get_by_filters',
+                fake_get_by_filters)
         if CONF.use_neutron:
             self.stub_out(
                 'nova.network.neutronv2.api.API.get_instance_nw_info',
                 fake_get_instance_nw_info)
+            # Skip the bulk port listing, it is tested with the network API
+            self.stub_out(
+                'nova.network.neutronv2.api.API.get_instances_nw_info',
+                base_api.NetworkAPI.get_instances_nw_info)
         else:
             self.stub_out('nova.network.api.API.get_instance_nw_info',
                     fake_get_instance_nw_info)
 
         # Make an instance appear to be still Building
-        instances[0]['vm_state'] = vm_states.BUILDING
+        instances[0].vm_state = vm_states.BUILDING
         # Make an instance appear to be Deleting
-        instances[1]['task_state'] = task_states.DELETING
+        instances[1].task_state = task_states.DELETING
+        # Make the instances with an info_cache come last, oldest first
+        instances[2].info_cache.updated_at = timeutils.utcnow()
+        instances[3].info_cache.updated_at = (
+            timeutils.utcnow() - datetime.timedelta(hours=1))
         # '0', '1' should be skipped..
-        call_info['expected_instance'] = instances[2]
+        call_info['expected_instances'] = [instances[4].uuid,
+                                           instances[5].uuid]
         self.compute._heal_instance_info_cache(ctxt)
-        self.assertEqual(1, call_info['get_all_by_host'])
-        self.assertEqual(0, call_info['get_by_uuid'])
-        self.assertEqual(1, call_info['get_nw_info'])
+        self.assertEqual(1, call_info['get_by_host'])
+        self.assertEqual(1, call_info['get_by_filters'])
+        self.assertEqual(2, call_info['get_nw_info'])
 
-        call_info['expected_instance'] = instances[3]
+        # A network-changed event moves an instance to the front
+        self.compute._instance_uuids_network_changed.add(instances[2].uuid)
+        call_info['expected_instances'] = [instances[2].uuid,
+                                           instances[6].uuid]
         self.compute._heal_instance_info_cache(ctxt)
-        self.assertEqual(1, call_info['get_all_by_host'])
-        self.assertEqual(1, call_info['get_by_uuid'])
-        self.assertEqual(2, call_info['get_nw_info'])
+        self.assertEqual(1, call_info['get_by_host'])
+        self.assertEqual(2, call_info['get_by_filters'])
+        self.assertEqual(4, call_info['get_nw_info'])
+        self.assertEqual(set(), self.compute._instance_uuids_network_changed)
 
         # Make an instance switch hosts
-        instances[4]['host'] = 'not-me'
-        # Make an instance disappear
-        instance_map.pop(instances[5]['uuid'])
+        instances[7].host = 'not-me'
         # Make an instance switch to be Deleting
-        instances[6]['task_state'] = task_states.DELETING
-        # '4', '5', and '6' should be skipped..
-        call_info['expected_instance'] = instances[7]
+        instances[3].task_state = task_states.DELETING
+        # '7' and '3' should be skipped..
+        call_info['expected_instances'] = []
         self.compute._heal_instance_info_cache(ctxt)
-        self.assertEqual(1, call_info['get_all_by_host'])
-        self.assertEqual(4, call_info['get_by_uuid'])
-        self.assertEqual(3, call_info['get_nw_info'])
+        self.assertEqual(1, call_info['get_by_host'])
+        self.assertEqual(3, call_info['get_by_filters'])
+        self.assertEqual(4, call_info['get_nw_info'])
         # Should be no more left.
         self.assertEqual(0, len(self.compute._instance_uuids_to_heal))
 
@@ -7141,11 +7155,11 @@ class ComputeTestCase(BaseTestCase,
 
         self.compute._heal_instance_info_cache(ctxt)
         # Should have called the list once more
-        self.assertEqual(2, call_info['get_all_by_host'])
-        # Stays the same because we remove invalid entries from the list
-        self.assertEqual(4, call_info['get_by_uuid'])
+        self.assertEqual(2, call_info['get_by_host'])
+        # Stays the same because we didn't find anything to load
+        self.assertEqual(3, call_info['get_by_filters'])
         # Stays the same because we didn't find anything to process
-        self.assertEqual(3, call_info['get_nw_info'])
+        self.assertEqual(4, call_info['get_nw_info'])
 
     def test_heal_instance_info_cache(self):
         self._heal_instance_info_cache()
@@ -7439,8 +7453,9 @@ class ComputeTestCase(BaseTestCase,
         mock_is_inst.return_value = True
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context)
 
         mock_get_filter.assert_called_once_with(fake_context,
@@ -7448,7 +7463,8 @@ class ComputeTestCase(BaseTestCase,
                                           'status': ['accepted', 'done'],
                                           'migration_type': 'evacuation'})
         mock_get_inst.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_is_inst.assert_called_once_with(fake_context, evacuated_instance)
         mock_destroy.assert_called_once_with(fake_context, evacuated_instance,
@@ -7498,12 +7514,14 @@ class ComputeTestCase(BaseTestCase,
         mock_check.return_value = False
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context)
 
         mock_get_drv.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_check_local.assert_called_once_with(fake_context,
                                                  evacuated_instance)
@@ -7557,12 +7575,14 @@ class ComputeTestCase(BaseTestCase,
         mock_check_local.side_effect = NotImplementedError
 
         with mock.patch.object(
-                self.compute.network_api, 'get_instance_nw_info',
-                return_value='fake_network_info') as mock_get_nw:
+                self.compute.network_api, 'get_instances_nw_info',
+                return_value={evacuated_instance.uuid: 'fake_network_info'}
+        ) as mock_get_nw:
             self.compute._destroy_evacuated_instances(fake_context)
 
         mock_get_inst.assert_called_once_with(fake_context)
-        mock_get_nw.assert_called_once_with(fake_context, evacuated_instance)
+        mock_get_nw.assert_called_once_with(fake_context,
+                                            [evacuated_instance])
         mock_get_blk.assert_called_once_with(fake_context, evacuated_instance)
         mock_check_local.assert_called_once_with(fake_context,
                                                  evacuated_instance)
@@ -7753,6 +7773,16 @@ class ComputeTestCase(BaseTestCase,
                 ctxt, test.MatchType(objects.Instance), [])
         mock_bdms.assert_called_once_with(ctxt, mock.ANY)
 
+    @mock.patch.object(compute_manager.ComputeManager, '_delete_instance')
+    def test_reclaim_queued_deletes_idle(self, mock_delete):
+        self.flags(reclaim_instance_interval=3600)
+        ctxt = context.get_admin_context()
+        self._create_fake_instance_obj(params={'host': CONF.host})
+
+        self.assertEqual(manager.PERIODIC_TASK_IDLE,
+                         self.compute._reclaim_queued_deletes(ctxt))
+        mock_delete.assert_not_called()
+
     @mock.patch.object(objects.InstanceList, 'get_by_filters')
     @mock.patch.object(compute_manager.ComputeManager, '_deleted_old_enough')
     @mock.patch.object(objects.BlockDeviceMappingList, 'get_by_instance_uuid')
@@ -5375,6 +5375,26 @@ class _ComputeAPIUnitTestMixIn(object):
                                                   'security_groups',
                                                   'info_cache'])
 
+    @mock.patch.object(objects.InstanceMapping, 'clear_cell_cache')
+    @mock.patch.object(context, 'set_target_cell')
+    @mock.patch.object(objects.InstanceMapping, 'get_by_instance_uuid_cached')
+    @mock.patch.object(objects.Instance, 'get_by_uuid')
+    def test_get_instance_in_cell_not_found(self, mock_get_inst,
+            mock_get_inst_map, mock_target_cell, mock_clear_cache):
+        self.useFixture(fixtures.AllServicesCurrent())
+        inst_map = objects.InstanceMapping(cell_mapping=objects.CellMapping())
+        mock_get_inst_map.return_value = inst_map
+        mock_get_inst.side_effect = exception.InstanceNotFound(
+            instance_id=uuids.instance)
+
+        self.assertRaises(exception.InstanceNotFound,
+                          self.compute_api.get, self.context, uuids.instance)
+        if self.cell_type is None:
+            # The mapping may have been cached before the instance was deleted
+            mock_clear_cache.assert_called_once_with(uuids.instance)
+        else:
+            mock_clear_cache.assert_not_called()
+
     def _list_of_instances(self, length=1):
         instances = []
         for i in range(length):
@@ -5841,6 +5861,39 @@ class ComputeAPIUnitTestCase(_ComputeAPIUnitTestMixIn, test.NoDBTestCase):
                               self.compute_api.attach_volume,
                               self.context, instance, uuids.volumeid)
 
+    @mock.patch.object(objects.BuildRequestList, 'get_by_filters')
+    def test_get_all_expected_attrs(self, mock_buildreq_get):
+        with mock.patch('nova.compute.instance_list.'
+                        'get_instance_objects_sorted') as mock_inst_get:
+            mock_inst_get.return_value = objects.InstanceList(
+                self.context, objects=[])
+
+            self.compute_api.get_all(
+                self.context, search_opts={'foo': 'bar'}, expected_attrs=[],
+                sort_keys=['baz'], sort_dirs=['desc'])
+
+            mock_inst_get.assert_called_once_with(
+                self.context, {'foo': 'bar'}, None, None, [], ['baz'],
+                ['desc'])
+
+    @mock.patch.object(neutron_api.API, 'has_substr_port_filtering_extension',
+                       return_value=False)
+    @mock.patch.object(objects.BuildRequestList, 'get_by_filters')
+    def test_get_all_expected_attrs_ip_filter(self, mock_buildreq_get,
+                                              mock_check_ext):
+        with mock.patch('nova.compute.instance_list.'
+                        'get_instance_objects_sorted') as mock_inst_get:
+            mock_inst_get.return_value = objects.InstanceList(
+                self.context, objects=[])
+
+            self.compute_api.get_all(
+                self.context, search_opts={'ip': 'fake'}, expected_attrs=[],
+                sort_keys=['baz'], sort_dirs=['desc'])
+
+            mock_inst_get.assert_called_once_with(
+                self.context, {'ip': 'fake'}, None, None, ['info_cache'],
+                ['baz'], ['desc'])
+
     @mock.patch.object(neutron_api.API, 'has_substr_port_filtering_extension')
     @mock.patch.object(neutron_api.API, 'list_ports')
     @mock.patch.object(objects.BuildRequestList, 'get_by_filters')
@@ -250,6 +250,26 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             else:
                 self.assertFalse(db_node.destroy.called)
 
+    @mock.patch.object(manager.ComputeManager,
+                       'update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db',
+                       return_value=[])
+    def test_update_available_resource_pool(self, get_db_nodes,
+                                            get_avail_nodes, update_mock):
+        self.flags(update_resources_pool_size=2)
+        compute = manager.ComputeManager()
+        get_avail_nodes.return_value = set(['node1', 'node2', 'node3'])
+
+        compute.update_available_resource(self.context)
+
+        self.assertEqual(2, compute._update_resources_pool.size)
+        # All the nodes have been updated by the time the periodic returns
+        update_mock.assert_has_calls(
+            [mock.call(self.context, node)
+             for node in ('node1', 'node2', 'node3')], any_order=True)
+        self.assertEqual(3, update_mock.call_count)
+
     @mock.patch('nova.context.get_admin_context')
     def test_pre_start_hook(self, get_admin_context):
         """Very simple test just to make sure update_available_resource is
@@ -656,9 +676,40 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         """
         self.compute.init_host()
 
+    @mock.patch('nova.objects.InstanceList.get_by_host',
+                return_value=objects.InstanceList())
+    @mock.patch('nova.compute.manager.ComputeManager.'
+                '_destroy_evacuated_instances')
+    @mock.patch('nova.compute.manager.LOG')
+    def test_init_host_stage_timings(self, mock_log, mock_destroy_evac,
+                                     mock_get_by_host):
+        self.compute.init_host()
+        logged = [c[1][0] for c in mock_log.mock_calls
+                  if c[0] in ('debug', 'info')]
+        for msg in ('Took %0.2f seconds to initialize the driver.',
+                    'Took %(time)0.2f seconds to load %(num)d instances.',
+                    'Took %0.2f seconds to destroy evacuated instances.',
+                    'Took %(time)0.2f seconds to initialize %(num)d '
+                    'instances.'):
+            self.assertIn(msg, logged)
+
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances(self, mock_init_instance):
+        self.flags(init_host_pool_size=2)
+        instances = [objects.Instance(uuid=uuids.instance_1),
+                     objects.Instance(uuid=uuids.instance_2),
+                     objects.Instance(uuid=uuids.instance_3)]
+        # A failure does not stop the other instances from being handled
+        mock_init_instance.side_effect = [None, test.TestingException, None]
+        self.compute._init_instances(self.context, instances)
+        mock_init_instance.assert_has_calls(
+            [mock.call(self.context, instance) for instance in instances])
+
+    @mock.patch('nova.compute.utils.flush_action_events')
     @mock.patch('nova.objects.InstanceList')
     @mock.patch('nova.objects.MigrationList.get_by_filters')
-    def test_cleanup_host(self, mock_miglist_get, mock_instance_list):
+    def test_cleanup_host(self, mock_miglist_get, mock_instance_list,
+                          mock_flush):
         # just testing whether the cleanup_host method
         # when fired will invoke the underlying driver's
         # equivalent method.
@@ -676,6 +727,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock_driver.register_event_listener.assert_has_calls([
                 mock.call(self.compute.handle_events), mock.call(None)])
             mock_driver.cleanup_host.assert_called_once_with(host='fake-mini')
+            mock_flush.assert_called_once_with()
 
     def test_init_virt_events_disabled(self):
         self.flags(handle_virt_lifecycle_events=False, group='workarounds')
@@ -716,6 +768,9 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         # simulate failed instance
         mock_get_inst.return_value = [deleted_instance]
         with test.nested(
+            mock.patch.object(
+                self.compute.network_api, 'get_instances_nw_info',
+                side_effect=test.TestingException),
             mock.patch.object(
                 self.compute.network_api, 'get_instance_nw_info',
                 side_effect = exception.InstanceNotFound(
@@ -723,7 +778,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock.patch.object(
                 self.compute.reportclient,
                 'remove_provider_from_instance_allocation')
-        ) as (mock_get_net, mock_remove_allocation):
+        ) as (mock_get_nets, mock_get_net, mock_remove_allocation):
 
             self.compute.init_host()
 
@@ -738,6 +793,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         mock_init_virt.assert_called_once_with()
         mock_temp_mut.assert_called_once_with(self.context, read_deleted='yes')
         mock_get_inst.assert_called_once_with(self.context)
+        mock_get_nets.assert_called_once_with(self.context,
+                                              [deleted_instance])
         mock_get_net.assert_called_once_with(self.context, deleted_instance)
 
         # ensure driver.destroy is called so that driver may
@@ -1580,6 +1637,45 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                                         use_slave=True)
             mock_spawn.assert_called_once_with(mock.ANY, instance)
 
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_skips_instances_in_sync(self, mock_get):
+        in_sync = self._get_sync_instance(power_state.RUNNING,
+                                          vm_states.ACTIVE)
+        stopped = self._get_sync_instance(power_state.RUNNING,
+                                          vm_states.ACTIVE)
+        stopped.uuid = uuids.stopped
+        busy = self._get_sync_instance(power_state.RUNNING,
+                                       vm_states.ACTIVE,
+                                       task_state=task_states.REBOOTING)
+        busy.uuid = uuids.busy
+        mock_get.return_value = [in_sync, stopped, busy]
+        states = {uuids.instance: power_state.RUNNING,
+                  uuids.stopped: power_state.SHUTDOWN,
+                  uuids.busy: power_state.RUNNING}
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              return_value=states),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+        ) as (mock_states, mock_spawn):
+            self.compute._sync_power_states(mock.sentinel.context)
+        mock_states.assert_called_once_with([in_sync, stopped, busy])
+        mock_spawn.assert_has_calls([mock.call(mock.ANY, stopped),
+                                     mock.call(mock.ANY, busy)])
+        self.assertEqual(2, mock_spawn.call_count)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk_query_fails(self, mock_get):
+        instance = self._get_sync_instance(power_state.RUNNING,
+                                           vm_states.ACTIVE)
+        mock_get.return_value = [instance]
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              side_effect=test.TestingException),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+        ) as (mock_states, mock_spawn):
+            self.compute._sync_power_states(mock.sentinel.context)
+        mock_spawn.assert_called_once_with(mock.ANY, instance)
+
     def _get_sync_instance(self, power_state, vm_state, task_state=None,
                            shutdown_terminate=False):
         instance = objects.Instance()
@@ -2820,8 +2916,29 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                 self.context, instances[2], events[2].tag)
             extend_volume.assert_called_once_with(
                 self.context, instances[3], events[3].tag)
+            self.assertEqual({uuids.instance_1},
+                             self.compute._instance_uuids_network_changed)
         do_test()
 
+    @mock.patch('nova.objects.InstanceList.get_by_host')
+    def test_get_instance_uuids_to_heal_prunes_network_changed(
+            self, mock_get_by_host):
+        mock_get_by_host.return_value = objects.InstanceList(objects=[
+            objects.Instance(uuid=uuids.instance_1, vm_state=vm_states.ACTIVE,
+                             task_state=None, info_cache=None)])
+        # instance_2 was deleted or moved off this host since its event
+        self.compute._instance_uuids_network_changed.update(
+            [uuids.instance_1, uuids.instance_2])
+
+        self.assertEqual(
+            [uuids.instance_1],
+            self.compute._get_instance_uuids_to_heal(self.context))
+        self.assertEqual({uuids.instance_1},
+                         self.compute._instance_uuids_network_changed)
+        mock_get_by_host.assert_called_once_with(
+            self.context, self.compute.host, expected_attrs=['info_cache'],
+            use_slave=True)
+
     def test_external_instance_event_with_exception(self):
         vif1 = fake_network_cache_model.new_vif()
         vif1['id'] = '1'
@@ -3565,8 +3682,11 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock.patch.object(self.compute, '_get_instances_on_driver',
                                return_value=[instance_1,
                                              instance_2]),
-            mock.patch.object(self.compute.network_api, 'get_instance_nw_info',
-                               return_value=None),
+            mock.patch.object(self.compute.network_api,
+                              'get_instances_nw_info',
+                              return_value={
+                                  uuids.instance_1: mock.sentinel.nw_info_1,
+                                  uuids.instance_2: mock.sentinel.nw_info_2}),
             mock.patch.object(self.compute, '_get_instance_block_device_info',
                                return_value={}),
             mock.patch.object(self.compute, '_is_instance_storage_shared',
@@ -3578,7 +3698,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock.patch('nova.scheduler.utils.resources_from_flavor'),
             mock.patch.object(self.compute.reportclient,
                               'remove_provider_from_instance_allocation')
-        ) as (_get_instances_on_driver, get_instance_nw_info,
+        ) as (_get_instances_on_driver, get_instances_nw_info,
               _get_instance_block_device_info, _is_instance_storage_shared,
               destroy, migration_list, migration_save, get_node,
               get_resources, remove_allocation):
@@ -3589,8 +3709,10 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             self.compute._destroy_evacuated_instances(self.context)
             # Only instance 2 should be deleted. Instance 1 is still running
             # here, but no migration from our host exists, so ignore it
-            destroy.assert_called_once_with(self.context, instance_2, None,
-                                            {}, True)
+            destroy.assert_called_once_with(self.context, instance_2,
+                                            mock.sentinel.nw_info_2, {}, True)
+            get_instances_nw_info.assert_called_once_with(self.context,
+                                                          [instance_2])
 
             get_node.assert_called_once_with(
                 self.context, our_host, migration.source_node)
@@ -3634,8 +3756,11 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock.patch.object(self.compute, '_get_instances_on_driver',
                                return_value=[instance_1,
                                              instance_2]),
-            mock.patch.object(self.compute.network_api, 'get_instance_nw_info',
-                               return_value=None),
+            mock.patch.object(self.compute.network_api,
+                              'get_instances_nw_info',
+                              return_value={
+                                  uuids.instance_1: mock.sentinel.nw_info_1,
+                                  uuids.instance_2: mock.sentinel.nw_info_2}),
             mock.patch.object(self.compute, '_get_instance_block_device_info',
                                return_value={}),
             mock.patch.object(self.compute, '_is_instance_storage_shared',
@@ -3647,7 +3772,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             mock.patch('nova.scheduler.utils.resources_from_flavor'),
             mock.patch.object(self.compute.reportclient,
                               'remove_provider_from_instance_allocation')
-        ) as (_get_instances_on_driver, get_instance_nw_info,
+        ) as (_get_instances_on_driver, get_instances_nw_info,
               _get_instance_block_device_info, _is_instance_storage_shared,
               destroy, migration_list, migration_save, get_node,
               get_resources, remove_allocation):
@@ -3666,8 +3791,10 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
 
             # both instance_1 and instance_2 is destroyed in the driver
             destroy.assert_has_calls(
-                [mock.call(self.context, instance_1, None, {}, True),
-                 mock.call(self.context, instance_2, None, {}, True)])
+                [mock.call(self.context, instance_1, mock.sentinel.nw_info_1,
+                           {}, True),
+                 mock.call(self.context, instance_2, mock.sentinel.nw_info_2,
+                           {}, True)])
 
             # but only instance_2 is deallocated as the compute node for
             # instance_1 is already deleted
@@ -4161,40 +4288,70 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                 self.context, instance, clean_shutdown=True)
 
     @mock.patch.object(utils, 'last_completed_audit_period',
-            return_value=(0, 0))
+            return_value=(0, 1))
     @mock.patch.object(time, 'time', side_effect=[10, 20, 21])
     @mock.patch.object(objects.InstanceList, 'get_by_host', return_value=[])
-    @mock.patch.object(objects.BandwidthUsage, 'get_by_instance_uuid_and_mac')
-    @mock.patch.object(db, 'bw_usage_update')
-    def test_poll_bandwidth_usage(self, bw_usage_update, get_by_uuid_mac,
+    @mock.patch.object(objects.BandwidthUsageList, 'get_by_uuids')
+    @mock.patch.object(objects.BandwidthUsageList, 'update_all')
+    def test_poll_bandwidth_usage(self, update_all, get_by_uuids,
             get_by_host, time, last_completed_audit):
         bw_counters = [{'uuid': uuids.instance, 'mac_address': 'fake-mac',
-                        'bw_in': 1, 'bw_out': 2}]
-        usage = objects.BandwidthUsage()
-        usage.bw_in = 3
-        usage.bw_out = 4
-        usage.last_ctr_in = 0
-        usage.last_ctr_out = 0
+                        'bw_in': 1, 'bw_out': 2},
+                       {'uuid': uuids.instance, 'mac_address': 'fake-mac2',
+                        'bw_in': 5, 'bw_out': 6},
+                       {'uuid': uuids.other_instance,
+                        'mac_address': 'fake-mac3', 'bw_in': 7, 'bw_out': 8}]
+        usage = objects.BandwidthUsage(instance_uuid=uuids.instance,
+                                       mac='fake-mac', bw_in=3, bw_out=4,
+                                       last_ctr_in=0, last_ctr_out=0)
+        prev_usage = objects.BandwidthUsage(instance_uuid=uuids.instance,
+                                            mac='fake-mac2', bw_in=30,
+                                            bw_out=40, last_ctr_in=4,
+                                            last_ctr_out=10)
         self.flags(bandwidth_poll_interval=1)
-        get_by_uuid_mac.return_value = usage
-        _time = timeutils.utcnow()
-        bw_usage_update.return_value = {'uuid': uuids.instance, 'mac': '',
-                'start_period': _time, 'last_refreshed': _time, 'bw_in': 0,
-                'bw_out': 0, 'last_ctr_in': 0, 'last_ctr_out': 0, 'deleted': 0,
-                'created_at': _time, 'updated_at': _time, 'deleted_at': _time}
+        get_by_uuids.side_effect = [[usage], [prev_usage]]
         with mock.patch.object(self.compute.driver,
                 'get_all_bw_counters', return_value=bw_counters):
             self.compute._poll_bandwidth_usage(self.context)
-            get_by_uuid_mac.assert_called_once_with(self.context,
-                    uuids.instance, 'fake-mac',
-                    start_period=0, use_slave=True)
-            # NOTE(sdague): bw_usage_update happens at some time in
-            # the future, so what last_refreshed is irrelevant.
-            bw_usage_update.assert_called_once_with(self.context,
-                    uuids.instance,
-                    'fake-mac', 0, 4, 6, 1, 2,
-                    last_refreshed=mock.ANY,
-                    update_cells=False)
+        get_by_uuids.assert_has_calls([
+            mock.call(self.context, mock.ANY, start_period=1,
+                      use_slave=True),
+            mock.call(self.context, mock.ANY, start_period=0,
+                      use_slave=True)])
+        self.assertEqual(set([uuids.instance, uuids.other_instance]),
+                         set(get_by_uuids.call_args_list[0][0][1]))
+        self.assertEqual(set([uuids.instance, uuids.other_instance]),
+                         set(get_by_uuids.call_args_list[1][0][1]))
+        # NOTE(sdague): bw_usage_update happens at some time in
+        # the future, so what last_refreshed is irrelevant.
+        update_all.assert_called_once_with(
+            self.context,
+            [{'uuid': uuids.instance, 'mac': 'fake-mac', 'bw_in': 4,
+              'bw_out': 6, 'last_ctr_in': 1, 'last_ctr_out': 2},
+             # Counters of the previous period, the outbound one rolled over
+             {'uuid': uuids.instance, 'mac': 'fake-mac2', 'bw_in': 1,
+              'bw_out': 6, 'last_ctr_in': 5, 'last_ctr_out': 6},
+             {'uuid': uuids.other_instance, 'mac': 'fake-mac3', 'bw_in': 0,
+              'bw_out': 0, 'last_ctr_in': 7, 'last_ctr_out': 8}],
+            start_period=1, last_refreshed=mock.ANY, update_cells=False)
+
+    @mock.patch('nova.compute.utils.usage_volume_info')
+    @mock.patch.object(objects.VolumeUsage, 'save_all')
+    def test_update_volume_usage_cache(self, mock_save_all, mock_info_dict):
+        instance = fake_instance.fake_instance_obj(self.context)
+        vol_usages = [{'volume': volume_id, 'instance': instance,
+                       'rd_req': 1, 'rd_bytes': 2, 'wr_req': 3,
+                       'wr_bytes': 4}
+                      for volume_id in (uuids.volume1, uuids.volume2)]
+        with mock.patch.object(self.compute.notifier, 'info') as mock_info:
+            self.compute._update_volume_usage_cache(self.context, vol_usages)
+        mock_save_all.assert_called_once_with(self.context, mock.ANY)
+        saved = mock_save_all.call_args[0][1]
+        self.assertEqual([uuids.volume1, uuids.volume2],
+                         [vol_usage.volume_id for vol_usage in saved])
+        mock_info.assert_has_calls([
+            mock.call(self.context, 'volume.usage',
+                      mock_info_dict.return_value)] * 2)
 
     def test_reverts_task_state_instance_not_found(self):
         # Tests that the reverts_task_state decorator in the compute manager
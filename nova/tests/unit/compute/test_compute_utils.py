@@ -18,6 +18,7 @@
 
 import copy
 import string
+import sys
 
 import mock
 from oslo_utils import uuidutils
@@ -1074,6 +1075,173 @@ class ComputeUtilsTestCase(test.NoDBTestCase):
         mock_notify_usage.assert_has_calls(expected_notify_calls)
 
 
+class ActionEventBufferTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(ActionEventBufferTestCase, self).setUp()
+        self.flags(instance_action_events_flush_interval=1.5)
+        self.context = context.RequestContext('fake', 'fake')
+        self.buffer = compute_utils.ActionEventBuffer()
+        self.indirection_api = mock.Mock(spec=['action_events_write'])
+        patcher = mock.patch.object(objects.InstanceActionEvent,
+                                    'indirection_api', self.indirection_api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _written_events(self):
+        self.indirection_api.action_events_write.assert_called_once_with(
+            mock.ANY, mock.ANY)
+        return self.indirection_api.action_events_write.call_args[0][1]
+
+    @mock.patch('eventlet.spawn_after')
+    def test_flush_merges_start_and_finish(self, mock_spawn_after):
+        self.buffer.event_start(self.context, uuids.instance, 'foo')
+        self.buffer.event_start(self.context, uuids.instance, 'bar')
+        try:
+            raise test.TestingException('fake-error')
+        except test.TestingException as e:
+            self.buffer.event_finish_with_failure(
+                self.context, uuids.instance, 'foo', exc_val=e,
+                exc_tb=sys.exc_info()[2])
+        mock_spawn_after.assert_called_once_with(
+            1.5, self.buffer._flush_on_timer)
+
+        self.buffer.flush()
+        self.buffer.event_finish_with_failure(
+            self.context, uuids.instance, 'bar')
+        self.buffer.flush()
+
+        calls = self.indirection_api.action_events_write.call_args_list
+        self.assertEqual(2, len(calls))
+        foo, bar = calls[0][0][1]
+        self.assertEqual(['foo', 'bar'], [foo['event'], bar['event']])
+        self.assertEqual('Error', foo['result'])
+        self.assertEqual('fake-error', foo['message'])
+        self.assertIn('raise test.TestingException', foo['traceback'])
+        self.assertIsInstance(foo['start_time'], six.string_types)
+        self.assertIsInstance(foo['finish_time'], six.string_types)
+        self.assertNotIn('finish_time', bar)
+        self.assertEqual(1, len(calls[1][0][1]))
+        bar_finish = calls[1][0][1][0]
+        self.assertEqual('Success', bar_finish['result'])
+        self.assertNotIn('start_time', bar_finish)
+
+    @mock.patch('nova.utils.spawn_n')
+    @mock.patch('eventlet.spawn_after')
+    def test_full_buffer_flushes(self, mock_spawn_after, mock_spawn_n):
+        self.flags(instance_action_events_buffer_size=2)
+        self.buffer.event_start(self.context, uuids.instance, 'foo')
+        self.assertFalse(mock_spawn_n.called)
+        self.buffer.event_start(self.context, uuids.instance, 'bar')
+        mock_spawn_n.assert_called_once_with(self.buffer.flush)
+
+    @mock.patch('eventlet.spawn_after')
+    def test_flush_on_timer(self, mock_spawn_after):
+        self.buffer.event_start(self.context, uuids.instance, 'foo')
+        self.buffer._flush_on_timer()
+        self.assertEqual(1, len(self._written_events()))
+        self.buffer.event_start(self.context, uuids.instance, 'bar')
+        self.assertEqual(2, mock_spawn_after.call_count)
+
+    def test_flush_empty(self):
+        self.buffer.flush()
+        self.assertFalse(self.indirection_api.action_events_write.called)
+
+    @mock.patch('eventlet.spawn_after')
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_flush_old_conductor(self, mock_finish, mock_start,
+                                 mock_spawn_after):
+        self.indirection_api.action_events_write.side_effect = (
+            NotImplementedError)
+        mock_start.side_effect = [test.TestingException, None]
+        self.buffer.event_start(self.context, uuids.instance1, 'foo')
+        self.buffer.event_start(self.context, uuids.instance2, 'foo')
+        self.buffer.event_finish_with_failure(
+            self.context, uuids.instance2, 'foo', exc_val='error',
+            exc_tb='traceback')
+        self.buffer.flush()
+
+        mock_start.assert_has_calls([
+            mock.call(self.context, uuids.instance1, 'foo',
+                      want_result=False),
+            mock.call(self.context, uuids.instance2, 'foo',
+                      want_result=False)])
+        mock_finish.assert_called_once_with(
+            self.context, uuids.instance2, 'foo', exc_val='error',
+            exc_tb='traceback', want_result=False)
+
+    @mock.patch('eventlet.spawn_after')
+    def test_flush_error_is_logged(self, mock_spawn_after):
+        self.indirection_api.action_events_write.side_effect = (
+            test.TestingException)
+        self.buffer.event_start(self.context, uuids.instance, 'foo')
+        self.buffer.flush()
+        self.assertEqual([], self.buffer._events)
+
+    @mock.patch.object(compute_utils, '_ACTION_EVENT_BUFFER')
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_event_reporter_buffered(self, mock_finish, mock_start,
+                                     mock_buffer):
+        with compute_utils.EventReporter(self.context, 'foo',
+                                         uuids.instance):
+            pass
+        self.assertFalse(mock_start.called)
+        self.assertFalse(mock_finish.called)
+        mock_buffer.event_start.assert_called_once_with(
+            self.context, uuids.instance, 'foo')
+        mock_buffer.event_finish_with_failure.assert_called_once_with(
+            self.context, uuids.instance, 'foo', exc_val=None, exc_tb=None)
+        self.assertFalse(mock_buffer.flush.called)
+
+    @mock.patch.object(compute_utils, '_ACTION_EVENT_BUFFER')
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_event_reporter_without_project(self, mock_finish, mock_start,
+                                            mock_buffer):
+        ctxt = context.get_admin_context()
+        with compute_utils.EventReporter(ctxt, 'foo', uuids.instance):
+            pass
+        mock_start.assert_called_once_with(ctxt, uuids.instance, 'foo',
+                                           want_result=False)
+        mock_finish.assert_called_once_with(
+            ctxt, uuids.instance, 'foo', exc_val=None, exc_tb=None,
+            want_result=False)
+        self.assertFalse(mock_buffer.event_start.called)
+        # The buffered events are written before the synchronous ones
+        self.assertEqual(2, mock_buffer.flush.call_count)
+
+    @mock.patch.object(compute_utils, '_ACTION_EVENT_BUFFER', None)
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_event_reporter_buffer_not_enabled(self, mock_finish,
+                                               mock_start):
+        # Only the services which enabled the buffer, and flush it when they
+        # stop, buffer the events.
+        with compute_utils.EventReporter(self.context, 'foo',
+                                         uuids.instance):
+            pass
+        mock_start.assert_called_once_with(self.context, uuids.instance,
+                                           'foo', want_result=False)
+        mock_finish.assert_called_once_with(
+            self.context, uuids.instance, 'foo', exc_val=None, exc_tb=None,
+            want_result=False)
+
+    @mock.patch.object(compute_utils, '_ACTION_EVENT_BUFFER', None)
+    def test_enable_action_event_buffer(self):
+        compute_utils.flush_action_events()
+        compute_utils.enable_action_event_buffer()
+        event_buffer = compute_utils._ACTION_EVENT_BUFFER
+        self.assertIsInstance(event_buffer, compute_utils.ActionEventBuffer)
+        compute_utils.enable_action_event_buffer()
+        self.assertIs(event_buffer, compute_utils._ACTION_EVENT_BUFFER)
+
+
 class ServerGroupTestCase(test.TestCase):
     def setUp(self):
         super(ServerGroupTestCase, self).setUp()
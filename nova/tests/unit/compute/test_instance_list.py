@@ -77,3 +77,88 @@ class TestInstanceList(test.NoDBTestCase):
         insts_two = [inst['hostname'] for inst in insts]
 
         self.assertEqual(insts_one, insts_two)
+
+    def _fake_get_in_batches(self, mock_inst):
+        # The first query of each cell has no marker, the next ones start
+        # after the sort key values of the last instance of the previous
+        # batch of the cell.
+        first_batches = iter(self.insts.values())
+
+        def fake_get(ctx, filters, limit=None, marker=None,
+                     marker_values=None, **kwargs):
+            self.assertIsNone(marker)
+            if marker_values is None:
+                return list(next(first_batches))[:limit]
+            # The uuid is the last sort key
+            marker = marker_values[-1]
+            for cell_insts in self.insts.values():
+                uuids = [inst['uuid'] for inst in cell_insts]
+                if marker in uuids:
+                    start = uuids.index(marker) + 1
+                    return cell_insts[start:start + limit]
+
+        mock_inst.side_effect = fake_get
+
+    @mock.patch('nova.db.instance_get_all_by_filters_sort')
+    @mock.patch('nova.objects.CellMappingList.get_all')
+    def test_get_instances_sorted_in_batches(self, mock_cells, mock_inst):
+        self.flags(instance_list_cells_batch_size=2, group='api')
+        mock_cells.return_value = self.cells
+        self._fake_get_in_batches(mock_inst)
+
+        insts = instance_list.get_instances_sorted(self.context, {},
+                                                   None, None,
+                                                   [], ['hostname'], ['asc'])
+
+        self.assertEqual(sorted(inst['hostname']
+                                for cell_insts in self.insts.values()
+                                for inst in cell_insts),
+                         [inst['hostname'] for inst in insts])
+        # One full batch and one partial batch from each cell
+        self.assertEqual(6, mock_inst.call_count)
+
+    @mock.patch('nova.db.instance_get_all_by_filters_sort')
+    @mock.patch('nova.objects.CellMappingList.get_all')
+    def test_get_instances_sorted_in_batches_limit(self, mock_cells,
+                                                   mock_inst):
+        self.flags(instance_list_cells_batch_size=2, group='api')
+        mock_cells.return_value = self.cells
+        self._fake_get_in_batches(mock_inst)
+
+        insts = instance_list.get_instances_sorted(self.context, {},
+                                                   4, None,
+                                                   [], ['hostname'], ['asc'])
+
+        self.assertEqual(['cell0-inst0', 'cell0-inst1', 'cell0-inst2',
+                          'cell1-inst0'],
+                         [inst['hostname'] for inst in insts])
+        # The first batch of each cell, and the second one of cell0 only
+        self.assertEqual(4, mock_inst.call_count)
+
+    @mock.patch('nova.db.instance_get_by_sort_filters')
+    @mock.patch('nova.db.instance_get_all_by_filters_sort')
+    @mock.patch('nova.objects.CellMappingList.get_all')
+    @mock.patch.object(instance_list.InstanceLister, 'get_marker_record')
+    def test_get_instances_sorted_marker_values(self, mock_marker,
+                                                mock_cells, mock_inst,
+                                                mock_by_values):
+        mock_cells.return_value = self.cells
+        marker = self.insts[uuids.cell1][0]
+        mock_marker.return_value = marker
+        mock_inst.return_value = []
+
+        insts = instance_list.get_instances_sorted(self.context, {},
+                                                   None, marker['uuid'],
+                                                   [], ['hostname'], ['asc'])
+        self.assertEqual([], list(insts))
+
+        # Each cell lists the instances after the values of the marker
+        # without looking up a marker of its own.
+        mock_marker.assert_called_once_with(self.context, marker['uuid'])
+        mock_by_values.assert_not_called()
+        self.assertEqual(3, mock_inst.call_count)
+        mock_inst.assert_called_with(
+            self.context, {}, limit=100, marker=None,
+            marker_values=[marker['hostname'], marker['uuid']],
+            sort_keys=['hostname', 'uuid'], sort_dirs=['asc', 'asc'],
+            columns_to_join=[])
@@ -12,8 +12,12 @@
 
 import datetime
 
+import mock
+
 from nova.compute import multi_cell_list
+from nova import exception
 from nova import test
+from nova.tests import uuidsentinel as uuids
 
 
 class TestUtils(test.NoDBTestCase):
@@ -95,3 +99,60 @@ class TestUtils(test.NoDBTestCase):
         # and not just nonzero return from cmp()
         self.assertTrue(iw1 > iw2)
         self.assertFalse(iw2 > iw1)
+
+
+class TestLister(multi_cell_list.CrossCellLister):
+    marker_identifier = 'uuid'
+    get_marker_record = get_marker_by_values = get_by_filters = None
+
+
+class TestCrossCellLister(test.NoDBTestCase):
+    def setUp(self):
+        super(TestCrossCellLister, self).setUp()
+        self.lister = TestLister(
+            multi_cell_list.RecordSortContext(['key0', 'uuid'],
+                                              ['asc', 'asc']))
+        self.lister.get_marker_by_values = mock.Mock()
+        self.lister.get_by_filters = mock.Mock()
+        self.record = {'key0': 'foo', 'uuid': uuids.record}
+
+    def test_get_by_filters_after(self):
+        self.lister.get_by_filters.return_value = mock.sentinel.records
+        self.assertEqual(mock.sentinel.records,
+                         self.lister._get_by_filters_after(
+                             mock.sentinel.ctx, {}, 2, self.record))
+        self.lister.get_by_filters.assert_called_once_with(
+            mock.sentinel.ctx, {}, limit=2, marker=uuids.record)
+        self.lister.get_marker_by_values.assert_not_called()
+
+    def test_get_by_filters_after_deleted_record(self):
+        # The record was deleted since it was listed, so the listing goes
+        # on with the record which now follows its sort key values.
+        local_marker = {'key0': 'foo', 'uuid': uuids.local_marker}
+        next_record = {'key0': 'goo', 'uuid': uuids.next_record}
+        self.lister.get_by_filters.side_effect = [
+            exception.MarkerNotFound(marker=uuids.record),
+            [local_marker], [next_record]]
+        self.lister.get_marker_by_values.return_value = uuids.local_marker
+
+        self.assertEqual([local_marker, next_record],
+                         self.lister._get_by_filters_after(
+                             mock.sentinel.ctx, {}, 2, self.record))
+        self.lister.get_marker_by_values.assert_called_once_with(
+            mock.sentinel.ctx, ['foo', uuids.record])
+        self.lister.get_by_filters.assert_has_calls([
+            mock.call(mock.sentinel.ctx, {}, limit=2, marker=uuids.record),
+            mock.call(mock.sentinel.ctx, {'uuid': [uuids.local_marker]},
+                      limit=1, marker=None),
+            mock.call(mock.sentinel.ctx, {}, limit=1,
+                      marker=uuids.local_marker)])
+
+    def test_get_by_filters_after_deleted_last_record(self):
+        self.lister.get_by_filters.side_effect = exception.MarkerNotFound(
+            marker=uuids.record)
+        self.lister.get_marker_by_values.return_value = None
+
+        self.assertEqual([], self.lister._get_by_filters_after(
+            mock.sentinel.ctx, {}, 2, self.record))
+        self.lister.get_by_filters.assert_called_once_with(
+            mock.sentinel.ctx, {}, limit=2, marker=uuids.record)
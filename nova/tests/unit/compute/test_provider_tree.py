@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import copy
+
 from nova.compute import provider_tree
 from nova import objects
 from nova import test
@@ -491,6 +493,53 @@ class TestProviderTree(test.NoDBTestCase):
         self.assertTrue(pt.has_inventory_changed(cn.uuid, cn_inv))
         self.assertTrue(pt.update_inventory(cn.uuid, cn_inv, rp_gen))
 
+    def test_data_snapshot_copy_on_write(self):
+        cn = self.compute_node1
+        pt = self._pt_with_cns()
+        cn_inv = {
+            'VCPU': {
+                'total': 8,
+                'allocation_ratio': 16.0,
+            },
+        }
+        pt.update_inventory(cn.uuid, cn_inv, 1)
+        pt.update_traits(cn.uuid, ['HW_CPU_X86_AVX'])
+        pt.update_aggregates(cn.uuid, [uuids.agg1])
+
+        snap1 = pt.data(cn.uuid)
+        snap2 = pt.data(cn.uuid)
+        # Snapshots share the provider's data rather than copying it
+        self.assertIs(snap1.inventory, snap2.inventory)
+        self.assertIs(snap1.traits, snap2.traits)
+        self.assertIs(snap1.aggregates, snap2.aggregates)
+
+        # ...which is why it must not be possible to modify it
+        self.assertRaises(TypeError, snap1.inventory.__setitem__, 'DISK_GB',
+                          {'total': 1})
+        self.assertRaises(TypeError, snap1.inventory.pop, 'VCPU')
+        self.assertRaises(TypeError, snap1.inventory['VCPU'].update,
+                          {'total': 4})
+        self.assertIsInstance(snap1.traits, frozenset)
+        self.assertIsInstance(snap1.aggregates, frozenset)
+
+        # Copies of the inventory are regular, modifiable dicts
+        inv_copy = copy.deepcopy(snap1.inventory)
+        inv_copy['VCPU']['total'] = 4
+        self.assertEqual(8, snap1.inventory['VCPU']['total'])
+
+        # Updating the tree replaces, rather than modifies, the data
+        cn_inv['VCPU']['total'] = 4
+        pt.update_inventory(cn.uuid, cn_inv, 2)
+        pt.update_traits(cn.uuid, ['CUSTOM_FOO'])
+        pt.update_aggregates(cn.uuid, [uuids.agg2])
+        self.assertEqual(8, snap1.inventory['VCPU']['total'])
+        self.assertEqual(set(['HW_CPU_X86_AVX']), snap1.traits)
+        self.assertEqual(set([uuids.agg1]), snap1.aggregates)
+        snap3 = pt.data(cn.uuid)
+        self.assertEqual(4, snap3.inventory['VCPU']['total'])
+        self.assertEqual(set(['CUSTOM_FOO']), snap3.traits)
+        self.assertEqual(set([uuids.agg2]), snap3.aggregates)
+
     def test_have_traits_changed_no_existing_rp(self):
         pt = self._pt_with_cns()
         self.assertRaises(
@@ -31,6 +31,7 @@ from nova.objects import base as obj_base
 from nova.objects import fields as obj_fields
 from nova.objects import pci_device
 from nova.pci import manager as pci_manager
+from nova.scheduler.client import report
 from nova import test
 from nova.tests.unit import fake_notifier
 from nova.tests.unit.objects import test_pci_device as fake_pci_device
@@ -519,6 +520,97 @@ class TestUpdateAvailableResources(BaseTestCase):
 
         self.assertFalse(get_mock.called)
 
+    @mock.patch('time.time')
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
+                return_value=objects.PciDeviceList())
+    @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_full_audit_interval(self, get_mock, migr_mock, get_cn_mock,
+                                 pci_mock, instance_pci_mock, mock_time):
+        self.flags(update_resources_full_audit_interval=600)
+        self._setup_rt()
+
+        get_mock.return_value = []
+        migr_mock.return_value = []
+        get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
+        mock_time.return_value = 1000
+
+        # The first run always audits the node
+        self._update_available_resources()
+        self.assertEqual(1, get_mock.call_count)
+        self.assertEqual(
+            1, self.driver_mock.get_available_resource.call_count)
+
+        # Until the interval expires, only the tracked usage is reported
+        mock_time.return_value = 1599
+        update_mock = self._update_available_resources()
+        self.assertEqual(1, get_mock.call_count)
+        self.assertEqual(
+            1, self.driver_mock.get_available_resource.call_count)
+        update_mock.assert_called_once_with(
+            mock.ANY, self.rt.compute_nodes[_NODENAME])
+
+        # And then the node is audited again
+        mock_time.return_value = 1600
+        with mock.patch.object(resource_tracker.LOG, 'warning') as mock_warn:
+            self._update_available_resources()
+        self.assertEqual(2, get_mock.call_count)
+        self.assertEqual(
+            2, self.driver_mock.get_available_resource.call_count)
+        # The tracked usage hadn't drifted
+        mock_warn.assert_not_called()
+
+    @mock.patch('time.time')
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
+                return_value=objects.PciDeviceList())
+    @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_full_audit_reports_drift(self, get_mock, migr_mock, get_cn_mock,
+                                      pci_mock, instance_pci_mock,
+                                      mock_time):
+        self.flags(update_resources_full_audit_interval=600)
+        self._setup_rt()
+
+        get_mock.return_value = []
+        migr_mock.return_value = []
+        get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0].obj_clone()
+        mock_time.return_value = 1000
+        self._update_available_resources()
+
+        # Simulate usage which was not released when it should have been
+        cn = self.rt.compute_nodes[_NODENAME]
+        cn.vcpus_used += 2
+        cn.memory_mb_used += 128
+
+        mock_time.return_value = 2000
+        with mock.patch.object(resource_tracker.LOG, 'warning') as mock_warn:
+            self._update_available_resources()
+
+        mock_warn.assert_called_once_with(
+            mock.ANY, {'host': _HOSTNAME, 'node': _NODENAME,
+                       'drift': {'vcpus_used': -2, 'memory_mb_used': -128}})
+        self.assertEqual(0, cn.vcpus_used)
+        self.assertEqual(0, cn.memory_mb_used)
+
+        # The node is audited again on the next run, since the tracked usage
+        # can't be relied on
+        mock_time.return_value = 2001
+        with mock.patch.object(resource_tracker.LOG, 'warning') as mock_warn:
+            self._update_available_resources()
+        self.assertEqual(3, get_mock.call_count)
+        mock_warn.assert_not_called()
+
+        # And once no drift was found the interval applies again
+        mock_time.return_value = 2002
+        self._update_available_resources()
+        self.assertEqual(3, get_mock.call_count)
+
     @mock.patch('nova.objects.InstancePCIRequests.get_by_instance',
                 return_value=objects.InstancePCIRequests(requests=[]))
     @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
@@ -725,7 +817,7 @@ class TestUpdateAvailableResources(BaseTestCase):
                 return_value=objects.PciDeviceList())
     @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
     @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
-    @mock.patch('nova.objects.Instance.get_by_uuid')
+    @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
     def test_no_instances_source_migration(self, get_mock, get_inst_mock,
                                            migr_mock, get_cn_mock, pci_mock,
@@ -752,16 +844,19 @@ class TestUpdateAvailableResources(BaseTestCase):
         migr_obj = _MIGRATION_FIXTURES['source-only']
         migr_mock.return_value = [migr_obj]
         get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
-        # Migration.instance property is accessed in the migration
-        # processing code, and this property calls
-        # objects.Instance.get_by_uuid, so we have the migration return
+        # The instance of the migration is not on this host anymore, so it is
+        # loaded along with the instances of any other such migrations.
         inst_uuid = migr_obj.instance_uuid
         instance = _MIGRATION_INSTANCE_FIXTURES[inst_uuid].obj_clone()
-        get_inst_mock.return_value = instance
+        get_inst_mock.return_value = objects.InstanceList(objects=[instance])
         instance.migration_context = _MIGRATION_CONTEXT_FIXTURES[inst_uuid]
 
         update_mock = self._update_available_resources()
 
+        get_inst_mock.assert_called_once_with(
+            mock.ANY, {'uuid': [inst_uuid]},
+            expected_attrs=['system_metadata', 'numa_topology', 'flavor',
+                            'migration_context'])
         get_cn_mock.assert_called_once_with(mock.ANY, _HOSTNAME, _NODENAME)
         expected_resources = copy.deepcopy(_COMPUTE_NODE_FIXTURES[0])
         vals = {
@@ -787,7 +882,7 @@ class TestUpdateAvailableResources(BaseTestCase):
                 return_value=objects.PciDeviceList())
     @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
     @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
-    @mock.patch('nova.objects.Instance.get_by_uuid')
+    @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
     def test_no_instances_dest_migration(self, get_mock, get_inst_mock,
                                          migr_mock, get_cn_mock, pci_mock,
@@ -815,7 +910,7 @@ class TestUpdateAvailableResources(BaseTestCase):
         migr_mock.return_value = [migr_obj]
         inst_uuid = migr_obj.instance_uuid
         instance = _MIGRATION_INSTANCE_FIXTURES[inst_uuid].obj_clone()
-        get_inst_mock.return_value = instance
+        get_inst_mock.return_value = objects.InstanceList(objects=[instance])
         get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
         instance.migration_context = _MIGRATION_CONTEXT_FIXTURES[inst_uuid]
 
@@ -846,7 +941,7 @@ class TestUpdateAvailableResources(BaseTestCase):
                 return_value=objects.PciDeviceList())
     @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
     @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
-    @mock.patch('nova.objects.Instance.get_by_uuid')
+    @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
     def test_no_instances_dest_evacuation(self, get_mock, get_inst_mock,
                                           migr_mock, get_cn_mock, pci_mock,
@@ -871,7 +966,7 @@ class TestUpdateAvailableResources(BaseTestCase):
         migr_mock.return_value = [migr_obj]
         inst_uuid = migr_obj.instance_uuid
         instance = _MIGRATION_INSTANCE_FIXTURES[inst_uuid].obj_clone()
-        get_inst_mock.return_value = instance
+        get_inst_mock.return_value = objects.InstanceList(objects=[instance])
         get_cn_mock.return_value = _COMPUTE_NODE_FIXTURES[0]
         instance.migration_context = _MIGRATION_CONTEXT_FIXTURES[inst_uuid]
         instance.migration_context.migration_id = migr_obj.id
@@ -1293,6 +1388,113 @@ class TestUpdateComputeNode(BaseTestCase):
         self.assertFalse(ucn_mock.called)
         self.driver_mock.get_traits.assert_called_once_with(_NODENAME)
 
+    @mock.patch('nova.objects.ComputeNode.save')
+    def test_existing_compute_node_save_changed_fields_only(self, save_mock):
+        self._setup_rt()
+
+        orig_compute = _COMPUTE_NODE_FIXTURES[0].obj_clone()
+        self.rt.compute_nodes[_NODENAME] = orig_compute
+        self.rt.old_resources[_NODENAME] = orig_compute
+
+        new_compute = orig_compute.obj_clone()
+        new_compute.obj_reset_changes()
+        # Set some fields to the values they already had and change another
+        new_compute.memory_mb = orig_compute.memory_mb
+        new_compute.stats = copy.deepcopy(orig_compute.stats)
+        new_compute.vcpus_used = orig_compute.vcpus_used + 2
+
+        def fake_save():
+            self.assertEqual(set(['vcpus_used']),
+                             new_compute.obj_what_changed())
+
+        save_mock.side_effect = fake_save
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        save_mock.assert_called_once_with()
+
+    @mock.patch('nova.objects.ComputeNode.save')
+    def test_existing_compute_node_save_all_fields_changed(self, save_mock):
+        self._setup_rt()
+
+        orig_compute = _COMPUTE_NODE_FIXTURES[0].obj_clone()
+        self.rt.compute_nodes[_NODENAME] = orig_compute
+        self.rt.old_resources[_NODENAME] = orig_compute
+
+        new_compute = orig_compute.obj_clone()
+        new_compute.obj_reset_changes()
+        # Every field flagged as changed really changed
+        new_compute.vcpus_used = orig_compute.vcpus_used + 2
+        new_compute.memory_mb_used = orig_compute.memory_mb_used + 512
+
+        def fake_save():
+            self.assertEqual(set(['vcpus_used', 'memory_mb_used']),
+                             new_compute.obj_what_changed())
+
+        save_mock.side_effect = fake_save
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        save_mock.assert_called_once_with()
+
+    @mock.patch('time.time')
+    @mock.patch('nova.objects.ComputeNode.save')
+    def test_existing_compute_node_placement_update_skipped(self, save_mock,
+                                                            mock_time):
+        self._setup_rt()
+        mock_time.return_value = 1000
+        ucn_mock = self.sched_client_mock.update_compute_node
+
+        orig_compute = _COMPUTE_NODE_FIXTURES[0].obj_clone()
+        self.rt.compute_nodes[_NODENAME] = orig_compute
+        self.rt.old_resources[_NODENAME] = orig_compute
+
+        new_compute = orig_compute.obj_clone()
+        new_compute.vcpus_used = 2
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(1, save_mock.call_count)
+        self.assertEqual(1, ucn_mock.call_count)
+
+        # Changing usage and stats doesn't change the inventory of the
+        # provider, so placement isn't updated
+        new_compute.vcpus_used = 3
+        new_compute.stats = {'num_instances': '3'}
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(2, save_mock.call_count)
+        self.assertEqual(1, ucn_mock.call_count)
+
+        # ...until the inventory changes
+        new_compute.vcpus = orig_compute.vcpus + 1
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(3, save_mock.call_count)
+        self.assertEqual(2, ucn_mock.call_count)
+
+        # ...or placement is due to be resynchronized
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(2, ucn_mock.call_count)
+        mock_time.return_value = 1000 + report.ASSOCIATION_REFRESH + 1
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(3, save_mock.call_count)
+        self.assertEqual(3, ucn_mock.call_count)
+
+    @mock.patch('nova.objects.ComputeNode.save')
+    def test_existing_compute_node_placement_update_failed(self, save_mock):
+        self._setup_rt()
+        ucn_mock = self.sched_client_mock.update_compute_node
+        ucn_mock.return_value = False
+
+        orig_compute = _COMPUTE_NODE_FIXTURES[0].obj_clone()
+        self.rt.compute_nodes[_NODENAME] = orig_compute
+        self.rt.old_resources[_NODENAME] = orig_compute
+
+        new_compute = orig_compute.obj_clone()
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(1, ucn_mock.call_count)
+
+        # The inventory isn't recorded as reported when placement couldn't
+        # be updated, so it's retried on the next update
+        ucn_mock.return_value = True
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(2, ucn_mock.call_count)
+        self.rt._update(mock.sentinel.ctx, new_compute)
+        self.assertEqual(2, ucn_mock.call_count)
+
     def test_existing_node_get_traits_implemented(self):
         """The get_traits() virt driver method is only implemented for some
         virt drivers. This method returns traits information for a
@@ -1509,6 +1711,55 @@ class TestInstanceClaim(BaseTestCase):
         self.assertEqual(_NODENAME, self.instance.node)
         self.assertIsInstance(claim, claims.NopClaim)
 
+    @mock.patch('nova.utils.synchronized')
+    def test_claim_synchronized_by_node(self, mock_sync):
+        mock_sync.return_value = lambda f: f
+        self.rt.compute_nodes = {}
+
+        with mock.patch.object(self.instance, 'save'):
+            self.rt.instance_claim(mock.sentinel.ctx, self.instance,
+                                   _NODENAME, None)
+
+        # The claim is serialized against other operations on the same node
+        mock_sync.assert_called_once_with('compute_resources-%s' % _NODENAME)
+
+    @mock.patch('nova.objects.InstancePCIRequests.get_by_instance_uuid',
+                return_value=objects.InstancePCIRequests(requests=[]))
+    @mock.patch('nova.objects.ComputeNode.save')
+    @mock.patch('nova.compute.resource_tracker._shared_state_lock')
+    def test_claim_shared_state_lock(self, mock_lock, save_mock, pci_mock):
+        locked = []
+        mock_lock.return_value.__enter__.side_effect = (
+            lambda: locked.append(True))
+        mock_lock.return_value.__exit__.side_effect = (
+            lambda *exc_info: bool(locked.pop()) and None)
+
+        def assert_unlocked(*args, **kwargs):
+            self.assertEqual([], locked)
+            return mock.DEFAULT
+
+        def assert_locked(*args, **kwargs):
+            self.assertEqual([True], locked)
+
+        # Only the changes to the tracker's in-memory state are serialized
+        # against the claims and audits of the other nodes, not the database
+        # and placement calls.
+        pci_mock.side_effect = assert_unlocked
+        save_mock.side_effect = assert_unlocked
+        self.sched_client_mock.set_inventory_for_provider.side_effect = (
+            assert_unlocked)
+        with test.nested(
+            mock.patch.object(self.instance, 'save',
+                              side_effect=assert_unlocked),
+            mock.patch.object(self.rt, '_update_usage_from_instance',
+                              side_effect=assert_locked)
+        ) as (inst_save_mock, uufi_mock):
+            self.rt.instance_claim(self.ctx, self.instance, _NODENAME, None)
+
+        self.assertTrue(inst_save_mock.called)
+        self.assertTrue(save_mock.called)
+        self.assertTrue(uufi_mock.called)
+
     @mock.patch('nova.objects.InstancePCIRequests.get_by_instance_uuid')
     @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
     def test_update_usage_with_claim(self, migr_mock, pci_mock):
@@ -2792,9 +3043,7 @@ class TestUpdateUsageFromInstance(BaseTestCase):
         @mock.patch.object(self.rt,
                            '_remove_deleted_instances_allocations')
         @mock.patch.object(self.rt, '_update_usage_from_instance')
-        @mock.patch('nova.objects.Service.get_minimum_version',
-                    return_value=22)
-        def test(version_mock, uufi, rdia):
+        def test(uufi, rdia):
             self.rt._update_usage_from_instances('ctxt', [], 'foo')
 
         test()
@@ -2802,37 +3051,32 @@ class TestUpdateUsageFromInstance(BaseTestCase):
         self.assertEqual(-1024, cn.free_ram_mb)
         self.assertEqual(-1, cn.free_disk_gb)
 
-    def test_update_usage_from_instances_refreshes_ironic(self):
+    def test_refresh_allocations_ironic(self):
         self.rt.driver.requires_allocation_refresh = True
+        cn = self.rt.compute_nodes[_NODENAME]
 
-        @mock.patch.object(self.rt,
-                           '_remove_deleted_instances_allocations')
-        @mock.patch.object(self.rt, '_update_usage_from_instance')
+        @mock.patch.object(self.rt.reportclient,
+                           'update_instance_allocation')
         @mock.patch('nova.objects.Service.get_minimum_version',
                     return_value=22)
-        def test(version_mock, uufi, rdia):
-            self.rt._update_usage_from_instances('ctxt', [self.instance],
-                                                 _NODENAME)
+        def test(version_mock, uia):
+            self.rt._refresh_allocations('ctxt', [self.instance], _NODENAME)
 
-            uufi.assert_called_once_with('ctxt', self.instance, _NODENAME,
-                                         require_allocation_refresh=True)
+            uia.assert_called_once_with('ctxt', cn, self.instance, 1)
 
         test()
 
-    def test_update_usage_from_instances_no_refresh(self):
+    def test_refresh_allocations_not_required(self):
         self.rt.driver.requires_allocation_refresh = False
 
-        @mock.patch.object(self.rt,
-                           '_remove_deleted_instances_allocations')
-        @mock.patch.object(self.rt, '_update_usage_from_instance')
+        @mock.patch.object(self.rt.reportclient,
+                           'update_instance_allocation')
         @mock.patch('nova.objects.Service.get_minimum_version',
                     return_value=22)
-        def test(version_mock, uufi, rdia):
-            self.rt._update_usage_from_instances('ctxt', [self.instance],
-                                                 _NODENAME)
+        def test(version_mock, uia):
+            self.rt._refresh_allocations('ctxt', [self.instance], _NODENAME)
 
-            uufi.assert_called_once_with('ctxt', self.instance, _NODENAME,
-                                         require_allocation_refresh=False)
+            self.assertFalse(uia.called)
 
         test()
 
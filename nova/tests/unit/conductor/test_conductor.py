@@ -183,6 +183,25 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         self.assertRaises(messaging.ExpectedException,
                           self._test_object_action, True, True)
 
+    def test_object_actions(self):
+        class TestObject(obj_base.NovaObject):
+            def foo(self, raise_exception=False):
+                if raise_exception:
+                    raise Exception('test')
+                else:
+                    return 'test'
+
+        obj_base.NovaObjectRegistry.register(TestObject)
+
+        actions = [{'objinst': TestObject(), 'objmethod': 'foo',
+                    'args': [], 'kwargs': {'raise_exception': raise_exc}}
+                   for raise_exc in (False, True, False)]
+        results = self.conductor.object_actions(self.context, actions)
+        self.assertEqual(3, len(results))
+        self.assertEqual('test', results[0][1])
+        self.assertIsNone(results[1])
+        self.assertEqual('test', results[2][1])
+
     def test_object_action_copies_object(self):
         class TestObject(obj_base.NovaObject):
             fields = {'dict': fields.DictOfStringsField()}
@@ -276,6 +295,23 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
                 self.context, TestObject.obj_name(), 'foo', versions,
                 tuple(), {})
 
+    @mock.patch('nova.db.stats.report')
+    def test_object_class_action_versions_reports_db_stats(self,
+                                                            mock_report):
+        @obj_base.NovaObjectRegistry.register
+        class TestObject(obj_base.NovaObject):
+            VERSION = '1.0'
+
+            @classmethod
+            def foo(cls, context):
+                raise test.TestingException()
+
+        self.assertRaises(messaging.ExpectedException,
+                          self.conductor.object_class_action_versions,
+                          self.context, TestObject.obj_name(), 'foo',
+                          {'TestObject': '1.0'}, tuple(), {})
+        mock_report.assert_called_once_with(self.context, 'TestObject.foo')
+
     def test_reset(self):
         with mock.patch.object(objects.Service, 'clear_min_version_cache'
                                ) as mock_clear_cache:
@@ -286,6 +322,37 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         result = self.conductor.provider_fw_rule_get_all(self.context)
         self.assertEqual([], result)
 
+    @mock.patch.object(db, 'action_events_write')
+    def test_action_events_write(self, mock_write):
+        events = [{'instance_uuid': uuids.instance, 'request_id': 'req',
+                   'event': 'compute_foo', 'start_time': 'start'}]
+        self.conductor.action_events_write(self.context, events)
+        mock_write.assert_called_once_with(self.context, events)
+
+    @mock.patch.object(db, 'bw_usage_update_multi')
+    def test_bw_usage_update_multi(self, mock_update):
+        usages = [{'uuid': uuids.instance, 'mac': 'fake-mac',
+                   'bw_in': 1, 'bw_out': 2,
+                   'last_ctr_in': 3, 'last_ctr_out': 4}]
+        self.conductor.bw_usage_update_multi(self.context, usages, 'start',
+                                             'refreshed', False)
+        mock_update.assert_called_once_with(self.context, usages, 'start',
+                                            last_refreshed='refreshed',
+                                            update_cells=False)
+
+    @mock.patch.object(db, 'vol_usage_update_multi')
+    def test_vol_usage_update_multi(self, mock_update):
+        now = timeutils.utcnow()
+        mock_update.return_value = [{'volume_id': uuids.volume,
+                                     'curr_last_refreshed': now}]
+        result = self.conductor.vol_usage_update_multi(self.context,
+                                                       mock.sentinel.usages)
+        mock_update.assert_called_once_with(self.context,
+                                            mock.sentinel.usages)
+        self.assertEqual([{'volume_id': uuids.volume,
+                           'curr_last_refreshed': utils.strtime(now)}],
+                         result)
+
 
 class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor RPC API Tests."""
@@ -296,6 +363,28 @@ class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
         self.conductor_manager = self.conductor_service.manager
         self.conductor = conductor_rpcapi.ConductorAPI()
 
+    def test_object_actions_old_conductor(self):
+        self.flags(conductor='3.0', group='upgrade_levels')
+        conductor = conductor_rpcapi.ConductorAPI()
+        self.assertRaises(NotImplementedError, conductor.object_actions,
+                          self.context, [])
+
+    def test_action_events_write_old_conductor(self):
+        self.flags(conductor='3.1', group='upgrade_levels')
+        conductor = conductor_rpcapi.ConductorAPI()
+        self.assertRaises(NotImplementedError, conductor.action_events_write,
+                          self.context, [])
+
+    def test_usage_update_multi_old_conductor(self):
+        self.flags(conductor='3.2', group='upgrade_levels')
+        conductor = conductor_rpcapi.ConductorAPI()
+        self.assertRaises(NotImplementedError,
+                          conductor.bw_usage_update_multi,
+                          self.context, [], 'start', None, True)
+        self.assertRaises(NotImplementedError,
+                          conductor.vol_usage_update_multi,
+                          self.context, [])
+
 
 class ConductorAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor API Tests."""
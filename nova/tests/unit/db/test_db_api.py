@@ -240,6 +240,66 @@ class DecoratorTestCase(test.TestCase):
         mock_clone.assert_called_once_with(mode=enginefacade._READER)
         mock_using.assert_called_once_with(ctxt)
 
+    @mock.patch.object(enginefacade._TransactionContextManager, 'using')
+    @mock.patch.object(enginefacade._TransactionContextManager, '_clone')
+    def test_select_db_reader_mode_replica_reads_select_async(self,
+                                                              mock_clone,
+                                                              mock_using):
+
+        @db.select_db_reader_mode
+        def func(self, context, value, use_slave=False):
+            pass
+
+        mock_clone.return_value = enginefacade._TransactionContextManager(
+            mode=enginefacade._ASYNC_READER)
+        ctxt = context.get_admin_context()
+        ctxt.db_replica_reads = True
+        func(self, ctxt, 'some_value')
+
+        mock_clone.assert_called_once_with(mode=enginefacade._ASYNC_READER)
+        mock_using.assert_called_once_with(ctxt)
+
+    def _test_pick_reader_replica_reads(self, decorator, replica_reads):
+        @decorator
+        def func(context, value):
+            pass
+
+        ctxt = context.get_admin_context()
+        ctxt.db_replica_reads = replica_reads
+        with test.nested(
+            mock.patch.object(enginefacade._TransactionContextManager,
+                              'using'),
+            mock.patch.object(enginefacade._TransactionContextManager,
+                              '_clone'),
+        ) as (mock_using, mock_clone):
+            mock_clone.return_value = (
+                enginefacade._TransactionContextManager(
+                    mode=enginefacade._ASYNC_READER))
+            func(ctxt, 'some_value')
+
+        mock_using.assert_called_once_with(ctxt)
+        return mock_clone
+
+    def test_pick_context_manager_reader_replica_reads(self):
+        mock_clone = self._test_pick_reader_replica_reads(
+            sqlalchemy_api.pick_context_manager_reader, True)
+        mock_clone.assert_called_once_with(mode=enginefacade._ASYNC_READER)
+
+    def test_pick_context_manager_reader_allow_async_replica_reads(self):
+        mock_clone = self._test_pick_reader_replica_reads(
+            sqlalchemy_api.pick_context_manager_reader_allow_async, True)
+        mock_clone.assert_called_once_with(mode=enginefacade._ASYNC_READER)
+
+    def test_pick_api_context_manager_reader(self):
+        mock_clone = self._test_pick_reader_replica_reads(
+            sqlalchemy_api.pick_api_context_manager_reader, False)
+        mock_clone.assert_called_once_with(mode=enginefacade._READER)
+
+    def test_pick_api_context_manager_reader_replica_reads(self):
+        mock_clone = self._test_pick_reader_replica_reads(
+            sqlalchemy_api.pick_api_context_manager_reader, True)
+        mock_clone.assert_called_once_with(mode=enginefacade._ASYNC_READER)
+
 
 def _get_fake_aggr_values():
     return {'name': 'fake_aggregate'}
@@ -606,6 +666,27 @@ class SqlAlchemyDbApiNoDbTestCase(test.NoDBTestCase):
         self.assertEqual(['test'], columns_to_join2)
         self.assertEqual(['system_metadata', 'test'], columns_to_join)
 
+    def test_manual_join_columns_collections(self):
+        manual_joins, columns_to_join = sqlalchemy_api._manual_join_columns(
+            ['info_cache', 'security_groups', 'tags'])
+        self.assertEqual(['security_groups', 'tags'], manual_joins)
+        self.assertEqual(['info_cache'], columns_to_join)
+
+    def test_create_context_manager_other_cell_has_no_slave(self):
+        self.flags(slave_connection='sqlite:///replica.db',
+                   group='database')
+        with mock.patch.object(enginefacade._TransactionContextManager,
+                               'configure') as mock_configure:
+            sqlalchemy_api.create_context_manager(
+                connection='sqlite:///cell2.db')
+            sqlalchemy_api.create_context_manager(
+                connection=CONF.database.connection)
+
+        self.assertEqual(
+            [None, 'sqlite:///replica.db'],
+            [call[1]['slave_connection']
+             for call in mock_configure.call_args_list])
+
     def test_convert_objects_related_datetimes(self):
 
         t1 = timeutils.utcnow()
@@ -672,6 +753,20 @@ class SqlAlchemyDbApiNoDbTestCase(test.NoDBTestCase):
         self.assertEqual('|', filter('|'))
         self.assertEqual('LIKE', op)
 
+    def test_regex_to_like(self):
+        self.assertEqual('%foo%', sqlalchemy_api._regex_to_like('foo'))
+        self.assertEqual('foo%', sqlalchemy_api._regex_to_like('^foo'))
+        self.assertEqual('%foo', sqlalchemy_api._regex_to_like('foo$'))
+        self.assertEqual('foo', sqlalchemy_api._regex_to_like('^foo$'))
+        self.assertEqual('%', sqlalchemy_api._regex_to_like('^'))
+        self.assertEqual('f!%o!_o!!%',
+                         sqlalchemy_api._regex_to_like('^f%o_o!'))
+
+    def test_regex_to_like_not_literal(self):
+        for regex in ('f.o', '^fo*', 'foo|bar', '^f[o]o$', 'f\\.o', 'a^b',
+                      'a$b'):
+            self.assertIsNone(sqlalchemy_api._regex_to_like(regex), regex)
+
     @mock.patch.object(sqlalchemy_api.main_context_manager._factory,
                        'get_legacy_facade')
     def test_get_engine(self, mock_create_facade):
@@ -710,6 +805,23 @@ class SqlAlchemyDbApiNoDbTestCase(test.NoDBTestCase):
         mock_get.assert_called_once_with(mock.sentinel.elevated, 'foo')
         ctxt.elevated.assert_called_once_with(read_deleted='yes')
 
+    @mock.patch.object(sqlalchemy_api, '_instance_get_by_uuid')
+    @mock.patch.object(sqlalchemy_api, '_instances_fill_metadata')
+    @mock.patch('oslo_db.sqlalchemy.utils.paginate_query')
+    def test_instance_get_all_by_filters_marker_values(
+            self, mock_paginate, mock_fill, mock_get):
+        ctxt = mock.MagicMock()
+        sqlalchemy_api.instance_get_all_by_filters_sort(
+            ctxt, {}, sort_keys=['display_name', 'uuid'],
+            sort_dirs=['asc', 'asc'], marker_values=['foo', uuidsentinel.foo])
+        mock_get.assert_not_called()
+        marker = mock_paginate.call_args[1]['marker']
+        self.assertEqual('foo', marker.display_name)
+        self.assertEqual(uuidsentinel.foo, marker.uuid)
+        # The default sort keys have no value
+        self.assertIsNone(marker.created_at)
+        self.assertIsNone(marker.id)
+
     def test_replace_sub_expression(self):
         ret = sqlalchemy_api._safe_regex_mysql('|')
         self.assertEqual('\\|', ret)
@@ -2109,6 +2221,85 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
                                                 {'display_name': 't.*st.'})
         self._assertEqualListsOfInstances(result, [i1, i2])
 
+    @mock.patch.object(sqlalchemy_api, '_REGEX_TO_LIKE_DB_TYPES',
+                       ('sqlite',))
+    def test_instance_get_all_by_filters_regex_literal(self):
+        i1 = self.create_instance_with_args(display_name='test1')
+        i2 = self.create_instance_with_args(display_name='test_2')
+        i3 = self.create_instance_with_args(display_name='atest')
+        for regex, expected in (('^test', [i1, i2]),
+                                ('^test_', [i2]),
+                                ('^test1$', [i1]),
+                                ('test', [i1, i2, i3]),
+                                ('^te.t', [i1, i2])):
+            result = db.instance_get_all_by_filters(self.ctxt,
+                                                    {'display_name': regex})
+            self._assertEqualListsOfInstances(expected, result)
+
+    def test_instance_get_all_by_filters_sort_security_groups_tags(self):
+        i1 = self.create_instance_with_args()
+        i2 = self.create_instance_with_args()
+        i3 = self.create_instance_with_args()
+        secgroups = [db.security_group_create(
+            self.ctxt, {'name': name, 'project_id': self.ctxt.project_id})
+            for name in ('sg1', 'sg2')]
+        for inst in (i1, i2, i3):
+            for secgroup in secgroups:
+                db.instance_add_security_group(self.ctxt, inst['uuid'],
+                                               secgroup['id'])
+        db.instance_tag_set(self.ctxt, i1['uuid'], ['tag1', 'tag2'])
+        db.instance_tag_set(self.ctxt, i3['uuid'], ['tag3'])
+        db.instance_destroy(self.ctxt, i3['uuid'])
+
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {}, columns_to_join=['security_groups', 'tags'],
+            sort_keys=['id'], sort_dirs=['asc'])
+
+        self.assertEqual([i1['uuid'], i2['uuid'], i3['uuid']],
+                         [inst['uuid'] for inst in result])
+        for inst in result[:2]:
+            self.assertEqual(['sg1', 'sg2'],
+                             sorted(sg['name']
+                                    for sg in inst['security_groups']))
+        self.assertEqual(['tag1', 'tag2'],
+                         sorted(tag['tag'] for tag in result[0]['tags']))
+        self.assertEqual([], result[1]['tags'])
+        # Like with the relationships, the deleted instance has neither
+        self.assertEqual([], result[2]['security_groups'])
+        self.assertEqual([], result[2]['tags'])
+
+    def test_instance_get_all_by_filters_sort_statement_budget(self):
+        # The number of statements must not grow with the number of instances
+        secgroup = db.security_group_create(
+            self.ctxt, {'name': 'sg1', 'project_id': self.ctxt.project_id})
+        for i in range(10):
+            inst = self.create_instance_with_args(
+                metadata={'foo': 'bar'}, system_metadata={'baz': 'quux'})
+            db.instance_add_security_group(self.ctxt, inst['uuid'],
+                                           secgroup['id'])
+            db.instance_tag_set(self.ctxt, inst['uuid'], ['tag1'])
+
+        with nova_fixtures.DatabaseStatementBudget(10):
+            result = db.instance_get_all_by_filters_sort(
+                self.ctxt, {}, columns_to_join=[
+                    'info_cache', 'metadata', 'system_metadata',
+                    'security_groups', 'tags'])
+        self.assertEqual(10, len(result))
+
+    def test_instance_get_all_by_filters_sort_marker_values(self):
+        i1 = self.create_instance_with_args(display_name='a')
+        i2 = self.create_instance_with_args(display_name='b')
+        i3 = self.create_instance_with_args(display_name='c')
+        sort = dict(sort_keys=['display_name', 'uuid'],
+                    sort_dirs=['asc', 'asc'])
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {}, marker_values=['a', i1['uuid']], **sort)
+        self._assertEqualListsOfInstances([i2, i3], result)
+        # The values do not need to match an instance
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {}, marker_values=['bb', ''], **sort)
+        self._assertEqualListsOfInstances([i3], result)
+
     def test_instance_get_all_by_filters_changes_since(self):
         i1 = self.create_instance_with_args(updated_at=
                                             '2013-12-05T15:03:25.000000')
@@ -3776,6 +3967,56 @@ class InstanceActionTestCase(test.TestCase, ModelsObjectComparatorMixin):
 
         self._assertActionEventSaved(event, action['id'])
 
+    def test_instance_action_events_write(self):
+        """Write a batch of instance action events."""
+        uuid = uuidsentinel.uuid1
+
+        action = db.action_start(self.ctxt, self._create_action_values(uuid))
+        db.action_event_start(
+            self.ctxt, self._create_event_values(uuid, event='schedule'))
+
+        finish_time = timeutils.utcnow() + datetime.timedelta(seconds=5)
+
+        def _finish_values(event, result='Success'):
+            return {'event': event, 'instance_uuid': uuid,
+                    'request_id': self.ctxt.request_id,
+                    'finish_time': finish_time.isoformat(), 'result': result}
+
+        spawn_values = _finish_values('spawn', result='Error')
+        spawn_values.update(self._create_event_values(uuid, event='spawn'))
+        spawn_values['traceback'] = 'fake-traceback'
+        db.action_events_write(self.ctxt, [
+            self._create_event_values(uuid, event='build'),
+            spawn_values,
+            _finish_values('schedule'),
+            _finish_values('build'),
+            self._create_event_values(uuidsentinel.uuid2, event='orphan'),
+            _finish_values('unknown'),
+        ])
+
+        events = {event['event']: event
+                  for event in db.action_events_get(self.ctxt, action['id'])}
+        self.assertEqual(set(['schedule', 'build', 'spawn']), set(events))
+        for name, result in (('schedule', 'Success'), ('build', 'Success'),
+                             ('spawn', 'Error')):
+            self.assertEqual(result, events[name]['result'])
+            self.assertEqual(finish_time, events[name]['finish_time'])
+        self.assertEqual('fake-traceback', events['spawn']['traceback'])
+        self.assertEqual('fake-host', events['build']['host'])
+        action = db.action_get_by_request_id(self.ctxt, uuid,
+                                             self.ctxt.request_id)
+        self.assertEqual('Error', action['message'])
+        self.assertEqual(finish_time, action['updated_at'])
+
+    @mock.patch.object(sqlalchemy_api, '_action_get_by_request_id')
+    def test_instance_action_events_write_gets_action_once(self, mock_get):
+        mock_get.return_value = None
+        db.action_events_write(self.ctxt, [
+            self._create_event_values(uuidsentinel.uuid1, event=event)
+            for event in ('build', 'spawn')])
+        mock_get.assert_called_once_with(mock.ANY, uuidsentinel.uuid1,
+                                         self.ctxt.request_id)
+
     def test_instance_action_events_get_are_in_order(self):
         """Ensure retrived action events are in order."""
         uuid1 = uuidsentinel.uuid1
@@ -6018,6 +6259,64 @@ class VolumeUsageDBApiTestCase(test.TestCase):
         for key, value in expected_vol_usage.items():
             self.assertEqual(vol_usage[key], value, key)
 
+    def test_vol_usage_update_multi(self):
+        ctxt = context.get_admin_context()
+        now = timeutils.utcnow()
+        self.useFixture(utils_fixture.TimeFixture(now))
+
+        db.vol_usage_update(ctxt, u'1',
+                            rd_req=10000, rd_bytes=20000,
+                            wr_req=30000, wr_bytes=40000,
+                            instance_id='fake-instance-uuid1',
+                            project_id='fake-project-uuid1',
+                            availability_zone='fake-az',
+                            user_id='fake-user-uuid1')
+        db.vol_usage_update(ctxt, u'2',
+                            rd_req=1, rd_bytes=2, wr_req=3, wr_bytes=4,
+                            instance_id='fake-instance-uuid1',
+                            project_id='fake-project-uuid1',
+                            availability_zone='fake-az',
+                            user_id='fake-user-uuid1',
+                            update_totals=True)
+
+        def _usage(volume_id, reads, read_bytes, writes, write_bytes):
+            return {'volume_id': volume_id,
+                    'instance_uuid': 'fake-instance-uuid1',
+                    'project_id': 'fake-project-uuid1',
+                    'user_id': 'fake-user-uuid1',
+                    'availability_zone': 'fake-az',
+                    'curr_reads': reads,
+                    'curr_read_bytes': read_bytes,
+                    'curr_writes': writes,
+                    'curr_write_bytes': write_bytes}
+
+        # Volume 1 was reset by a reboot, volume 2 keeps counting and
+        # volume 3 is new
+        vol_usages = db.vol_usage_update_multi(ctxt, [
+            _usage(u'1', 100, 200, 300, 400),
+            _usage(u'2', 10, 20, 30, 40),
+            _usage(u'3', 5, 6, 7, 8)])
+
+        vol_usages = {vol_usage['volume_id']: vol_usage
+                      for vol_usage in vol_usages}
+        self.assertEqual(set([u'1', u'2', u'3']), set(vol_usages))
+        expected = {
+            u'1': (100, 200, 300, 400, 10000, 20000, 30000, 40000),
+            u'2': (10, 20, 30, 40, 1, 2, 3, 4),
+            u'3': (5, 6, 7, 8, 0, 0, 0, 0),
+        }
+        for volume_id, values in expected.items():
+            vol_usage = vol_usages[volume_id]
+            self.assertEqual(values, (
+                vol_usage['curr_reads'], vol_usage['curr_read_bytes'],
+                vol_usage['curr_writes'], vol_usage['curr_write_bytes'],
+                vol_usage['tot_reads'], vol_usage['tot_read_bytes'],
+                vol_usage['tot_writes'], vol_usage['tot_write_bytes']))
+            self.assertEqual(now, vol_usage['curr_last_refreshed'])
+            self.assertEqual('fake-az', vol_usage['availability_zone'])
+        self.assertEqual(3, len(db.vol_get_usage_by_time(
+            ctxt, now - datetime.timedelta(seconds=10))))
+
 
 class TaskLogTestCase(test.TestCase):
 
@@ -8534,6 +8833,56 @@ class BwUsageTestCase(test.TestCase, ModelsObjectComparatorMixin):
 
         self._test_bw_usage_update(**expected_bw_usage)
 
+    def test_bw_usage_update_multi(self):
+        now = timeutils.utcnow()
+        start_period = now - datetime.timedelta(seconds=10)
+        db.bw_usage_update(self.ctxt, 'fake_uuid1', 'fake_mac1', start_period,
+                           100, 200, 12345, 67890)
+        db.bw_usage_update(self.ctxt, 'fake_uuid1', 'fake_mac1',
+                           start_period - datetime.timedelta(days=1),
+                           1, 2, 3, 4)
+
+        usages = [{'uuid': 'fake_uuid1', 'mac': 'fake_mac1',
+                   'bw_in': 300, 'bw_out': 400,
+                   'last_ctr_in': 23456, 'last_ctr_out': 78901},
+                  {'uuid': 'fake_uuid1', 'mac': 'fake_mac2',
+                   'bw_in': 10, 'bw_out': 20,
+                   'last_ctr_in': 30, 'last_ctr_out': 40},
+                  {'uuid': 'fake_uuid2', 'mac': 'fake_mac3',
+                   'bw_in': 50, 'bw_out': 60,
+                   'last_ctr_in': 70, 'last_ctr_out': 80}]
+        with mock.patch('nova.cells.rpcapi.CellsAPI.bw_usage_update_at_top'
+                        ) as mock_update_at_top:
+            db.bw_usage_update_multi(self.ctxt, usages,
+                                     start_period.isoformat(),
+                                     last_refreshed=now)
+        self.assertEqual(3, mock_update_at_top.call_count)
+
+        bw_usages = db.bw_usage_get_by_uuids(
+            self.ctxt, ['fake_uuid1', 'fake_uuid2'], start_period)
+        self.assertEqual(3, len(bw_usages))
+        for usage in usages:
+            bw_usage = db.bw_usage_get(self.ctxt, usage['uuid'], start_period,
+                                       usage['mac'])
+            expected = dict(usage, start_period=start_period,
+                            last_refreshed=now)
+            self._assertEqualObjects(expected, bw_usage, self._ignored_keys)
+        # The usage of the previous period is left alone
+        bw_usage = db.bw_usage_get(self.ctxt, 'fake_uuid1',
+                                   start_period - datetime.timedelta(days=1),
+                                   'fake_mac1')
+        self.assertEqual(1, bw_usage['bw_in'])
+
+    def test_bw_usage_update_multi_no_cells(self):
+        with mock.patch('nova.cells.rpcapi.CellsAPI.bw_usage_update_at_top'
+                        ) as mock_update_at_top:
+            db.bw_usage_update_multi(
+                self.ctxt, [{'uuid': 'fake_uuid1', 'mac': 'fake_mac1',
+                             'bw_in': 1, 'bw_out': 2,
+                             'last_ctr_in': 3, 'last_ctr_out': 4}],
+                timeutils.utcnow(), update_cells=False)
+        self.assertFalse(mock_update_at_top.called)
+
 
 class Ec2TestCase(test.TestCase):
 
@@ -8954,6 +9303,74 @@ class ArchiveTestCase(test.TestCase, ModelsObjectComparatorMixin):
             'shadow_migrations'
         )
 
+    def _create_deleted_instance_id_mappings(self):
+        # Add 6 rows to table and set 4 to deleted
+        ids = []
+        for uuidstr in self.uuidstrs:
+            ins_stmt = self.instance_id_mappings.insert().values(uuid=uuidstr)
+            ids.append(self.conn.execute(ins_stmt).inserted_primary_key[0])
+        update_statement = self.instance_id_mappings.update().\
+                where(self.instance_id_mappings.c.uuid.in_(self.uuidstrs[:4]))\
+                .values(deleted=1)
+        self.conn.execute(update_statement)
+        qiim = sql.select([self.instance_id_mappings]).where(
+                         self.instance_id_mappings.c.uuid.in_(self.uuidstrs))
+        qsiim = sql.select([self.shadow_instance_id_mappings]).\
+                where(self.shadow_instance_id_mappings.c.uuid.in_(
+                                                            self.uuidstrs))
+        return ids, qiim, qsiim
+
+    def test_archive_deleted_rows_purge(self):
+        ids, qiim, qsiim = self._create_deleted_instance_id_mappings()
+        results = db.archive_deleted_rows(max_rows=10, purge=True)
+        self._assertEqualObjects(dict(instance_id_mappings=4), results[0])
+        # Verify the deleted rows are gone, without being copied to shadow
+        self.assertEqual(2, len(self.conn.execute(qiim).fetchall()))
+        self.assertEqual(0, len(self.conn.execute(qsiim).fetchall()))
+        self._assert_shadow_tables_empty_except()
+
+    def test_archive_deleted_rows_for_table_markers(self):
+        ids, qiim, qsiim = self._create_deleted_instance_id_mappings()
+        markers = {}
+        num = sqlalchemy_api._archive_deleted_rows_for_table(
+            'instance_id_mappings', max_rows=2, markers=markers)
+        self.assertEqual(2, num[0])
+        self.assertEqual({'instance_id_mappings': ids[1]}, markers)
+        # Only the rows after the marker are archived
+        markers['instance_id_mappings'] = ids[2]
+        num = sqlalchemy_api._archive_deleted_rows_for_table(
+            'instance_id_mappings', max_rows=10, markers=markers)
+        self.assertEqual(1, num[0])
+        self.assertEqual({'instance_id_mappings': ids[3]}, markers)
+        rows = self.conn.execute(qsiim).fetchall()
+        self.assertEqual(set([ids[0], ids[1], ids[3]]),
+                         set(row.id for row in rows))
+        # Nothing is left after the marker
+        num = sqlalchemy_api._archive_deleted_rows_for_table(
+            'instance_id_mappings', max_rows=10, markers=markers)
+        self.assertEqual(0, num[0])
+        self.assertEqual(3, len(self.conn.execute(qiim).fetchall()))
+
+    def test_get_archive_table_groups(self):
+        metadata = MetaData(bind=self.engine)
+        metadata.reflect()
+        groups = sqlalchemy_api._get_archive_table_groups(metadata)
+        group_of = {}
+        for i, tablenames in enumerate(groups):
+            for tablename in tablenames:
+                group_of[tablename] = i
+        self.assertNotIn('migrate_version', group_of)
+        self.assertNotIn('shadow_instances', group_of)
+        # Referencing tables are archived in an earlier group
+        for table in metadata.sorted_tables:
+            if table.name not in group_of:
+                continue
+            for fk in table.foreign_keys:
+                if fk.column.table is not table:
+                    self.assertLess(group_of[table.name],
+                                    group_of[fk.column.table.name])
+        self.assertLess(group_of['consoles'], group_of['console_pools'])
+
     def test_archive_deleted_rows_2_tables(self):
         # Add 6 rows to each table
         for uuidstr in self.uuidstrs:
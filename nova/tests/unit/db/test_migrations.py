@@ -997,6 +997,11 @@ class NovaMigrationsCheckers(test_migrations.ModelsMigrationsSync,
             'instance_actions_instance_uuid_updated_at_idx',
             ['instance_uuid', 'updated_at'])
 
+    def _check_379(self, engine, data):
+        self.assertIndexMembers(engine, 'instances',
+                                'instances_display_name_deleted_idx',
+                                ['display_name', 'deleted'])
+
 
 class TestNovaMigrationsSQLite(NovaMigrationsCheckers,
                                test_base.DbTestCase,
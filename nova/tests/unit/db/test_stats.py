@@ -0,0 +1,98 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from nova import context
+from nova.db import stats as db_stats
+from nova import test
+
+
+class DBStatsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(DBStatsTestCase, self).setUp()
+        self.context = context.RequestContext('fake-user', 'fake-project')
+
+    def test_add(self):
+        stats = db_stats.DBStats()
+        stats.add('instance_get', 1, 0.5)
+        stats.add('instance_get', 0, 0.25)
+        stats.add('-', 3, 0.25)
+
+        self.assertEqual(3, stats.statements)
+        self.assertEqual(4, stats.rows)
+        self.assertEqual(1.0, stats.time)
+        self.assertEqual({'instance_get': [2, 1, 0.75], '-': [1, 3, 0.25]},
+                         stats.functions)
+        self.assertEqual([('instance_get', 2), ('-', 1)],
+                         stats.top_functions())
+        self.assertEqual([('instance_get', 2)], stats.top_functions(1))
+        self.assertEqual('3 statements, 4 rows, 1.000000s', str(stats))
+
+    def test_record_disabled(self):
+        db_stats.record(1, 0.1)
+        self.assertIsNone(self.context.db_stats)
+
+    def test_record(self):
+        self.flags(db_statement_stats=True)
+        with db_stats.db_api_function('instance_get_all'):
+            with db_stats.db_api_function('_instances_fill_metadata'):
+                db_stats.record(2, 0.1)
+            db_stats.record(-1, 0.1)
+        db_stats.record(0, 0.2)
+
+        stats = self.context.db_stats
+        self.assertEqual(3, stats.statements)
+        self.assertEqual(2, stats.rows)
+        self.assertEqual({'instance_get_all': [2, 2, 0.2],
+                          db_stats.UNKNOWN_FUNCTION: [1, 0, 0.2]},
+                         stats.functions)
+
+    def test_record_not_current_context(self):
+        self.flags(db_statement_stats=True)
+        admin_context = context.get_admin_context()
+        db_stats.record(1, 0.1)
+        self.assertIsNone(admin_context.db_stats)
+        self.assertEqual(1, self.context.db_stats.statements)
+
+    def test_record_collector(self):
+        stats = db_stats.DBStats()
+        db_stats.add_collector(stats)
+        self.addCleanup(db_stats.remove_collector, stats)
+        db_stats.record(1, 0.1)
+        self.assertEqual(1, stats.statements)
+        self.assertIsNone(self.context.db_stats)
+
+    @mock.patch.object(db_stats.LOG, 'warning')
+    def test_report(self, mock_warning):
+        self.flags(db_statement_budget=2)
+        self.context.db_stats = stats = db_stats.DBStats()
+        stats.add('instance_get', 1, 0.1)
+        stats.add('instance_get', 1, 0.1)
+
+        self.assertIs(stats, db_stats.report(self.context, 'GET /servers'))
+        self.assertIsNone(self.context.db_stats)
+        self.assertFalse(mock_warning.called)
+        self.assertIsNone(db_stats.report(self.context, 'GET /servers'))
+
+    @mock.patch.object(db_stats.LOG, 'warning')
+    def test_report_over_budget(self, mock_warning):
+        self.flags(db_statement_budget=2)
+        self.context.db_stats = stats = db_stats.DBStats()
+        for i in range(3):
+            stats.add('instance_get', 1, 0.1)
+
+        db_stats.report(self.context, 'GET /servers')
+        mock_warning.assert_called_once_with(
+            mock.ANY, {'description': 'GET /servers', 'statements': 3,
+                       'budget': 2, 'top': 'instance_get (3)'})
@@ -3351,6 +3351,162 @@ class TestNeutronv2WithMock(test.TestCase):
                           api.get_instance_nw_info, 'context', instance)
         mock_lock.assert_called_once_with('refresh_cache-%s' % instance.uuid)
 
+    @mock.patch.object(neutronapi.API, 'get_instance_nw_info')
+    @mock.patch.object(neutronapi.API, '_get_bulk_client')
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_get_instances_nw_info(self, mock_get_client, mock_bulk_client,
+                                   mock_get_nw_info):
+        instances = [objects.Instance(uuid=uuids.instance_1),
+                     objects.Instance(uuid=uuids.instance_2),
+                     objects.Instance(uuid=uuids.instance_3)]
+        mock_get_nw_info.side_effect = [
+            mock.sentinel.nw_info_1,
+            exception.InstanceNotFound(instance_id=uuids.instance_2),
+            mock.sentinel.nw_info_3]
+
+        result = self.api.get_instances_nw_info(self.context, instances)
+
+        self.assertEqual({uuids.instance_1: mock.sentinel.nw_info_1,
+                          uuids.instance_3: mock.sentinel.nw_info_3},
+                         result)
+        mock_get_client.assert_called_once_with(self.context, admin=True)
+        mock_bulk_client.assert_called_once_with(
+            mock_get_client.return_value, instances)
+        mock_get_nw_info.assert_has_calls([
+            mock.call(self.context, instance,
+                      admin_client=mock_bulk_client.return_value)
+            for instance in instances])
+
+    @mock.patch.object(neutronapi.API, 'get_instance_nw_info')
+    @mock.patch.object(neutronapi.API, '_get_bulk_client',
+                       side_effect=test.TestingException)
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_get_instances_nw_info_bulk_fetch_fails(self, mock_get_client,
+                                                    mock_bulk_client,
+                                                    mock_get_nw_info):
+        instance = objects.Instance(uuid=uuids.instance)
+        result = self.api.get_instances_nw_info(self.context, [instance])
+        self.assertEqual({uuids.instance: mock_get_nw_info.return_value},
+                         result)
+        mock_get_nw_info.assert_called_once_with(
+            self.context, instance,
+            admin_client=mock_get_client.return_value)
+
+    def test_get_bulk_client(self):
+        nw_info = model.NetworkInfo([
+            model.VIF(id=uuids.port_1,
+                      network=model.Network(id=uuids.net_1))])
+        instances = [
+            objects.Instance(uuid=uuids.instance_1,
+                             info_cache=objects.InstanceInfoCache(
+                                 network_info=nw_info)),
+            objects.Instance(uuid=uuids.instance_2,
+                             info_cache=objects.InstanceInfoCache(
+                                 network_info=model.NetworkInfo()))]
+        port_1 = {'id': uuids.port_1, 'device_id': uuids.instance_1,
+                  'tenant_id': uuids.project, 'network_id': uuids.net_1,
+                  'fixed_ips': [{'subnet_id': uuids.subnet_1,
+                                 'ip_address': '10.0.0.2'}]}
+        dhcp_port = {'id': uuids.dhcp_port, 'network_id': uuids.net_1,
+                     'device_owner': 'network:dhcp',
+                     'fixed_ips': [{'subnet_id': uuids.subnet_1,
+                                    'ip_address': '10.0.0.1'}]}
+        network_1 = {'id': uuids.net_1}
+        subnet_1 = {'id': uuids.subnet_1, 'network_id': uuids.net_1}
+        fip = {'port_id': uuids.port_1, 'fixed_ip_address': '10.0.0.2',
+               'floating_ip_address': '172.24.4.2'}
+        client = mock.Mock()
+        client.list_ports.side_effect = [{'ports': [port_1]},
+                                         {'ports': [dhcp_port]}]
+        client.list_networks.return_value = {'networks': [network_1]}
+        client.list_subnets.return_value = {'subnets': [subnet_1]}
+        client.list_floatingips.return_value = {'floatingips': [fip]}
+
+        bulk_client = self.api._get_bulk_client(client, instances)
+
+        client.list_ports.assert_has_calls([
+            mock.call(device_id=mock.ANY),
+            mock.call(network_id=[uuids.net_1],
+                      device_owner='network:dhcp')])
+        self.assertEqual(
+            sorted([uuids.instance_1, uuids.instance_2]),
+            sorted(client.list_ports.call_args_list[0][1]['device_id']))
+        client.list_networks.assert_called_once_with(id=[uuids.net_1])
+        client.list_subnets.assert_called_once_with(id=[uuids.subnet_1])
+        client.list_floatingips.assert_called_once_with(
+            port_id=[uuids.port_1])
+        client.reset_mock()
+
+        # The queries made to build the network info are answered from the
+        # bulk data.
+        self.assertEqual(
+            {'ports': [port_1]},
+            bulk_client.list_ports(tenant_id=uuids.project,
+                                   device_id=uuids.instance_1))
+        self.assertEqual(
+            {'ports': []},
+            bulk_client.list_ports(tenant_id=uuids.project,
+                                   device_id=uuids.instance_2))
+        self.assertEqual(
+            {'ports': [dhcp_port]},
+            bulk_client.list_ports(network_id=uuids.net_1,
+                                   device_owner='network:dhcp'))
+        self.assertEqual({'networks': [network_1]},
+                         bulk_client.list_networks(id=[uuids.net_1]))
+        self.assertEqual({'subnets': [subnet_1]},
+                         bulk_client.list_subnets(id=[uuids.subnet_1]))
+        self.assertEqual(
+            {'floatingips': [fip]},
+            bulk_client.list_floatingips(fixed_ip_address='10.0.0.2',
+                                         port_id=uuids.port_1))
+        self.assertFalse(client.method_calls)
+
+        # Anything else goes to Neutron.
+        bulk_client.list_networks(id=[uuids.net_2])
+        client.list_networks.assert_called_once_with(id=[uuids.net_2])
+        bulk_client.show_port(uuids.port_1)
+        client.show_port.assert_called_once_with(uuids.port_1)
+
+        # The data of an instance is only current if neither its ports nor
+        # its info cache changed since it was fetched.
+        client.list_ports.side_effect = None
+        client.list_ports.return_value = {'ports': [port_1]}
+        self.assertTrue(bulk_client.is_current(instances[0]))
+        client.list_ports.assert_called_once_with(device_id=uuids.instance_1)
+        client.list_ports.return_value = {'ports': []}
+        self.assertFalse(bulk_client.is_current(instances[0]))
+        client.list_ports.return_value = {'ports': [port_1]}
+        instances[0].info_cache.network_info = model.NetworkInfo()
+        self.assertFalse(bulk_client.is_current(instances[0]))
+        self.assertFalse(bulk_client.is_current(
+            objects.Instance(uuid=uuids.instance_3)))
+
+    @mock.patch.object(neutronapi.API, '_build_network_info_model',
+                       return_value=[])
+    @mock.patch('nova.compute.utils.refresh_info_cache_for_instance')
+    def test_get_instance_nw_info_bulk_client_outdated(self, mock_refresh,
+                                                       mock_build):
+        instance = objects.Instance(uuid=uuids.instance)
+        bulk_client = mock.Mock(spec=neutronapi._BulkClient)
+        bulk_client.client = mock.sentinel.client
+
+        bulk_client.is_current.return_value = True
+        self.api._get_instance_nw_info(self.context, instance,
+                                       admin_client=bulk_client)
+        mock_build.assert_called_once_with(self.context, instance, None,
+                                           None, bulk_client, None)
+
+        # The instance changed after the bulk queries, so it's queried
+        # again with the client the bulk client wraps.
+        mock_build.reset_mock()
+        bulk_client.is_current.return_value = False
+        self.api._get_instance_nw_info(self.context, instance,
+                                       admin_client=bulk_client)
+        mock_build.assert_called_once_with(self.context, instance, None,
+                                           None, mock.sentinel.client, None)
+        mock_refresh.assert_called_with(self.context, instance)
+        bulk_client.is_current.assert_called_with(instance)
+
     @mock.patch('nova.network.neutronv2.api.LOG')
     def test_get_instance_nw_info_verify_duplicates_ignored(self, mock_log):
         """test that the returned networks & port_ids from
@@ -22,6 +22,7 @@ from nova.objects import bandwidth_usage
 from nova import test
 from nova.tests.unit.objects import test_objects
 from nova.tests import uuidsentinel as uuids
+from nova import utils
 
 
 class _TestBandwidthUsage(test.TestCase):
@@ -140,10 +141,46 @@ class _TestBandwidthUsage(test.TestCase):
                         start_period=self.expected_bw_usage['start_period'])
         self._compare(self, self.expected_bw_usage, bw_usage)
 
+    def test_update_all_with_db(self):
+        start_period = self.expected_bw_usage['start_period']
+        bw_usage = bandwidth_usage.BandwidthUsage(context=self.context)
+        bw_usage.create(uuids.instance, 'fake_mac1', 1, 2, 3, 4,
+                        start_period=start_period)
+
+        usages = [{'uuid': uuids.instance, 'mac': 'fake_mac1',
+                   'bw_in': 100, 'bw_out': 200,
+                   'last_ctr_in': 12345, 'last_ctr_out': 67890},
+                  {'uuid': uuids.instance, 'mac': 'fake_mac2',
+                   'bw_in': 10, 'bw_out': 20,
+                   'last_ctr_in': 30, 'last_ctr_out': 40}]
+        bandwidth_usage.BandwidthUsageList.update_all(
+            self.context, usages, start_period, update_cells=False)
+
+        bw_usages = bandwidth_usage.BandwidthUsageList.get_by_uuids(
+            self.context, [uuids.instance], start_period=start_period)
+        bw_usages = {bw_usage.mac: bw_usage for bw_usage in bw_usages}
+        self.assertEqual(set(['fake_mac1', 'fake_mac2']), set(bw_usages))
+        for usage in usages:
+            bw_usage = bw_usages[usage['mac']]
+            for field in ('bw_in', 'bw_out', 'last_ctr_in', 'last_ctr_out'):
+                self.assertEqual(usage[field], getattr(bw_usage, field))
+
 
 class TestBandwidthUsageObject(test_objects._LocalTest,
                                _TestBandwidthUsage):
-    pass
+
+    def test_update_all_indirection_api(self):
+        start_period = self.expected_bw_usage['start_period']
+        indirection_api = mock.Mock(spec=['bw_usage_update_multi'])
+        usages = [{'uuid': uuids.instance, 'mac': 'fake_mac1',
+                   'bw_in': 100, 'bw_out': 200,
+                   'last_ctr_in': 12345, 'last_ctr_out': 67890}]
+        with mock.patch.object(bandwidth_usage.BandwidthUsageList,
+                               'indirection_api', indirection_api):
+            bandwidth_usage.BandwidthUsageList.update_all(
+                self.context, usages, start_period)
+        indirection_api.bw_usage_update_multi.assert_called_once_with(
+            self.context, usages, utils.strtime(start_period), None, True)
 
 
 class TestRemoteBandwidthUsageObject(test_objects._RemoteTest,
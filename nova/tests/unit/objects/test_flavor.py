@@ -315,6 +315,23 @@ class TestFlavor(test_objects._LocalTest, _TestFlavor):
         self.assertRaises(exception.FlavorAccessNotFound,
                           flavor.remove_access, 'project2')
 
+    @mock.patch('nova.db.stats.db_api_function')
+    def test_get_from_db_replica_reads(self, mock_function):
+        mock_function.return_value = mock.MagicMock()
+        db_flavor = self._create_api_flavor(self.context)
+        self.context.db_replica_reads = True
+        for flavor in (
+                objects.Flavor.get_by_id(self.context, db_flavor['id']),
+                objects.Flavor.get_by_name(self.context, db_flavor['name']),
+                objects.Flavor.get_by_flavor_id(self.context,
+                                                db_flavor['flavorid'])):
+            self._compare(self, db_flavor, flavor)
+        # The lookups run in their own replica-aware transactions
+        mock_function.assert_has_calls([
+            mock.call('_flavor_get_from_db'),
+            mock.call('_flavor_get_by_name_from_db'),
+            mock.call('_flavor_get_by_flavor_id_from_db')], any_order=True)
+
     def test_extra_specs_in_db(self):
         db_flavor = self._create_api_flavor(self.context)
         flavor = objects.Flavor.get_by_id(self.context, db_flavor['id'])
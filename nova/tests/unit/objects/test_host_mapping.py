@@ -139,6 +139,44 @@ class _TestHostMappingObject(object):
         mapping_obj.destroy()
         destroy_in_db.assert_called_once_with(self.context, "fake-host2")
 
+    @mock.patch.object(host_mapping.HostMapping, '_destroy_in_db')
+    def test_destroy_clears_cache(self, destroy_in_db):
+        objects.HostMapping._CELL_CACHE.set('fake-host2', {}, 60, 10)
+        mapping_obj = objects.HostMapping(self.context)
+        mapping_obj.host = "fake-host2"
+
+        mapping_obj.destroy()
+        self.assertIsNone(objects.HostMapping._CELL_CACHE.get('fake-host2'))
+
+    @mock.patch.object(host_mapping.HostMapping, '_get_by_host_from_db')
+    def test_get_by_host_cached(self, host_from_db):
+        db_mapping = get_db_mapping()
+        host_from_db.return_value = db_mapping
+        self.stub_out('nova.objects.HostMapping._CELL_CACHING', True)
+
+        for i in range(2):
+            mapping_obj = objects.HostMapping.get_by_host_cached(
+                self.context, 'fake-host')
+            self.compare_obj(mapping_obj, db_mapping,
+                             subs={'cell_mapping': 'cell_id'},
+                             comparators={
+                                 'cell_mapping': self._check_cell_map_value})
+        host_from_db.assert_called_once_with(self.context, 'fake-host')
+
+        objects.HostMapping.clear_cell_cache()
+        objects.HostMapping.get_by_host_cached(self.context, 'fake-host')
+        self.assertEqual(2, host_from_db.call_count)
+
+    @mock.patch.object(host_mapping.HostMapping, '_get_by_host_from_db')
+    def test_get_by_host_cached_ttl_zero(self, host_from_db):
+        host_from_db.return_value = get_db_mapping()
+        self.stub_out('nova.objects.HostMapping._CELL_CACHING', True)
+        self.flags(mapping_cache_ttl=0)
+
+        for i in range(2):
+            objects.HostMapping.get_by_host_cached(self.context, 'fake-host')
+        self.assertEqual(2, host_from_db.call_count)
+
 
 class TestHostMappingObject(test_objects._LocalTest,
                             _TestHostMappingObject):
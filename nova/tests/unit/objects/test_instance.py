@@ -1883,6 +1883,65 @@ class _TestInstanceListObject(object):
                                                [x.uuid for x in insts],
                                                latest=True)
 
+    @mock.patch.object(db, 'instance_get_all_by_filters')
+    def test_lazy_load_in_batch(self, mock_get_all):
+        fakes = [fake_instance.fake_db_instance(
+                     system_metadata={'foo': str(i)}) for i in range(3)]
+        mock_get_all.return_value = fakes
+        inst_list = objects.InstanceList(self.context, objects=[
+            objects.Instance(self.context, uuid=fake['uuid'], deleted=False)
+            for fake in fakes])
+        for inst in inst_list:
+            inst.obj_reset_changes()
+        instance.LAZY_LOAD_COUNTS.clear()
+
+        self.assertEqual({'foo': '1'}, inst_list[1].system_metadata)
+        for i, inst in enumerate(inst_list):
+            self.assertEqual({'foo': str(i)}, inst.system_metadata)
+            self.assertEqual(set(), inst.obj_what_changed())
+        mock_get_all.assert_called_once_with(
+            self.context, {'uuid': [fake['uuid'] for fake in fakes],
+                           'deleted': False},
+            'created_at', 'desc', limit=None, marker=None,
+            columns_to_join=['system_metadata'])
+        self.assertEqual({('system_metadata', 'batch'): 1},
+                         dict(instance.LAZY_LOAD_COUNTS))
+
+    @mock.patch.object(instance.Instance, '_load_generic')
+    @mock.patch.object(db, 'instance_get_all_by_filters')
+    def test_lazy_load_in_batch_not_found(self, mock_get_all,
+                                          mock_load_generic):
+        mock_get_all.return_value = []
+        inst_list = objects.InstanceList(self.context, objects=[
+            objects.Instance(self.context, uuid=uuid, deleted=False)
+            for uuid in (uuids.inst1, uuids.inst2)])
+        instance.LAZY_LOAD_COUNTS.clear()
+
+        def fake_load_generic(attrname):
+            inst_list.objects[0].system_metadata = {}
+
+        mock_load_generic.side_effect = fake_load_generic
+        self.assertEqual({}, inst_list[0].system_metadata)
+        mock_load_generic.assert_called_once_with('system_metadata')
+        self.assertEqual({('system_metadata', 'batch'): 1,
+                          ('system_metadata', 'n+1'): 1},
+                         dict(instance.LAZY_LOAD_COUNTS))
+
+    @mock.patch.object(instance.Instance, '_load_ec2_ids')
+    @mock.patch.object(db, 'instance_get_all_by_filters')
+    def test_lazy_load_not_in_batch(self, mock_get_all, mock_load_ec2_ids):
+        inst_list = objects.InstanceList(self.context, objects=[
+            objects.Instance(self.context, uuid=uuid, deleted=False)
+            for uuid in (uuids.inst1, uuids.inst2)])
+
+        def fake_load_ec2_ids():
+            inst_list.objects[0].ec2_ids = objects.EC2Ids()
+
+        mock_load_ec2_ids.side_effect = fake_load_ec2_ids
+        inst_list[0].ec2_ids
+        mock_load_ec2_ids.assert_called_once_with()
+        mock_get_all.assert_not_called()
+
     @mock.patch('nova.objects.instance.Instance.obj_make_compatible')
     def test_get_by_security_group(self, mock_compat):
         fake_secgroup = dict(test_security_group.fake_secgroup)
@@ -133,11 +133,68 @@ class _TestInstanceMappingObject(object):
         mapping_obj.destroy()
         destroy_in_db.assert_called_once_with(self.context, uuid)
 
+    @mock.patch.object(instance_mapping.InstanceMapping, '_destroy_in_db')
+    def test_destroy_clears_cache(self, destroy_in_db):
+        uuid = uuidutils.generate_uuid()
+        objects.InstanceMapping._CELL_CACHE.set(uuid, {}, 60, 10)
+        mapping_obj = objects.InstanceMapping(self.context)
+        mapping_obj.instance_uuid = uuid
+
+        mapping_obj.destroy()
+        self.assertIsNone(objects.InstanceMapping._CELL_CACHE.get(uuid))
+
     def test_cell_mapping_nullable(self):
         mapping_obj = objects.InstanceMapping(self.context)
         # Just ensure this doesn't raise an exception
         mapping_obj.cell_mapping = None
 
+    @mock.patch.object(instance_mapping.InstanceMapping,
+            '_get_by_instance_uuid_from_db')
+    def test_get_by_instance_uuid_cached(self, uuid_from_db):
+        db_mapping = get_db_mapping()
+        uuid = db_mapping['instance_uuid']
+        uuid_from_db.return_value = db_mapping
+        self.stub_out('nova.objects.InstanceMapping._CELL_CACHING', True)
+
+        for i in range(2):
+            mapping_obj = objects.InstanceMapping.get_by_instance_uuid_cached(
+                self.context, uuid)
+            self.compare_obj(mapping_obj, db_mapping,
+                             subs={'cell_mapping': 'cell_id'},
+                             comparators={
+                                 'cell_mapping': self._check_cell_map_value})
+        uuid_from_db.assert_called_once_with(self.context, uuid)
+
+        objects.InstanceMapping.clear_cell_cache(uuid)
+        objects.InstanceMapping.get_by_instance_uuid_cached(self.context, uuid)
+        self.assertEqual(2, uuid_from_db.call_count)
+
+    @mock.patch.object(instance_mapping.InstanceMapping,
+            '_get_by_instance_uuid_from_db')
+    def test_get_by_instance_uuid_cached_not_in_cell(self, uuid_from_db):
+        db_mapping = get_db_mapping(cell_mapping=None, cell_id=None)
+        uuid = db_mapping['instance_uuid']
+        uuid_from_db.return_value = db_mapping
+        self.stub_out('nova.objects.InstanceMapping._CELL_CACHING', True)
+
+        for i in range(2):
+            mapping_obj = objects.InstanceMapping.get_by_instance_uuid_cached(
+                self.context, uuid)
+            self.assertIsNone(mapping_obj.cell_mapping)
+        self.assertEqual(2, uuid_from_db.call_count)
+
+    @mock.patch.object(instance_mapping.InstanceMapping,
+            '_get_by_instance_uuid_from_db')
+    def test_get_by_instance_uuid_cached_disabled(self, uuid_from_db):
+        db_mapping = get_db_mapping()
+        uuid = db_mapping['instance_uuid']
+        uuid_from_db.return_value = db_mapping
+
+        for i in range(2):
+            objects.InstanceMapping.get_by_instance_uuid_cached(
+                self.context, uuid)
+        self.assertEqual(2, uuid_from_db.call_count)
+
 
 class TestInstanceMappingObject(test_objects._LocalTest,
                                 _TestInstanceMappingObject):
@@ -21,6 +21,8 @@ import pprint
 
 import fixtures
 import mock
+import oslo_messaging as messaging
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 from oslo_versionedobjects import base as ovo_base
 from oslo_versionedobjects import exception as ovo_exc
@@ -29,12 +31,15 @@ import six
 
 from nova import context
 from nova import exception
+from nova.network import model as network_model
 from nova import objects
 from nova.objects import base
 from nova.objects import fields
 from nova.objects import virt_device_metadata
 from nova import test
 from nova.tests import fixtures as nova_fixtures
+from nova.tests.unit import fake_instance
+from nova.tests.unit import fake_network_cache_model
 from nova.tests.unit import fake_notifier
 from nova import utils
 
@@ -270,6 +275,15 @@ class FakeIndirectionHack(fixture.FakeIndirectionAPI):
         updates['obj_what_changed'] = objinst.obj_what_changed()
         return updates, result
 
+    def object_actions(self, context, actions):
+        results = []
+        for action in actions:
+            try:
+                results.append(self.object_action(context, **action))
+            except Exception:
+                results.append(None)
+        return results
+
     def object_class_action(self, context, objname, objmethod, objver,
                             args, kwargs):
         objname = six.text_type(objname)
@@ -811,6 +825,76 @@ class TestObject(_LocalTest, _TestObject):
         self.assertTrue(obj.deleted)
 
 
+class _TestObjSaveAll(object):
+    def test_obj_save_all(self):
+        objs = [MyObj(context=self.context, foo=i) for i in range(3)]
+        self.assertEqual([None] * 3, base.obj_save_all(objs))
+        for obj in objs:
+            self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_obj_save_all_error(self):
+        objs = [MyObj(context=self.context, foo=i) for i in range(3)]
+        objs[1]._context = None
+        errors = base.obj_save_all(objs)
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], ovo_exc.OrphanedObjectError)
+        self.assertIsNone(errors[2])
+        self.assertEqual(set(), objs[2].obj_what_changed())
+
+
+class TestObjSaveAll(_LocalTest, _TestObjSaveAll):
+    pass
+
+
+class TestRemoteObjSaveAll(_RemoteTest, _TestObjSaveAll):
+    def test_obj_save_all_batched(self):
+        objs = [MyObj(context=self.context, foo=i) for i in range(3)]
+        indirection_api = base.NovaObject.indirection_api
+        with test.nested(
+            mock.patch.object(indirection_api, 'object_actions',
+                              wraps=indirection_api.object_actions),
+            mock.patch.object(indirection_api, 'object_action',
+                              wraps=indirection_api.object_action),
+        ) as (mock_actions, mock_action):
+            self.assertEqual([None] * 3, base.obj_save_all(objs))
+        mock_actions.assert_called_once_with(self.context, mock.ANY)
+        self.assertEqual(3, len(mock_actions.call_args[0][1]))
+        self.assertEqual(3, mock_action.call_count)
+        for obj in objs:
+            self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_obj_save_all_not_implemented(self):
+        objs = [MyObj(context=self.context, foo=i) for i in range(2)]
+        indirection_api = base.NovaObject.indirection_api
+        with mock.patch.object(indirection_api, 'object_actions',
+                               side_effect=NotImplementedError):
+            self.assertEqual([None] * 2, base.obj_save_all(objs))
+        for obj in objs:
+            self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_obj_save_all_messaging_error(self):
+        objs = [MyObj(context=self.context, foo=i) for i in range(2)]
+        indirection_api = base.NovaObject.indirection_api
+        timeout = messaging.MessagingTimeout()
+        real_object_action = indirection_api.object_action
+
+        def fake_object_action(context, objinst, *args, **kwargs):
+            if objinst.foo == 0:
+                raise timeout
+            return real_object_action(context, objinst, *args, **kwargs)
+
+        with test.nested(
+            mock.patch.object(indirection_api, 'object_actions',
+                              side_effect=timeout),
+            mock.patch.object(indirection_api, 'object_action',
+                              side_effect=fake_object_action),
+        ) as (mock_actions, mock_action):
+            errors = base.obj_save_all(objs)
+        self.assertEqual([timeout, None], errors)
+        self.assertEqual(2, mock_action.call_count)
+        self.assertEqual(set(), objs[1].obj_what_changed())
+
+
 class TestObjectSerializer(_BaseTestCase):
     def test_serialize_entity_primitive(self):
         ser = base.NovaObjectSerializer()
@@ -826,6 +910,42 @@ class TestObjectSerializer(_BaseTestCase):
         ser = base.NovaObjectSerializer()
         self.assertEqual([1, 2], ser.serialize_entity(None, set([1, 2])))
 
+    def test_serialize_entity_compact(self):
+        self.flags(rpc_compact_objects=True)
+        ser = base.NovaObjectSerializer()
+        obj = MyObj(foo=1, bar='bar', rel_object=MyOwnedObject(baz=42))
+        primitive = ser.serialize_entity(self.context, [obj])
+        self.assertEqual([base.COMPACT_PRIMITIVE_KEY], list(primitive[0]))
+        self.assertEqual(obj.obj_to_primitive(),
+                         base.obj_expand_primitive(primitive[0]))
+        result = ser.deserialize_entity(self.context, primitive)[0]
+        self.assertEqual(1, result.foo)
+        self.assertEqual('bar', result.bar)
+        self.assertEqual(42, result.rel_object.baz)
+
+    def test_deserialize_entity_compact_not_enabled(self):
+        # NOTE: objects in the compact form are accepted even when not
+        # sending them, as other services may
+        ser = base.NovaObjectSerializer()
+        obj = MyObj(foo=1, bar='bar')
+        primitive = base.obj_compact_primitive(obj.obj_to_primitive())
+        result = ser.deserialize_entity(self.context, primitive)
+        self.assertEqual(1, result.foo)
+        self.assertEqual('bar', result.bar)
+
+    def test_serialize_entity_compact_instance_size(self):
+        inst = fake_instance.fake_instance_obj(
+            self.context, expected_attrs=['system_metadata', 'metadata'])
+        inst.info_cache = objects.InstanceInfoCache(
+            instance_uuid=inst.uuid,
+            network_info=network_model.NetworkInfo(
+                [fake_network_cache_model.new_vif()]))
+        ser = base.NovaObjectSerializer()
+        expanded = jsonutils.dumps(ser.serialize_entity(self.context, inst))
+        self.flags(rpc_compact_objects=True)
+        compact = jsonutils.dumps(ser.serialize_entity(self.context, inst))
+        self.assertLess(len(compact) * 2, len(expanded))
+
     def _test_deserialize_entity_newer(self, obj_version, backported_to,
                                        my_version='1.6'):
         ser = base.NovaObjectSerializer()
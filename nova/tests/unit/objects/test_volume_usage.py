@@ -11,6 +11,7 @@
 #    under the License.
 
 import mock
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 
 from nova import objects
@@ -81,10 +82,58 @@ class _TestVolumeUsage(object):
             'fake-project-id', 'fake-user-id', None, update_totals=True)
         self.compare_obj(vol_usage, fake_vol_usage)
 
+    def _make_vol_usage(self):
+        vol_usage = objects.VolumeUsage(self.context)
+        vol_usage.volume_id = uuids.volume_id
+        vol_usage.instance_uuid = uuids.instance
+        vol_usage.project_id = 'fake-project-id'
+        vol_usage.user_id = 'fake-user-id'
+        vol_usage.availability_zone = None
+        vol_usage.curr_reads = 10
+        vol_usage.curr_read_bytes = 20
+        vol_usage.curr_writes = 30
+        vol_usage.curr_write_bytes = 40
+        return vol_usage
+
+    @mock.patch('nova.db.vol_usage_update_multi',
+                return_value=[fake_vol_usage])
+    @mock.patch('nova.db.vol_usage_update', return_value=fake_vol_usage)
+    def test_save_all(self, mock_upd, mock_upd_multi):
+        vol_usage = self._make_vol_usage()
+        objects.VolumeUsage.save_all(self.context, [vol_usage])
+        self.compare_obj(vol_usage, fake_vol_usage)
+        return mock_upd, mock_upd_multi
+
 
 class TestVolumeUsage(test_objects._LocalTest, _TestVolumeUsage):
-    pass
+    def test_save_all(self):
+        mock_upd, mock_upd_multi = super(TestVolumeUsage,
+                                         self).test_save_all()
+        mock_upd_multi.assert_called_once_with(self.context, [{
+            'volume_id': uuids.volume_id, 'instance_uuid': uuids.instance,
+            'project_id': 'fake-project-id', 'user_id': 'fake-user-id',
+            'availability_zone': None, 'curr_reads': 10,
+            'curr_read_bytes': 20, 'curr_writes': 30,
+            'curr_write_bytes': 40}])
+        self.assertFalse(mock_upd.called)
+
+    def test_save_all_indirection_api(self):
+        indirection_api = mock.Mock(spec=['vol_usage_update_multi'])
+        indirection_api.vol_usage_update_multi.return_value = [
+            jsonutils.to_primitive(fake_vol_usage)]
+        vol_usage = self._make_vol_usage()
+        with mock.patch.object(objects.VolumeUsage, 'indirection_api',
+                               indirection_api):
+            objects.VolumeUsage.save_all(self.context, [vol_usage])
+        indirection_api.vol_usage_update_multi.assert_called_once_with(
+            self.context, mock.ANY)
+        self.compare_obj(vol_usage, fake_vol_usage)
 
 
 class TestRemoteVolumeUsage(test_objects._RemoteTest, _TestVolumeUsage):
-    pass
+    def test_save_all(self):
+        # The fake indirection API can't save in batches
+        mock_upd, mock_upd_multi = super(TestRemoteVolumeUsage,
+                                         self).test_save_all()
+        self.assertTrue(mock_upd.called)
+        self.assertFalse(mock_upd_multi.called)
@@ -2495,7 +2495,8 @@ class TestInventory(SchedulerReportClientTestCase):
                 '_update_inventory')
     def test_update_compute_node(self, mock_ui, mock_erp):
         cn = self.compute_node
-        self.client.update_compute_node(self.context, cn)
+        mock_ui.return_value = True
+        self.assertTrue(self.client.update_compute_node(self.context, cn))
         mock_erp.assert_called_once_with(self.context, cn.uuid,
                                          cn.hypervisor_hostname)
         expected_inv_data = {
@@ -3066,6 +3067,27 @@ class TestInventory(SchedulerReportClientTestCase):
         mock_upd.assert_called_once_with(
             self.context, mock.sentinel.rp_uuid, {})
 
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_update_inventory')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_ensure_resource_classes')
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                '_ensure_resource_provider')
+    def test_set_inventory_for_provider_result(self, mock_erp, mock_erc,
+                                               mock_upd):
+        """Tests that the caller is told whether the inventory was set,
+        including when _update_inventory() could not connect to placement.
+        """
+        for result, expected in ((True, True), (False, False),
+                                 (None, False)):
+            mock_upd.return_value = result
+            self.assertIs(expected, self.client.set_inventory_for_provider(
+                self.context,
+                mock.sentinel.rp_uuid,
+                mock.sentinel.rp_name,
+                {},
+            ))
+
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
                 '_update_inventory')
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
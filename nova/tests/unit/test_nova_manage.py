@@ -13,12 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
 import sys
 
 import ddt
 import fixtures
 import mock
 from oslo_db import exception as db_exc
+from oslo_serialization import jsonutils
 from oslo_utils import uuidutils
 from six.moves import StringIO
 
@@ -390,7 +392,8 @@ class DBCommandsTestCase(test.NoDBTestCase):
                        return_value=(dict(instances=10, consoles=5), list()))
     def _test_archive_deleted_rows(self, mock_db_archive, verbose=False):
         result = self.commands.archive_deleted_rows(20, verbose=verbose)
-        mock_db_archive.assert_called_once_with(20)
+        mock_db_archive.assert_called_once_with(
+            20, context=None, purge=False, markers={}, workers=1)
         output = self.output.getvalue()
         if verbose:
             expected = '''\
@@ -439,9 +442,9 @@ Archiving.....complete
             expected = ''
 
         self.assertEqual(expected, self.output.getvalue())
-        mock_db_archive.assert_has_calls([mock.call(20),
-                                          mock.call(20),
-                                          mock.call(20)])
+        mock_db_archive.assert_has_calls(
+            [mock.call(20, context=None, purge=False, markers={},
+                       workers=1)] * 3)
 
     def test_archive_deleted_rows_until_complete_quiet(self):
         self.test_archive_deleted_rows_until_complete(verbose=False)
@@ -471,9 +474,9 @@ Archiving.....stopped
             expected = ''
 
         self.assertEqual(expected, self.output.getvalue())
-        mock_db_archive.assert_has_calls([mock.call(20),
-                                          mock.call(20),
-                                          mock.call(20)])
+        mock_db_archive.assert_has_calls(
+            [mock.call(20, context=None, purge=False, markers={},
+                       workers=1)] * 3)
 
     def test_archive_deleted_rows_until_stopped_quiet(self):
         self.test_archive_deleted_rows_until_stopped(verbose=False)
@@ -481,7 +484,8 @@ Archiving.....stopped
     @mock.patch.object(db, 'archive_deleted_rows', return_value=({}, []))
     def test_archive_deleted_rows_verbose_no_results(self, mock_db_archive):
         result = self.commands.archive_deleted_rows(20, verbose=True)
-        mock_db_archive.assert_called_once_with(20)
+        mock_db_archive.assert_called_once_with(
+            20, context=None, purge=False, markers={}, workers=1)
         output = self.output.getvalue()
         self.assertIn('Nothing was archived.', output)
         self.assertEqual(0, result)
@@ -515,7 +519,8 @@ Archiving.....stopped
         result = self.commands.archive_deleted_rows(20, verbose=verbose)
 
         self.assertEqual(1, result)
-        mock_db_archive.assert_called_once_with(20)
+        mock_db_archive.assert_called_once_with(
+            20, context=None, purge=False, markers={}, workers=1)
         self.assertEqual(1, mock_destroy.call_count)
 
         output = self.output.getvalue()
@@ -534,6 +539,105 @@ Archiving.....stopped
         else:
             self.assertEqual(0, len(output))
 
+    def test_archive_deleted_rows_invalid_workers(self):
+        self.assertEqual(2, self.commands.archive_deleted_rows(20,
+                                                               workers=0))
+
+    def test_archive_deleted_rows_invalid_max_rate(self):
+        self.assertEqual(2, self.commands.archive_deleted_rows(20,
+                                                               max_rate=0))
+
+    @mock.patch.object(db, 'archive_deleted_rows',
+                       return_value=(dict(instances=10), list()))
+    def test_archive_deleted_rows_purge_workers(self, mock_db_archive):
+        result = self.commands.archive_deleted_rows(20, purge=True,
+                                                    workers=4)
+        self.assertEqual(1, result)
+        mock_db_archive.assert_called_once_with(
+            20, context=None, purge=True, markers={}, workers=4)
+
+    @mock.patch.object(context, 'target_cell')
+    @mock.patch.object(objects.CellMappingList, 'get_all')
+    @mock.patch.object(db, 'archive_deleted_rows')
+    def test_archive_deleted_rows_all_cells(self, mock_db_archive,
+                                            mock_get_cells,
+                                            mock_target_cell):
+        cells = [objects.CellMapping(uuid=uuidsentinel.cell0),
+                 objects.CellMapping(uuid=uuidsentinel.cell1)]
+        mock_get_cells.return_value = cells
+        cctxt = mock_target_cell.return_value.__enter__.return_value
+        mock_db_archive.side_effect = [
+            (dict(instances=10, consoles=5), list()),
+            (dict(instances=2), list())]
+
+        result = self.commands.archive_deleted_rows(20, verbose=True,
+                                                    all_cells=True)
+
+        self.assertEqual(1, result)
+        mock_target_cell.assert_has_calls(
+            [mock.call(mock.ANY, cells[0]), mock.call(mock.ANY, cells[1])],
+            any_order=True)
+        mock_db_archive.assert_has_calls(
+            [mock.call(20, context=cctxt, purge=False, markers={},
+                       workers=1)] * 2)
+        expected = '''\
++-----------+-------------------------+
+| Table     | Number of Rows Archived |
++-----------+-------------------------+
+| consoles  | 5                       |
+| instances | 12                      |
++-----------+-------------------------+
+'''
+        self.assertEqual(expected, self.output.getvalue())
+
+    @mock.patch.object(db, 'archive_deleted_rows')
+    def test_archive_deleted_rows_checkpoint(self, mock_db_archive):
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'archive.json')
+        seen_markers = []
+
+        def fake_archive(max_rows, markers=None, **kwargs):
+            seen_markers.append(dict(markers))
+            if not markers:
+                markers['instances'] = 5
+                return dict(instances=5), list()
+            raise KeyboardInterrupt()
+
+        mock_db_archive.side_effect = fake_archive
+        result = self.commands.archive_deleted_rows(
+            5, until_complete=True, checkpoint=checkpoint)
+        self.assertEqual(1, result)
+        # The marker of the first run was kept when interrupted
+        with open(checkpoint) as f:
+            self.assertEqual({'': {'instances': 5}}, jsonutils.load(f))
+
+        # Resume from the checkpoint until there is nothing left
+        def fake_resume(max_rows, markers=None, **kwargs):
+            seen_markers.append(dict(markers))
+            return {}, list()
+
+        mock_db_archive.side_effect = fake_resume
+        result = self.commands.archive_deleted_rows(
+            5, until_complete=True, checkpoint=checkpoint)
+        self.assertEqual(0, result)
+        self.assertEqual([{}, {'instances': 5}, {'instances': 5}],
+                         seen_markers)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    @mock.patch.object(manage, 'time')
+    @mock.patch.object(db, 'archive_deleted_rows')
+    def test_archive_deleted_rows_max_rate(self, mock_db_archive, mock_time):
+        mock_time.time.side_effect = [0, 1, 2]
+        mock_db_archive.side_effect = [
+            (dict(instances=20), list()),
+            (dict(instances=20), list()),
+            ({}, list())]
+        result = self.commands.archive_deleted_rows(20, until_complete=True,
+                                                    max_rate=10)
+        self.assertEqual(1, result)
+        # 20 rows archived after 1 second, then 40 rows after 2 seconds
+        mock_time.sleep.assert_has_calls([mock.call(1.0), mock.call(2.0)])
+
     @mock.patch.object(migration, 'db_null_instance_uuid_scan',
                        return_value={'foo': 0})
     def test_null_instance_uuid_scan_no_records_found(self, mock_scan):
@@ -412,6 +412,15 @@ class TestRequestContextSerializer(test.NoDBTestCase):
 
         context.to_dict.assert_called_once_with()
 
+    def test_serialize_context_counted(self):
+        with rpc.MessageCounter() as outer:
+            self.ser.serialize_context(mock.Mock())
+            with rpc.MessageCounter() as inner:
+                self.ser.serialize_context(mock.Mock())
+            self.assertEqual(1, inner.count)
+        self.ser.serialize_context(mock.Mock())
+        self.assertEqual(2, outer.count)
+
     @mock.patch.object(context, 'RequestContext')
     def test_deserialize_context(self, mock_req):
         self.ser.deserialize_context('context')
@@ -21,6 +21,7 @@ Unit Tests for remote procedure calls using queue
 import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
+from oslo_service import periodic_task
 from oslo_service import service as _service
 import testtools
 
@@ -51,6 +52,18 @@ class FakeManager(manager.Manager):
         return 'manager'
 
 
+class FakePeriodicManager(manager.Manager):
+    """Fake manager with a periodic task for tests."""
+    def __init__(self, *args, **kwargs):
+        super(FakePeriodicManager, self).__init__(*args, **kwargs)
+        self.result = None
+
+    @periodic_task.periodic_task(spacing=60)
+    def _fake_task(self, context):
+        rpc.RequestContextSerializer(None).serialize_context(mock.Mock())
+        return self.result
+
+
 class ExtendedService(service.Service):
     def test_method(self):
         return 'service'
@@ -259,6 +272,83 @@ class ServiceTestCase(test.NoDBTestCase):
             mock_reset.assert_called_once_with()
 
 
+class PeriodicTasksTestCase(test.NoDBTestCase):
+    """Test cases for the accounting of periodic tasks."""
+
+    def test_host_jitter(self):
+        self.flags(periodic_task_host_jitter=False)
+        last_run = FakePeriodicManager(
+            host='foo')._periodic_last_run['_fake_task']
+        self.flags(periodic_task_host_jitter=True)
+        jittered = FakePeriodicManager(
+            host='foo')._periodic_last_run['_fake_task']
+        self.assertLessEqual(jittered, last_run)
+        self.assertGreater(jittered, last_run - 60)
+        # The offset only depends on the host and the task.
+        self.assertEqual(jittered, FakePeriodicManager(
+            host='foo')._periodic_last_run['_fake_task'])
+
+    def test_stats(self):
+        mgr = FakePeriodicManager(host='foo')
+        mgr._periodic_tasks[0][1](mgr, 'ctxt')
+        stats = mgr.get_periodic_task_stats()['_fake_task']
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(0, stats['skipped'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(1, stats['messages'])
+
+    def test_stats_error(self):
+        mgr = FakePeriodicManager(host='foo')
+        with mock.patch.object(rpc.RequestContextSerializer,
+                               'serialize_context',
+                               side_effect=test.TestingException):
+            self.assertRaises(test.TestingException,
+                              mgr._periodic_tasks[0][1], mgr, 'ctxt')
+        stats = mgr.get_periodic_task_stats()['_fake_task']
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(1, stats['errors'])
+
+    def test_idle_backoff(self):
+        self.flags(periodic_task_max_backoff=4)
+        mgr = FakePeriodicManager(host='foo')
+        task = mgr._periodic_tasks[0][1]
+        mgr.result = manager.PERIODIC_TASK_IDLE
+        # The interval doubles on each idle run, up to four times the
+        # spacing of the task.
+        for i in range(10):
+            task(mgr, 'ctxt')
+        stats = mgr.get_periodic_task_stats()['_fake_task']
+        self.assertEqual(3, stats['runs'])
+        self.assertEqual(7, stats['skipped'])
+        # Doing work resets the backoff.
+        mgr.result = None
+        task(mgr, 'ctxt')
+        task(mgr, 'ctxt')
+        stats = mgr.get_periodic_task_stats()['_fake_task']
+        self.assertEqual(5, stats['runs'])
+        self.assertEqual(7, stats['skipped'])
+
+    def test_no_backoff_by_default(self):
+        mgr = FakePeriodicManager(host='foo')
+        task = mgr._periodic_tasks[0][1]
+        mgr.result = manager.PERIODIC_TASK_IDLE
+        task(mgr, 'ctxt')
+        task(mgr, 'ctxt')
+        stats = mgr.get_periodic_task_stats()['_fake_task']
+        self.assertEqual(2, stats['runs'])
+        self.assertEqual(0, stats['skipped'])
+
+    @mock.patch.object(manager.LOG, 'info')
+    def test_report_stats(self, mock_info):
+        mgr = FakePeriodicManager(host='foo')
+        mgr.periodic_tasks('ctxt')
+        mock_info.assert_not_called()
+        self.flags(periodic_task_stats_interval=1)
+        mgr._last_periodic_task_stats_report = 0
+        mgr.periodic_tasks('ctxt')
+        self.assertEqual(1, mock_info.call_count)
+
+
 class TestWSGIService(test.NoDBTestCase):
 
     def setUp(self):
@@ -284,6 +284,48 @@ class TestCachedFile(test.NoDBTestCase):
         self.assertNotIn(filename, utils._FILE_CACHE)
 
 
+@mock.patch('time.time', return_value=1000)
+class ExpiringLRUCacheTestCase(test.NoDBTestCase):
+
+    def test_get_set(self, mock_time):
+        cache = utils.ExpiringLRUCache()
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1, 10, 5)
+        cache.set('a', 2, 10, 5)
+        self.assertEqual(2, cache.get('a'))
+        self.assertEqual(1, len(cache))
+
+    def test_expired(self, mock_time):
+        cache = utils.ExpiringLRUCache()
+        cache.set('a', 1, 10, 5)
+        mock_time.return_value = 1009
+        self.assertEqual(1, cache.get('a'))
+        mock_time.return_value = 1010
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+    def test_evict_least_recently_used(self, mock_time):
+        cache = utils.ExpiringLRUCache()
+        cache.set('a', 1, 10, 2)
+        cache.set('b', 2, 10, 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3, 10, 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_delete_clear(self, mock_time):
+        cache = utils.ExpiringLRUCache()
+        cache.set('a', 1, 10, 5)
+        cache.set('b', 2, 10, 5)
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(2, cache.get('b'))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
 class RootwrapDaemonTesetCase(test.NoDBTestCase):
     @mock.patch('oslo_rootwrap.client.Client')
     def test_get_client(self, mock_client):
@@ -553,6 +553,27 @@ class IronicDriverTestCase(test.NoDBTestCase):
         expected = [n.instance_uuid for n in nodes]
         self.assertEqual(sorted(expected), sorted(uuids))
 
+    @mock.patch.object(cw.IronicClientWrapper, 'call')
+    def test_get_power_states(self, mock_call):
+        on = ironic_utils.get_test_node(instance_uuid=uuids.on,
+                                        power_state=ironic_states.POWER_ON)
+        off = ironic_utils.get_test_node(instance_uuid=uuids.off,
+                                         power_state=ironic_states.POWER_OFF)
+        other = ironic_utils.get_test_node(instance_uuid=uuids.other,
+                                           power_state=ironic_states.POWER_ON)
+        mock_call.return_value = [on, off, other]
+        instances = [fake_instance.fake_instance_obj(self.ctx, uuid=uuid)
+                     for uuid in (uuids.on, uuids.off, uuids.missing)]
+
+        states = self.driver.get_power_states(instances)
+
+        self.assertEqual({uuids.on: nova_states.RUNNING,
+                          uuids.off: nova_states.SHUTDOWN,
+                          uuids.missing: nova_states.NOSTATE}, states)
+        mock_call.assert_called_once_with(
+            'node.list', associated=True, limit=0,
+            fields=('instance_uuid', 'power_state'))
+
     @mock.patch.object(FAKE_CLIENT.node, 'list')
     @mock.patch.object(FAKE_CLIENT.node, 'get')
     @mock.patch.object(objects.InstanceList, 'get_uuids_by_host')
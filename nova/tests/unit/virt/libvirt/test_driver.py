@@ -6459,6 +6459,28 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_guests=True, only_running=False)
 
+    @mock.patch.object(host.Host, "list_guests")
+    def test_get_power_states(self, mock_list):
+        running = mock.Mock(uuid=uuids.running)
+        running.get_power_state.return_value = power_state.RUNNING
+        shutdown = mock.Mock(uuid=uuids.shutdown)
+        shutdown.get_power_state.return_value = power_state.SHUTDOWN
+        other = mock.Mock(uuid=uuids.other)
+        mock_list.return_value = [running, shutdown, other]
+        instances = [objects.Instance(uuid=uuids.running),
+                     objects.Instance(uuid=uuids.shutdown),
+                     objects.Instance(uuid=uuids.missing)]
+
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        states = drvr.get_power_states(instances)
+
+        self.assertEqual({uuids.running: power_state.RUNNING,
+                          uuids.shutdown: power_state.SHUTDOWN,
+                          uuids.missing: power_state.NOSTATE}, states)
+        mock_list.assert_called_once_with(only_running=False)
+        running.get_power_state.assert_called_once_with(drvr._host)
+        other.get_power_state.assert_not_called()
+
     @mock.patch('nova.virt.libvirt.host.Host.get_online_cpus',
                 return_value=None)
     @mock.patch('nova.virt.libvirt.host.Host.get_cpu_count',
@@ -19282,13 +19304,17 @@ class LibvirtVolumeUsageTestCase(test.NoDBTestCase):
                      {'volume_id': 2,
                       'device_name': 'vda'}]
 
-    def test_get_all_volume_usage(self):
-        def fake_block_stats(instance_name, disk):
-            return (169, 688640, 0, 0, -1)
+    def _mock_domains(self, *domains):
+        return mock.patch.object(self.drvr._host, 'list_instance_domains',
+                                 return_value=list(domains))
 
-        self.stubs.Set(self.drvr, 'block_stats', fake_block_stats)
-        vol_usage = self.drvr.get_all_volume_usage(self.c,
-              [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
+    def test_get_all_volume_usage(self):
+        domain = mock.Mock()
+        domain.UUIDString.return_value = self.ins_ref.uuid
+        domain.blockStats.return_value = (169, 688640, 0, 0, -1)
+        with self._mock_domains(domain) as mock_list:
+            vol_usage = self.drvr.get_all_volume_usage(self.c,
+                  [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
 
         expected_usage = [{'volume': 1,
                            'instance': self.ins_ref,
@@ -19299,15 +19325,31 @@ class LibvirtVolumeUsageTestCase(test.NoDBTestCase):
                             'rd_bytes': 688640, 'wr_req': 0,
                             'rd_req': 169, 'wr_bytes': 0}]
         self.assertEqual(vol_usage, expected_usage)
+        mock_list.assert_called_once_with()
+        domain.blockStats.assert_has_calls([mock.call('vde'),
+                                            mock.call('vda')])
 
     def test_get_all_volume_usage_device_not_found(self):
-        def fake_get_domain(self, instance):
-            raise exception.InstanceNotFound(instance_id="fakedom")
-
-        self.stubs.Set(host.Host, '_get_domain', fake_get_domain)
-        vol_usage = self.drvr.get_all_volume_usage(self.c,
-              [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
+        domain = mock.Mock()
+        domain.UUIDString.return_value = uuids.other_instance
+        with self._mock_domains(domain):
+            vol_usage = self.drvr.get_all_volume_usage(self.c,
+                  [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
         self.assertEqual(vol_usage, [])
+        self.assertFalse(domain.blockStats.called)
+
+    def test_get_all_volume_usage_block_stats_error(self):
+        domain = mock.Mock()
+        domain.UUIDString.return_value = self.ins_ref.uuid
+        domain.blockStats.side_effect = [
+            fakelibvirt.make_libvirtError(
+                fakelibvirt.libvirtError, 'error',
+                error_code=fakelibvirt.VIR_ERR_OPERATION_INVALID),
+            (169, 688640, 0, 0, -1)]
+        with self._mock_domains(domain):
+            vol_usage = self.drvr.get_all_volume_usage(self.c,
+                  [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
+        self.assertEqual([2], [usage['volume'] for usage in vol_usage])
 
 
 class LibvirtNonblockingTestCase(test.NoDBTestCase):
@@ -343,6 +343,53 @@ class VMwareVMOpsTestCase(test.NoDBTestCase):
             mock_get_vm_ref.assert_called_once_with(self._session,
                 self._instance)
 
+    def _fake_vm_power_state(self, vm_uuid, state):
+        props = [vmwareapi_fake.Prop('runtime.powerState', state),
+                 vmwareapi_fake.Prop('config.extraConfig["nvp.vm-uuid"]',
+                                     vmwareapi_fake.OptionValue(
+                                         key='nvp.vm-uuid', value=vm_uuid))]
+        return vmwareapi_fake.ObjectContent(None, prop_list=props)
+
+    def test_get_power_states(self):
+        instances = [
+            fake_instance.fake_instance_obj(self._context, uuid=uuid)
+            for uuid in (uuidsentinel.running, uuidsentinel.shutdown,
+                         uuidsentinel.missing)]
+        result = vmwareapi_fake.FakeRetrieveResult()
+        result.add_object(self._fake_vm_power_state(uuidsentinel.running,
+                                                    'poweredOn'))
+        # VMs of other instances in the cluster are ignored
+        result.add_object(self._fake_vm_power_state(uuidsentinel.other,
+                                                    'poweredOn'))
+        next_result = vmwareapi_fake.FakeRetrieveResult()
+        next_result.add_object(self._fake_vm_power_state(uuidsentinel.shutdown,
+                                                         'poweredOff'))
+        self._vmops._root_resource_pool = 'fake-rp'
+
+        with mock.patch.object(self._session, '_call_method',
+                               side_effect=[result, next_result, None]
+                               ) as mock_call:
+            states = self._vmops.get_power_states(instances)
+
+        self.assertEqual({uuidsentinel.running: power_state.RUNNING,
+                          uuidsentinel.shutdown: power_state.SHUTDOWN,
+                          uuidsentinel.missing: power_state.NOSTATE},
+                         states)
+        mock_call.assert_has_calls([
+            mock.call(vim_util, 'get_inner_objects', 'fake-rp', 'vm',
+                      'VirtualMachine',
+                      ['runtime.powerState',
+                       'config.extraConfig["nvp.vm-uuid"]']),
+            mock.call(vutil, 'continue_retrieval', result),
+            mock.call(vutil, 'continue_retrieval', next_result)])
+
+    def test_get_power_states_no_resource_pool(self):
+        self._vmops._root_resource_pool = None
+        with mock.patch.object(self._session, '_call_method') as mock_call:
+            states = self._vmops.get_power_states([self._instance])
+        self.assertEqual({self._instance.uuid: power_state.NOSTATE}, states)
+        self.assertFalse(mock_call.called)
+
     def _test_get_datacenter_ref_and_name(self, ds_ref_exists=False):
         instance_ds_ref = mock.Mock()
         instance_ds_ref.value = "ds-1"
@@ -17,6 +17,7 @@
 
 """Utilities and helper functions."""
 
+import collections
 import contextlib
 import copy
 import datetime
@@ -1182,6 +1183,49 @@ def safe_truncate(value, length):
     return u_value
 
 
+class ExpiringLRUCache(object):
+    """A process-local cache of a bounded number of expiring entries.
+
+    Entries expire once they are older than their time to live, and the
+    least recently used entries are evicted when there are too many.
+    """
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """Return the value of an entry, or None if missing or expired."""
+        try:
+            expires, value = self._entries.pop(key)
+        except KeyError:
+            return None
+        if expires <= time.time():
+            return None
+        # Move the entry to the most recently used end
+        self._entries[key] = (expires, value)
+        return value
+
+    def set(self, key, value, ttl, size):
+        """Add or replace an entry.
+
+        :param ttl: Number of seconds before the entry expires
+        :param size: Maximum number of entries to keep
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = (time.time() + ttl, value)
+        while len(self._entries) > size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
 def read_cached_file(filename, force_reload=False):
     """Read from a file if it has been modified.
 
@@ -166,6 +166,20 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def get_power_states(self, instances):
+        """Get the current power state of several instances at once.
+
+        Drivers which can query the hypervisor for all of their guests in a
+        single round-trip should implement this so that periodic tasks do
+        not need to call :meth:`get_info` once per instance.
+
+        :param instances: list of nova.objects.instance.Instance objects
+        :returns: dict, keyed by instance uuid, of nova.compute.power_state
+                  values; instances unknown to the hypervisor are reported
+                  as NOSTATE
+        """
+        raise NotImplementedError()
+
     def get_num_instances(self):
         """Return the total number of virtual machines.
 
@@ -348,6 +348,12 @@ class FakeDriver(driver.ComputeDriver):
         i = self.instances[instance.uuid]
         return hardware.InstanceInfo(state=i.state)
 
+    def get_power_states(self, instances):
+        return {instance.uuid: (self.instances[instance.uuid].state
+                                if instance.uuid in self.instances
+                                else power_state.NOSTATE)
+                for instance in instances}
+
     def get_diagnostics(self, instance):
         return {'cpu0_time': 17300000000,
                 'memory': 524288,
@@ -868,6 +868,30 @@ class IronicDriver(virt_driver.ComputeDriver):
 
         return hardware.InstanceInfo(state=map_power_state(node.power_state))
 
+    def get_power_states(self, instances):
+        """Get the current power state of several instances at once.
+
+        The nodes are fetched with a single (paginated) call to Ironic
+        rather than one call per instance. Unlike _get_node_list, errors
+        talking to Ironic are raised so the caller can fall back to
+        get_info instead of treating every instance as missing.
+
+        :param instances: list of instance objects.
+        :returns: dict of power states keyed by instance uuid.
+        """
+        states = dict.fromkeys((instance.uuid for instance in instances),
+                               power_state.NOSTATE)
+        # NOTE(lucasagomes): limit == 0 is an indicator to continue
+        # pagination until there're no more values to be returned.
+        node_list = self.ironicclient.call(
+            "node.list", associated=True, limit=0,
+            fields=('instance_uuid', 'power_state'))
+        for node in node_list:
+            if node.instance_uuid in states:
+                states[node.instance_uuid] = map_power_state(
+                    node.power_state)
+        return states
+
     def deallocate_networks_on_reschedule(self, instance):
         """Does the driver want networks deallocated on reschedule?
 
@@ -5287,6 +5287,14 @@ class LibvirtDriver(driver.ComputeDriver):
         # workaround, see libvirt/compat.py
         return guest.get_info(self._host)
 
+    def get_power_states(self, instances):
+        states = dict.fromkeys((instance.uuid for instance in instances),
+                               power_state.NOSTATE)
+        for guest in self._host.list_guests(only_running=False):
+            if guest.uuid in states:
+                states[guest.uuid] = guest.get_power_state(self._host)
+        return states
+
     def _create_domain_setup_lxc(self, context, instance, image_meta,
                                  block_device_info):
         inst_path = libvirt_utils.get_instance_path(instance)
@@ -6163,9 +6171,20 @@ class LibvirtDriver(driver.ComputeDriver):
            a given host.
         """
         vol_usage = []
+        # NOTE: list the running domains once instead of looking up the
+        # domain of each instance for each of its volumes
+        domains = {domain.UUIDString(): domain
+                   for domain in self._host.list_instance_domains()}
 
         for instance_bdms in compute_host_bdms:
             instance = instance_bdms['instance']
+            domain = domains.get(instance.uuid)
+            if domain is None:
+                if instance_bdms['instance_bdms']:
+                    LOG.info('Could not find running domain in libvirt for '
+                             'instance %s. Cannot get volume usage.',
+                             instance.name, instance=instance)
+                continue
 
             for bdm in instance_bdms['instance_bdms']:
                 mountpoint = bdm['device_name']
@@ -6175,7 +6194,8 @@ class LibvirtDriver(driver.ComputeDriver):
 
                 LOG.debug("Trying to get stats for the volume %s",
                           volume_id, instance=instance)
-                vol_stats = self.block_stats(instance, mountpoint)
+                vol_stats = self._get_domain_block_stats(instance, domain,
+                                                         mountpoint)
 
                 if vol_stats:
                     stats = dict(volume=volume_id,
@@ -6202,6 +6222,15 @@ class LibvirtDriver(driver.ComputeDriver):
             # virDomain object to use nova.virt.libvirt.Guest.
             # We should be able to remove domain at the end.
             domain = guest._domain
+            return self._get_domain_block_stats(instance, domain, disk_id)
+        except exception.InstanceNotFound:
+            LOG.info('Could not find domain in libvirt for instance %s. '
+                     'Cannot get block stats for device', instance.name,
+                     instance=instance)
+
+    @staticmethod
+    def _get_domain_block_stats(instance, domain, disk_id):
+        try:
             return domain.blockStats(disk_id)
         except libvirt.libvirtError as e:
             errcode = e.get_error_code()
@@ -6211,10 +6240,6 @@ class LibvirtDriver(driver.ComputeDriver):
                      {'instance_name': instance.name, 'disk': disk_id,
                       'errcode': errcode, 'e': e},
                      instance=instance)
-        except exception.InstanceNotFound:
-            LOG.info('Could not find domain in libvirt for instance %s. '
-                     'Cannot get block stats for device', instance.name,
-                     instance=instance)
 
     def get_console_pool_info(self, console_type):
         # TODO(mdragon): console proxy should be implemented for libvirt,
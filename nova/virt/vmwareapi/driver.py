@@ -511,6 +511,10 @@ class VMwareVCDriver(driver.ComputeDriver):
         """Return info about the VM instance."""
         return self._vmops.get_info(instance)
 
+    def get_power_states(self, instances):
+        """Return the power states of the given VM instances."""
+        return self._vmops.get_power_states(instances)
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         return self._vmops.get_diagnostics(instance)
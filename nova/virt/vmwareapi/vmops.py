@@ -1581,6 +1581,37 @@ class VMwareVMOps(object):
         return hardware.InstanceInfo(
             state=constants.POWER_STATES[vm_props['runtime.powerState']])
 
+    def get_power_states(self, instances):
+        """Return the power states of the given instances.
+
+        A single PropertyCollector query is made for all of the VMs in the
+        cluster instead of one query per instance.
+        """
+        states = dict.fromkeys((instance.uuid for instance in instances),
+                               power_state.NOSTATE)
+        if not self._root_resource_pool:
+            return states
+        properties = ['runtime.powerState',
+                      'config.extraConfig["nvp.vm-uuid"]']
+        retrieve_result = self._session._call_method(
+            vim_util, 'get_inner_objects', self._root_resource_pool, 'vm',
+            'VirtualMachine', properties)
+        while retrieve_result:
+            for vm in retrieve_result.objects:
+                vm_uuid = None
+                vm_state = None
+                for prop in vm.propSet:
+                    if prop.name == 'runtime.powerState':
+                        vm_state = prop.val
+                    elif prop.name == 'config.extraConfig["nvp.vm-uuid"]':
+                        vm_uuid = prop.val.value
+                if vm_uuid in states and vm_state in constants.POWER_STATES:
+                    states[vm_uuid] = constants.POWER_STATES[vm_state]
+            retrieve_result = self._session._call_method(vutil,
+                                                         'continue_retrieval',
+                                                         retrieve_result)
+        return states
+
     def _get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)